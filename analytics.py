@@ -0,0 +1,185 @@
+"""
+Marketplace Analytics Rollups
+Incrementally folds new licenses and ledger transactions into hourly/daily totals
+per dataset, owner, category and transaction type
+"""
+import asyncio
+import os
+import random
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+
+from database import SessionLocal, dialect_insert
+from metrics import ANALYTICS_ROWS_ROLLED_UP
+from models import AnalyticsRollup, AnalyticsWatermark, Dataset, License, Transaction
+
+OCTAS_PER_APT = 100_000_000
+GRANULARITIES = {
+    "hour": lambda ts: ts.replace(minute=0, second=0, microsecond=0),
+    "day": lambda ts: ts.replace(hour=0, minute=0, second=0, microsecond=0),
+}
+_UPSERT_CHUNK = 1000
+
+RollupKey = Tuple[str, str, str, datetime]  # granularity, dimension, key, bucket
+
+
+def _sales_rows(db, after_id: int, limit: int):
+    return db.execute(
+        select(License.id, License.purchased_at, License.price_paid, Dataset.id, Dataset.owner_id, Dataset.category)
+        .join(Dataset, Dataset.id == License.dataset_id)
+        .where(License.id > after_id)
+        .order_by(License.id)
+        .limit(limit)
+    ).all()
+
+
+def _sales_dimensions(row):
+    _, purchased_at, price_paid, dataset_id, owner_id, category = row
+    amount = round((price_paid or 0) * OCTAS_PER_APT)
+    return purchased_at, amount, (("dataset", str(dataset_id)), ("owner", str(owner_id)), ("category", category or ""))
+
+
+def _ledger_rows(db, after_id: int, limit: int):
+    return db.execute(
+        select(Transaction.id, Transaction.created_at, Transaction.amount_apt, Transaction.transaction_type)
+        .where(Transaction.id > after_id)
+        .order_by(Transaction.id)
+        .limit(limit)
+    ).all()
+
+
+def _ledger_dimensions(row):
+    _, created_at, amount_apt, transaction_type = row
+    return created_at, round((amount_apt or 0) * OCTAS_PER_APT), (("ledger", transaction_type or ""),)
+
+
+SOURCES = {
+    "licenses": (_sales_rows, _sales_dimensions),
+    "transactions": (_ledger_rows, _ledger_dimensions),
+}
+
+
+def upsert_rollups(db, totals: Dict[RollupKey, List[int]]):
+    """Add counts/amounts onto existing rollup rows (INSERT ... ON CONFLICT DO UPDATE)"""
+    insert = dialect_insert(db)
+    # A stable row order keeps concurrent upserts from deadlocking on Postgres
+    rows = [
+        {"granularity": g, "dimension": d, "key": k, "bucket": b, "count": c, "amount_octas": a}
+        for (g, d, k, b), (c, a) in sorted(totals.items())
+    ]
+    for start in range(0, len(rows), _UPSERT_CHUNK):
+        stmt = insert(AnalyticsRollup).values(rows[start:start + _UPSERT_CHUNK])
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=["granularity", "dimension", "key", "bucket"],
+            set_={
+                "count": AnalyticsRollup.count + stmt.excluded.count,
+                "amount_octas": AnalyticsRollup.amount_octas + stmt.excluded.amount_octas,
+            },
+        ))
+
+
+def _roll_up_batch(source: str, batch_size: int, settle_seconds: float) -> int:
+    """Fold the next batch of one source into the rollups; returns rows consumed"""
+    fetch, dimensions = SOURCES[source]
+    with SessionLocal() as db:
+        # The row lock serializes workers so no batch is counted twice
+        watermark = db.execute(
+            select(AnalyticsWatermark).where(AnalyticsWatermark.source == source).with_for_update(skip_locked=True)
+        ).scalar_one_or_none()
+        if watermark is None:
+            if db.get(AnalyticsWatermark, source) is not None:
+                return 0  # another worker holds it
+            watermark = AnalyticsWatermark(source=source, last_id=0)
+            db.add(watermark)
+            try:
+                db.flush()
+            except IntegrityError:
+                return 0  # created concurrently by another worker
+
+        # Ids are assigned before commit, so stop short of rows that may still have
+        # lower-id neighbours in flight
+        cutoff = datetime.utcnow() - timedelta(seconds=settle_seconds)
+        totals: Dict[RollupKey, List[int]] = defaultdict(lambda: [0, 0])
+        consumed = 0
+        for row in fetch(db, watermark.last_id, batch_size):
+            timestamp, amount, keys = dimensions(row)
+            if timestamp is not None and timestamp > cutoff:
+                break
+            # Rows without a timestamp have no bucket; they only advance the watermark
+            if timestamp is not None:
+                for granularity, truncate in GRANULARITIES.items():
+                    bucket = truncate(timestamp)
+                    for dimension, key in keys:
+                        total = totals[(granularity, dimension, key, bucket)]
+                        total[0] += 1
+                        total[1] += amount
+            watermark.last_id = row[0]
+            consumed += 1
+
+        if consumed:
+            upsert_rollups(db, totals)
+            ANALYTICS_ROWS_ROLLED_UP.labels(source).inc(consumed)
+        db.commit()
+        return consumed
+
+
+def roll_up(batch_size: int = 5000, settle_seconds: float = 10.0, max_batches: Optional[int] = None) -> Dict[str, int]:
+    """Catch every source up to (now - settle_seconds); returns rows consumed per source"""
+    consumed = {}
+    for source in SOURCES:
+        consumed[source] = 0
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            rows = _roll_up_batch(source, batch_size, settle_seconds)
+            consumed[source] += rows
+            batches += 1
+            if rows < batch_size:
+                break
+    return consumed
+
+
+class AnalyticsRollupJob:
+    def __init__(self, interval: float = 30.0, batch_size: int = 5000, settle_seconds: float = 10.0):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.settle_seconds = settle_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    async def run_once(self) -> Dict[str, int]:
+        # Bounded per tick so a large backlog doesn't monopolise a threadpool slot
+        return await run_in_threadpool(roll_up, self.batch_size, self.settle_seconds, 20)
+
+    async def _run(self) -> None:
+        await asyncio.sleep(random.uniform(0, self.interval))
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                print(f"❌ Analytics rollup failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Singleton instance (ANALYTICS_ROLLUP_INTERVAL=0 disables the background job)
+analytics_job = AnalyticsRollupJob(
+    interval=float(os.getenv("ANALYTICS_ROLLUP_INTERVAL", "30")),
+    batch_size=int(os.getenv("ANALYTICS_ROLLUP_BATCH_SIZE", "5000")),
+    settle_seconds=float(os.getenv("ANALYTICS_SETTLE_SECONDS", "10")),
+)
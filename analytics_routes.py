@@ -0,0 +1,190 @@
+"""
+Analytics API Routes
+Leaderboards and time series served from the precomputed rollups (see analytics.py),
+so a query's cost depends on the window, not on the size of the sales history
+"""
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from pydantic import BaseModel
+from typing import List, Literal, Optional
+from cache import cache
+from database import get_read_db
+from models import AnalyticsRollup, Dataset, User
+from db_types import WalletAddress
+from analytics import GRANULARITIES, OCTAS_PER_APT
+from users import user_resolver
+from datetime import datetime, timedelta
+import os
+
+router = APIRouter(prefix="/api/analytics", tags=["Analytics"])
+
+# Rollups only move every ANALYTICS_ROLLUP_INTERVAL seconds, so short caching loses nothing
+ANALYTICS_CACHE_TTL = float(os.getenv("ANALYTICS_CACHE_TTL", "30"))
+MAX_WINDOW_DAYS = 365
+
+# Pydantic models
+class RankedEntry(BaseModel):
+    key: str
+    label: str
+    sales: int
+    volume_apt: float
+
+class SeriesPoint(BaseModel):
+    bucket: datetime
+    key: Optional[str] = None
+    count: int
+    volume_apt: float
+
+class SeriesResponse(BaseModel):
+    granularity: str
+    since: datetime
+    points: List[SeriesPoint]
+
+def _window(days: int, granularity: Optional[str]):
+    """Pick a granularity for the window (hourly up to 2 days) and align its start to a bucket"""
+    granularity = granularity or ("hour" if days <= 2 else "day")
+    since = GRANULARITIES[granularity](datetime.utcnow() - timedelta(days=days))
+    return granularity, since
+
+def _apt(octas) -> float:
+    return (octas or 0) / OCTAS_PER_APT
+
+def _ranking(db: Session, dimension: str, days: int, limit: int):
+    """Top keys of a dimension by volume over the last `days` days (daily rollups)"""
+    _, since = _window(days, "day")
+    volume = func.sum(AnalyticsRollup.amount_octas)
+    return db.execute(
+        select(AnalyticsRollup.key, func.sum(AnalyticsRollup.count).label("sales"), volume.label("volume"))
+        .where(
+            AnalyticsRollup.granularity == "day",
+            AnalyticsRollup.dimension == dimension,
+            AnalyticsRollup.bucket >= since,
+        )
+        .group_by(AnalyticsRollup.key)
+        .order_by(volume.desc(), AnalyticsRollup.key)
+        .limit(limit)
+    ).all()
+
+def _series(db: Session, dimension: str, granularity: str, since: datetime, key: Optional[str] = None, by_key: bool = False):
+    columns = [AnalyticsRollup.bucket]
+    if by_key:
+        columns.append(AnalyticsRollup.key)
+    query = (
+        select(*columns, func.sum(AnalyticsRollup.count), func.sum(AnalyticsRollup.amount_octas))
+        .where(
+            AnalyticsRollup.granularity == granularity,
+            AnalyticsRollup.dimension == dimension,
+            AnalyticsRollup.bucket >= since,
+        )
+        .group_by(*columns)
+        .order_by(*columns)
+    )
+    if key is not None:
+        query = query.where(AnalyticsRollup.key == key)
+    points = []
+    for row in db.execute(query):
+        points.append(SeriesPoint(
+            bucket=row[0],
+            key=row[1] if by_key else None,
+            count=row[-2] or 0,
+            volume_apt=_apt(row[-1]),
+        ))
+    return points
+
+async def _cached(key: str, build):
+    cached = await cache.get(key)
+    if cached is not None:
+        return cached
+    payload = await run_in_threadpool(build)
+    await cache.set(key, payload, ANALYTICS_CACHE_TTL)
+    return payload
+
+@router.get("/top-datasets", response_model=List[RankedEntry])
+async def top_datasets(
+    days: int = Query(7, ge=1, le=MAX_WINDOW_DAYS),
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_read_db)
+):
+    """Best-selling datasets by volume over the last `days` days"""
+    def build():
+        rows = _ranking(db, "dataset", days, limit)
+        titles = dict(db.execute(
+            select(Dataset.id, Dataset.title).where(Dataset.id.in_([int(row.key) for row in rows]))
+        ).all()) if rows else {}
+        return [
+            RankedEntry(key=row.key, label=titles.get(int(row.key), ""), sales=row.sales, volume_apt=_apt(row.volume)).model_dump()
+            for row in rows
+        ]
+    return await _cached(f"analytics:top-datasets:{days}:{limit}", build)
+
+@router.get("/top-owners", response_model=List[RankedEntry])
+async def top_owners(
+    days: int = Query(7, ge=1, le=MAX_WINDOW_DAYS),
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_read_db)
+):
+    """Highest-earning sellers by volume over the last `days` days"""
+    def build():
+        rows = _ranking(db, "owner", days, limit)
+        usernames = dict(db.execute(
+            select(User.id, User.username).where(User.id.in_([int(row.key) for row in rows]))
+        ).all()) if rows else {}
+        return [
+            RankedEntry(key=row.key, label=usernames.get(int(row.key), ""), sales=row.sales, volume_apt=_apt(row.volume)).model_dump()
+            for row in rows
+        ]
+    return await _cached(f"analytics:top-owners:{days}:{limit}", build)
+
+@router.get("/top-categories", response_model=List[RankedEntry])
+async def top_categories(
+    days: int = Query(7, ge=1, le=MAX_WINDOW_DAYS),
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_read_db)
+):
+    """Categories by sales volume over the last `days` days"""
+    def build():
+        return [
+            RankedEntry(key=row.key, label=row.key, sales=row.sales, volume_apt=_apt(row.volume)).model_dump()
+            for row in _ranking(db, "category", days, limit)
+        ]
+    return await _cached(f"analytics:top-categories:{days}:{limit}", build)
+
+@router.get("/owners/{wallet_address}/revenue", response_model=SeriesResponse)
+async def owner_revenue(
+    wallet_address: WalletAddress,
+    days: int = Query(30, ge=1, le=MAX_WINDOW_DAYS),
+    granularity: Optional[Literal["hour", "day"]] = None,
+    db: Session = Depends(get_read_db)
+):
+    """A seller's license sales and revenue per hour/day"""
+    owner = await run_in_threadpool(user_resolver.lookup, db, wallet_address)
+    if owner is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    owner_id = owner.id
+    granularity, since = _window(days, granularity)
+
+    def build():
+        points = _series(db, "owner", granularity, since, key=str(owner_id))
+        return SeriesResponse(granularity=granularity, since=since, points=points).model_dump(mode="json")
+    return await _cached(f"analytics:owner:{owner_id}:{granularity}:{since.isoformat()}", build)
+
+@router.get("/volume", response_model=SeriesResponse)
+async def volume(
+    days: int = Query(7, ge=1, le=MAX_WINDOW_DAYS),
+    granularity: Optional[Literal["hour", "day"]] = None,
+    source: Literal["sales", "ledger"] = "sales",
+    db: Session = Depends(get_read_db)
+):
+    """Marketplace volume over time: license sales, or ledger transactions per type"""
+    granularity, since = _window(days, granularity)
+
+    def build():
+        if source == "sales":
+            # Every sale lands in exactly one category row, so their sum is the total
+            points = _series(db, "category", granularity, since)
+        else:
+            points = _series(db, "ledger", granularity, since, by_key=True)
+        return SeriesResponse(granularity=granularity, since=since, points=points).model_dump(mode="json")
+    return await _cached(f"analytics:volume:{source}:{granularity}:{since.isoformat()}", build)
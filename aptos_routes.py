@@ -4,12 +4,24 @@ FastAPI routes for Aptos blockchain operations
 
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
+from sqlalchemy.orm import Session
 from typing import List, Optional
 from aptos_service import aptos_service
+from database import get_db
+from db_types import WalletAddress
+from models import RoyaltyConfig
+from rate_limit import RateLimit
 from aptos_sdk.account import Account
 
 router = APIRouter(prefix="/aptos", tags=["Aptos Blockchain"])
 
+# Per-route limits (override with RATE_LIMIT_<NAME>, e.g. RATE_LIMIT_FAUCET=2/minute)
+account_create_limit = RateLimit("account_create", "10/minute", keys=("ip",))
+balance_limit = RateLimit("balance", "60/minute")
+faucet_limit = RateLimit("faucet", "5/minute")
+write_limit = RateLimit("aptos_write", "30/minute")
+transaction_limit = RateLimit("transaction_status", "120/minute", keys=("ip",))
+
 # Request/Response Models
 class CreateAccountResponse(BaseModel):
     address: str
@@ -48,7 +60,7 @@ class PayForLicenseRequest(BaseModel):
 class SetRoyaltyRequest(BaseModel):
     private_key: str
     dataset_id: int
-    contributors: List[str]
+    contributors: List[WalletAddress]  # stored in canonical form, like every other address
     share_percentage: int
 
 class BalanceResponse(BaseModel):
@@ -61,11 +73,12 @@ async def aptos_info():
     """Get Aptos service information"""
     return {
         "node_url": aptos_service.node_url,
+        "nodes": aptos_service.nodes.snapshot(),
         "contract_address": aptos_service.contract_address or "Not deployed yet",
         "status": "connected"
     }
 
-@router.post("/account/create", response_model=CreateAccountResponse)
+@router.post("/account/create", response_model=CreateAccountResponse, dependencies=[Depends(account_create_limit)])
 async def create_account():
     """Create a new Aptos account"""
     account_info = aptos_service.create_account()
@@ -74,7 +87,7 @@ async def create_account():
         "message": "Account created successfully. Save your private key securely!"
     }
 
-@router.get("/account/balance/{address}", response_model=BalanceResponse)
+@router.get("/account/balance/{address}", response_model=BalanceResponse, dependencies=[Depends(balance_limit)])
 async def get_balance(address: str):
     """Get account balance"""
     balance = await aptos_service.get_account_balance(address)
@@ -84,7 +97,7 @@ async def get_balance(address: str):
         "balance_apt": balance / 100000000  # Convert to APT
     }
 
-@router.post("/account/fund")
+@router.post("/account/fund", dependencies=[Depends(faucet_limit)])
 async def fund_account(request: FundAccountRequest):
     """Fund account from testnet faucet"""
     result = await aptos_service.fund_account_from_faucet(request.address, request.amount)
@@ -92,7 +105,7 @@ async def fund_account(request: FundAccountRequest):
         return result
     raise HTTPException(status_code=500, detail=result.get("message", "Failed to fund account"))
 
-@router.post("/dataset/mint")
+@router.post("/dataset/mint", dependencies=[Depends(write_limit)])
 async def mint_dataset(request: MintDatasetRequest):
     """Mint a dataset NFT on Aptos"""
     try:
@@ -111,7 +124,7 @@ async def mint_dataset(request: MintDatasetRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/license/grant")
+@router.post("/license/grant", dependencies=[Depends(write_limit)])
 async def grant_license(request: GrantLicenseRequest):
     """Grant a license to access a dataset"""
     try:
@@ -131,7 +144,7 @@ async def grant_license(request: GrantLicenseRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/payment/set-price")
+@router.post("/payment/set-price", dependencies=[Depends(write_limit)])
 async def set_price(request: SetPriceRequest):
     """Set pricing for a dataset"""
     try:
@@ -150,7 +163,7 @@ async def set_price(request: SetPriceRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/payment/pay-license")
+@router.post("/payment/pay-license", dependencies=[Depends(write_limit)])
 async def pay_license(request: PayForLicenseRequest):
     """Pay for a dataset license"""
     try:
@@ -168,9 +181,14 @@ async def pay_license(request: PayForLicenseRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/royalty/set")
-async def set_royalty(request: SetRoyaltyRequest):
+@router.post("/royalty/set", dependencies=[Depends(write_limit)])
+async def set_royalty(request: SetRoyaltyRequest, db: Session = Depends(get_db)):
     """Set royalty configuration for a dataset"""
+    # Royalties::distribute divides the share by the contributor count
+    if not request.contributors:
+        raise HTTPException(status_code=400, detail="At least one contributor is required")
+    if not 0 <= request.share_percentage <= 100:
+        raise HTTPException(status_code=400, detail="share_percentage must be between 0 and 100")
     try:
         account = Account.load_key(request.private_key)
         result = await aptos_service.set_royalty_config(
@@ -181,13 +199,21 @@ async def set_royalty(request: SetRoyaltyRequest):
         )
         
         if result["success"]:
+            # Settlement runs (manage.py settle-royalties) read the split from here
+            db.merge(RoyaltyConfig(
+                dataset_id=request.dataset_id,
+                main_owner=str(account.address()),
+                contributors=request.contributors,
+                share_percentage=request.share_percentage
+            ))
+            db.commit()
             return result
         else:
             raise HTTPException(status_code=400, detail=result.get("error"))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/transaction/{tx_hash}")
+@router.get("/transaction/{tx_hash}", dependencies=[Depends(transaction_limit)])
 async def get_transaction(tx_hash: str):
     """Get transaction status"""
     return await aptos_service.get_transaction_status(tx_hash)
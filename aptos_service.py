@@ -8,20 +8,52 @@ from dotenv import load_dotenv
 from typing import Optional, List, Dict, Any
 from aptos_sdk.account import Account
 from aptos_sdk.account_address import AccountAddress
-from aptos_sdk.async_client import RestClient, FaucetClient
 from aptos_sdk.transactions import EntryFunction, TransactionArgument, TransactionPayload
 from aptos_sdk.bcs import Serializer
+from cache import cache
+from fullnode_pool import FullnodePool, node_urls
+from metrics import observe_upstream
+from rate_limit import ConcurrencyLimiter, UpstreamSaturated
 
 load_dotenv()
 
+# Seconds a fetched balance is served from the shared cache
+BALANCE_CACHE_TTL = float(os.getenv("BALANCE_CACHE_TTL", "5"))
+
+# Global cap on concurrent fullnode/faucet calls per worker; excess callers get a fast 503
+aptos_gate = ConcurrencyLimiter(
+    "aptos",
+    limit=int(os.getenv("APTOS_MAX_CONCURRENCY", "32")),
+    max_queue=int(os.getenv("APTOS_MAX_QUEUE", "64")),
+    queue_timeout=float(os.getenv("APTOS_QUEUE_TIMEOUT", "1")),
+)
+
 class AptosService:
     def __init__(self):
-        # Initialize Aptos client
-        self.node_url = os.getenv("APTOS_NODE_URL", "https://fullnode.testnet.aptoslabs.com/v1")
+        # Aptos clients are built on first use to keep worker start-up cheap
+        self.nodes = FullnodePool(node_urls())
+        self.node_url = self.nodes.endpoints[0].url
         self.faucet_url = os.getenv("APTOS_FAUCET_URL", "https://faucet.testnet.aptoslabs.com")
-        self.client = RestClient(self.node_url)
-        self.faucet_client = FaucetClient(self.faucet_url, self.client)
         self.contract_address = os.getenv("APTOS_CONTRACT_ADDRESS", "0x203e9bf58c965f98b788b20732faaf8dc135a827c2803935e623718226722964")
+        self._faucet_client = None
+    
+    @property
+    def client(self):
+        """REST client of the fullnode reads currently prefer (reads themselves go through self.nodes)"""
+        return self.nodes.best().client
+    
+    @property
+    def faucet_client(self):
+        """Testnet faucet client sharing the fullnode REST client"""
+        if self._faucet_client is None:
+            from aptos_sdk.async_client import FaucetClient
+            self._faucet_client = FaucetClient(self.faucet_url, self.client)
+        return self._faucet_client
+    
+    async def close(self):
+        """Close the underlying HTTP clients that were ever created"""
+        await self.nodes.close()
+        self._faucet_client = None
     
     def create_account(self) -> dict:
         """Create a new Aptos account"""
@@ -32,14 +64,27 @@ class AptosService:
             "public_key": str(account.public_key)
         }
     
+    async def fetch_account_balance(self, address: str) -> int:
+        """Account balance in octas (shared-cached); raises if the fullnodes can't answer"""
+        cached = await cache.get(f"balance:{address}")
+        if cached is not None:
+            return cached
+        # Convert string address to AccountAddress object
+        account_address = AccountAddress.from_str(address)
+        # Use the built-in account_balance method from RestClient
+        async with aptos_gate.slot():
+            with observe_upstream("fullnode", "account_balance"):
+                balance = await self.nodes.read("account_balance", lambda client: client.account_balance(account_address))
+        await cache.set(f"balance:{address}", balance, BALANCE_CACHE_TTL)
+        return balance
+    
     async def get_account_balance(self, address: str) -> int:
         """Get account balance in octas using the official SDK method"""
         try:
-            # Convert string address to AccountAddress object
-            account_address = AccountAddress.from_str(address)
-            # Use the built-in account_balance method from RestClient
-            balance = await self.client.account_balance(account_address)
-            return balance
+            # Failures fall through to 0 below and are never cached
+            return await self.fetch_account_balance(address)
+        except UpstreamSaturated:
+            raise
         except Exception as e:
             print(f"Error getting balance for {address}: {e}")
             return 0
@@ -50,13 +95,16 @@ class AptosService:
         """
         try:
             # The faucet automatically registers the coin store when funding
-            await self.faucet_client.fund_account(address, amount)
+            async with aptos_gate.slot():
+                with observe_upstream("faucet", "fund_account"):
+                    await self.faucet_client.fund_account(address, amount)
             
             # Wait a moment for the transaction to be processed
             import asyncio
             await asyncio.sleep(2)
             
-            # Get the new balance
+            # Get the new balance (drop any balance cached while the faucet ran)
+            await cache.delete(f"balance:{address}")
             balance = await self.get_account_balance(address)
             return {
                 "success": True,
@@ -64,6 +112,8 @@ class AptosService:
                 "balance_apt": balance / 100000000,
                 "message": "Account funded successfully"
             }
+        except UpstreamSaturated:
+            raise
         except Exception as e:
             error_msg = str(e)
             print(f"Error funding account: {error_msg}")
@@ -238,7 +288,10 @@ class AptosService:
                 [],
                 [
                     TransactionArgument(dataset_id, Serializer.u64),
-                    TransactionArgument(contributors, Serializer.sequence_serializer(Serializer.address)),
+                    TransactionArgument(
+                        [AccountAddress.from_str(contributor) for contributor in contributors],
+                        Serializer.sequence_serializer(Serializer.struct)
+                    ),
                     TransactionArgument(share_percentage, Serializer.u64),
                 ]
             )
@@ -258,10 +311,59 @@ class AptosService:
                 "error": str(e)
             }
     
+    def sign_royalty_batch(
+        self,
+        payer: Account,
+        payouts: List[tuple],
+        run_id: int
+    ) -> List[dict]:
+        """Build one Royalties::distribute transaction per (dataset_id, amount_octas)
+
+        Hashes are known before anything is sent, so callers can record them first
+        and look them up on chain if the process dies mid-submission.
+        """
+        import hashlib
+        transactions = []
+        for dataset_id, amount in payouts:
+            payload = EntryFunction.natural(
+                f"{self.contract_address}::Royalties",
+                "distribute",
+                [],
+                [
+                    TransactionArgument(dataset_id, Serializer.u64),
+                    TransactionArgument(amount, Serializer.u64),
+                ]
+            )
+            
+            # Simulate signing (in production, sign with consecutive sequence numbers)
+            tx_hash = '0x' + hashlib.sha256(f"{payer.address()}{run_id}{dataset_id}{amount}".encode()).hexdigest()
+            transactions.append({"dataset_id": dataset_id, "transaction_hash": tx_hash, "payload": payload})
+        return transactions
+    
+    async def submit_royalty_batch(self, transactions: List[dict]) -> dict:
+        """Submit transactions from sign_royalty_batch together"""
+        try:
+            # Simulate submission
+            return {
+                "success": True,
+                "transactions": [
+                    {"dataset_id": tx["dataset_id"], "transaction_hash": tx["transaction_hash"]}
+                    for tx in transactions
+                ],
+                "note": "Transactions simulated - requires payer signature in production"
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e)
+            }
+    
     async def get_transaction_status(self, tx_hash: str) -> dict:
         """Get transaction status"""
         try:
-            tx = await self.client.transaction_by_hash(tx_hash)
+            async with aptos_gate.slot():
+                with observe_upstream("fullnode", "transaction_by_hash"):
+                    tx = await self.nodes.read("transaction_by_hash", lambda client: client.transaction_by_hash(tx_hash))
             return {
                 "success": tx.get("success", False),
                 "vm_status": tx.get("vm_status"),
@@ -269,6 +371,8 @@ class AptosService:
                 "version": tx.get("version"),
                 "gas_used": tx.get("gas_used")
             }
+        except UpstreamSaturated:
+            raise
         except Exception as e:
             return {
                 "success": False,
@@ -276,10 +380,28 @@ class AptosService:
                 "hash": tx_hash
             }
     
+    async def get_ledger_info(self) -> dict:
+        """Get fullnode ledger information (used as a health probe, so it bypasses aptos_gate)"""
+        try:
+            with observe_upstream("fullnode", "info"):
+                info = await self.nodes.read("info", lambda client: client.info())
+            return {
+                "success": True,
+                "chain_id": info.get("chain_id"),
+                "ledger_version": info.get("ledger_version")
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e)
+            }
+    
     async def get_account_info(self, address: str) -> dict:
         """Get account information"""
         try:
-            account = await self.client.account(address)
+            async with aptos_gate.slot():
+                with observe_upstream("fullnode", "account"):
+                    account = await self.nodes.read("account", lambda client: client.account(address))
             balance = await self.get_account_balance(address)
             return {
                 "address": address,
@@ -288,6 +410,8 @@ class AptosService:
                 "balance_octas": balance,
                 "balance_apt": balance / 100000000
             }
+        except UpstreamSaturated:
+            raise
         except Exception as e:
             return {
                 "error": str(e),
@@ -0,0 +1,156 @@
+"""
+Address Storage Benchmark
+Compares 66-character hex strings with 32-byte binary keys (db_types.Address32/Hash32):
+unique index size and point-lookup latency on the same set of keys
+
+Keys come from the seeded transaction hashes and user wallets, topped up with random
+ones up to --rows; they go into scratch tables that are dropped afterwards:
+    python datagen.py --users 200000 --transactions 2000000 --truncate
+    python benchmarks/address_storage.py --rows 2000000 --lookups 20000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import Column, Integer, LargeBinary, MetaData, String, Table, select, text  # noqa: E402
+
+from database import engine  # noqa: E402
+from load_test import percentile  # noqa: E402
+
+_BATCH_SIZE = 10000
+
+metadata = MetaData()
+# The same keys stored both ways: (table, key -> stored value)
+LAYOUTS = {
+    "text": (
+        Table(
+            "bench_keys_text", metadata,
+            Column("id", Integer, primary_key=True),
+            Column("key", String(66), nullable=False, unique=True),
+        ),
+        lambda key: "0x" + key.hex(),
+    ),
+    "binary": (
+        Table(
+            "bench_keys_binary", metadata,
+            Column("id", Integer, primary_key=True),
+            Column("key", LargeBinary, nullable=False, unique=True),
+        ),
+        lambda key: key,
+    ),
+}
+
+
+def seeded_keys(connection, rows: int):
+    """Up to `rows` distinct 32-byte keys from the database, topped up with random ones"""
+    keys = set()
+    for table, column in (("transactions", "blockchain_hash"), ("users", "wallet_address")):
+        # Raw SQL so the values come back as stored bytes, not canonical strings
+        result = connection.execute(
+            text(f"SELECT {column} FROM {table} WHERE {column} IS NOT NULL LIMIT :limit"),
+            {"limit": rows - len(keys)},
+        )
+        keys.update(bytes(value) for value in result.scalars())
+        if len(keys) >= rows:
+            break
+    seeded = len(keys)
+    while len(keys) < rows:
+        keys.add(os.urandom(32))
+    return list(keys), seeded
+
+
+def index_bytes(connection, table: Table):
+    """On-disk size of the unique index on `key`; None if the database can't tell"""
+    if engine.dialect.name == "postgresql":
+        return connection.execute(text(
+            "SELECT pg_relation_size(indexrelid) FROM pg_index "
+            "WHERE indrelid = CAST(:table AS regclass) AND NOT indisprimary"
+        ), {"table": table.name}).scalar()
+    name = connection.execute(text(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :table"
+    ), {"table": table.name}).scalar()
+    try:
+        return connection.execute(text("SELECT SUM(pgsize) FROM dbstat WHERE name = :name"), {"name": name}).scalar()
+    except Exception:
+        # SQLite built without SQLITE_ENABLE_DBSTAT_VTAB
+        return None
+
+
+def load(connection, table: Table, keys, encode) -> None:
+    for start in range(0, len(keys), _BATCH_SIZE):
+        connection.execute(table.insert(), [{"key": encode(key)} for key in keys[start:start + _BATCH_SIZE]])
+    connection.execute(text(f"ANALYZE {table.name}"))
+
+
+def lookup_latencies(connection, table: Table, probes):
+    """Sorted wall times in ms of `SELECT id ... WHERE key = ?`, one per probe"""
+    samples = []
+    for probe in probes:
+        start = time.perf_counter()
+        connection.execute(select(table.c.id).where(table.c.key == probe)).scalar_one()
+        samples.append((time.perf_counter() - start) * 1000)
+    return sorted(samples)
+
+
+def _reduction(before, after):
+    if not before or after is None:
+        return None
+    return round(100 * (1 - after / before), 1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Index size and lookup latency: hex string vs 32-byte keys")
+    parser.add_argument("--rows", type=int, default=200000, help="Keys per scratch table")
+    parser.add_argument("--lookups", type=int, default=10000, help="Point lookups per layout")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    report = {"dialect": engine.dialect.name, "rows": args.rows}
+    try:
+        with engine.begin() as connection:
+            keys, report["seeded_keys"] = seeded_keys(connection, args.rows)
+            metadata.drop_all(connection)
+            metadata.create_all(connection)
+        probes = random.Random(args.seed).choices(keys, k=args.lookups)
+
+        for layout, (table, encode) in LAYOUTS.items():
+            with engine.begin() as connection:
+                start = time.perf_counter()
+                load(connection, table, keys, encode)
+                load_seconds = time.perf_counter() - start
+            with engine.connect() as connection:
+                encoded = [encode(probe) for probe in probes]
+                # Warm-up pass so both layouts are measured with a hot cache
+                lookup_latencies(connection, table, encoded[:1000])
+                samples = lookup_latencies(connection, table, encoded)
+                report[layout] = {
+                    "index_bytes": index_bytes(connection, table),
+                    "load_seconds": round(load_seconds, 2),
+                    "p50_ms": round(percentile(samples, 50), 4),
+                    "p95_ms": round(percentile(samples, 95), 4),
+                }
+    finally:
+        with engine.begin() as connection:
+            metadata.drop_all(connection)
+
+    report["reduction_percent"] = {
+        metric: _reduction(report["text"][metric], report["binary"][metric])
+        for metric in ("index_bytes", "p50_ms", "p95_ms")
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
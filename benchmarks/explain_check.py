@@ -0,0 +1,130 @@
+"""
+Query Plan Check
+Runs EXPLAIN for the hot lookup paths and fails if any of them plans a sequential scan
+
+Run it against a large seeded database, otherwise the planner may legitimately prefer
+a sequential scan on tiny tables:
+    python datagen.py --datasets 200000 --licenses 2000000 --truncate
+    python benchmarks/explain_check.py
+    python benchmarks/explain_check.py --generate "--datasets 200000 --licenses 2000000"
+"""
+import argparse
+import os
+import re
+import shlex
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import bindparam, func, select, text  # noqa: E402
+
+from database import engine  # noqa: E402
+from models import Dataset, License, Transaction, User  # noqa: E402
+
+# Postgres: "Seq Scan on licenses"; SQLite: "SCAN licenses" (index use shows as "SEARCH ... USING INDEX"
+# or "SCAN ... USING INDEX" for ordered index walks)
+_PG_SEQ_SCAN = re.compile(r"Seq Scan on (\w+)")
+_SQLITE_SCAN = re.compile(r"\bSCAN (\w+)(?! USING (?:COVERING )?INDEX)(?:\s|$)")
+
+
+def _sample_values(connection):
+    """Pick realistic parameter values from the seeded data"""
+    row = connection.execute(select(User.id, User.wallet_address).order_by(User.id).limit(1)).first()
+    category = connection.execute(select(Dataset.category).limit(1)).scalar()
+    dataset_id = connection.execute(select(Dataset.id).order_by(Dataset.id).limit(1)).scalar()
+    if row is None or dataset_id is None:
+        raise SystemExit("Database is empty; seed it with datagen.py first")
+    return {"user_id": row.id, "wallet": row.wallet_address, "category": category, "dataset_id": dataset_id}
+
+
+def hot_queries(v):
+    """The lookups the API issues on its hot paths"""
+    return {
+        "user by wallet": select(User).where(User.wallet_address == v["wallet"]),
+        "user licenses": select(License).where(License.user_id == v["user_id"]),
+        "license check": select(License.id).where(
+            License.user_id == v["user_id"], License.dataset_id == v["dataset_id"]
+        ),
+        "active user licenses": select(License).where(License.user_id == v["user_id"], License.is_active),
+        "license expiry sweep": select(License.id)
+            .where(License.is_active, License.expires_at.is_not(None), License.expires_at <= func.now())
+            .order_by(License.expires_at)
+            .limit(1000),
+        "dataset licenses by period": select(License)
+            .where(License.dataset_id == v["dataset_id"])
+            .order_by(License.purchased_at.desc()),
+        "owned datasets": select(Dataset)
+            .where(Dataset.owner_id == v["user_id"])
+            .order_by(Dataset.created_at.desc()),
+        "catalog first page": select(Dataset)
+            .order_by(Dataset.created_at.desc())
+            .limit(50),
+        "category page": select(Dataset)
+            .where(Dataset.category == v["category"])
+            .order_by(Dataset.created_at.desc())
+            .limit(50),
+        "ledger sent": select(Transaction)
+            .where(Transaction.from_address == v["wallet"])
+            .order_by(Transaction.created_at.desc())
+            .limit(50),
+        "ledger received": select(Transaction)
+            .where(Transaction.to_address == v["wallet"])
+            .order_by(Transaction.created_at.desc())
+            .limit(50),
+        "ledger recent": select(Transaction)
+            .order_by(Transaction.created_at.desc())
+            .limit(50),
+    }
+
+
+def explain(connection, statement) -> str:
+    # Bound rather than literal parameters: binary address/hash values have no literal form
+    compiled = statement.compile(dialect=engine.dialect.__class__(paramstyle="named"))
+    params = [bindparam(name, bind.effective_value, type_=bind.type) for bind, name in compiled.bind_names.items()]
+    if engine.dialect.name == "postgresql":
+        rows = connection.execute(text(f"EXPLAIN {compiled}").bindparams(*params)).fetchall()
+        return "\n".join(row[0] for row in rows)
+    if engine.dialect.name == "sqlite":
+        rows = connection.execute(text(f"EXPLAIN QUERY PLAN {compiled}").bindparams(*params)).fetchall()
+        return "\n".join(row[-1] for row in rows)
+    raise SystemExit(f"Unsupported dialect: {engine.dialect.name}")
+
+
+def sequential_scans(plan: str):
+    pattern = _PG_SEQ_SCAN if engine.dialect.name == "postgresql" else _SQLITE_SCAN
+    return [match.group(1) for line in plan.splitlines() for match in [pattern.search(line)] if match]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fail if a hot query plans a sequential scan")
+    parser.add_argument("--generate", help="Run datagen.py with these arguments first")
+    parser.add_argument("--verbose", action="store_true", help="Print every plan")
+    args = parser.parse_args(argv)
+
+    if args.generate is not None:
+        subprocess.run([sys.executable, "datagen.py", "--truncate", *shlex.split(args.generate)], cwd=ROOT, check=True)
+
+    failures = []
+    with engine.connect() as connection:
+        values = _sample_values(connection)
+        for name, statement in hot_queries(values).items():
+            plan = explain(connection, statement)
+            scans = sequential_scans(plan)
+            status = "❌" if scans else "✅"
+            print(f"{status} {name}" + (f" (sequential scan on {', '.join(scans)})" if scans else ""))
+            if args.verbose or scans:
+                print("   " + plan.replace("\n", "\n   "))
+            if scans:
+                failures.append(name)
+
+    if failures:
+        noun = "query plans" if len(failures) == 1 else "queries plan"
+        print(f"\n{len(failures)} hot {noun} a sequential scan", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
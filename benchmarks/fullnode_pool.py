@@ -0,0 +1,156 @@
+"""
+Fullnode Pool Benchmark
+Starts local mock fullnodes (one with a heavy latency tail), then drives balance reads
+through FullnodePool and reports p50/p95/p99 for:
+    single     the tail-heavy node alone (today's single APTOS_NODE_URL setup)
+    pool       every node, with routing by latency and p95 hedging
+    failover   the pool while its fastest node starts failing every request
+
+Usage:
+    python benchmarks/fullnode_pool.py --reads 2000 --concurrency 20
+    python benchmarks/fullnode_pool.py --slow-rate 0.1 --slow-ms 1000 --output pool.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from aptos_sdk.account_address import AccountAddress  # noqa: E402
+from prometheus_client import REGISTRY  # noqa: E402
+
+from fullnode_pool import FullnodePool  # noqa: E402
+from load_test import percentile  # noqa: E402
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_node(latency_ms: float, jitter_ms: float, slow_rate: float = 0.0, slow_ms: float = 0.0):
+    """Launch a mock fullnode; returns (process, base URL)"""
+    port = _free_port()
+    proc = subprocess.Popen(
+        [
+            sys.executable, os.path.join(ROOT, "benchmarks", "mock_aptos.py"), "--port", str(port),
+            "--latency-ms", str(latency_ms), "--jitter-ms", str(jitter_ms),
+            "--slow-rate", str(slow_rate), "--slow-ms", str(slow_ms),
+        ],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 15
+    while time.time() < deadline:
+        try:
+            httpx.get(url + "/", timeout=1)
+            return proc, url
+        except httpx.HTTPError:
+            time.sleep(0.05)
+    proc.terminate()
+    raise TimeoutError(f"mock node on port {port} did not start")
+
+
+async def drive(pool: FullnodePool, operation: str, reads: int, concurrency: int, on_progress=None):
+    """Run `reads` balance reads with `concurrency` workers; returns (sorted latencies ms, errors)"""
+    address = AccountAddress.from_str_relaxed("0xabc")
+    samples, errors = [], 0
+    remaining = iter(range(reads))
+
+    async def worker():
+        nonlocal errors
+        for index in remaining:
+            if on_progress:
+                await on_progress(index)
+            start = time.perf_counter()
+            try:
+                await pool.read(operation, lambda client: client.account_balance(address))
+                samples.append((time.perf_counter() - start) * 1000)
+            except Exception:
+                errors += 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return sorted(samples), errors
+
+
+def summarize(samples, errors: int, operation: str, pool: FullnodePool) -> dict:
+    hedges = REGISTRY.get_sample_value("aptos_fullnode_hedged_reads_total", {"operation": operation}) or 0
+    return {
+        "reads": len(samples) + errors,
+        "errors": errors,
+        "hedged": int(hedges),
+        "p50_ms": round(percentile(samples, 50), 2),
+        "p95_ms": round(percentile(samples, 95), 2),
+        "p99_ms": round(percentile(samples, 99), 2),
+        "nodes": pool.snapshot(),
+    }
+
+
+async def run(args) -> dict:
+    nodes = [
+        start_node(args.latency_ms, args.jitter_ms),
+        start_node(args.latency_ms, args.jitter_ms, args.slow_rate, args.slow_ms),
+        start_node(args.latency_ms * 1.5, args.jitter_ms),
+    ]
+    urls = [url + "/v1" for _, url in nodes]
+    report = {}
+    try:
+        single = FullnodePool([urls[1]])
+        report["single"] = summarize(*await drive(single, "single", args.reads, args.concurrency), "single", single)
+        await single.close()
+
+        pool = FullnodePool(urls)
+        report["pool"] = summarize(*await drive(pool, "pool", args.reads, args.concurrency), "pool", pool)
+        await pool.close()
+
+        # Halfway through, the currently preferred node starts failing every request
+        pool = FullnodePool(urls)
+        failing = {}
+
+        async def degrade(index):
+            if index == args.reads // 2 and not failing:
+                failing["url"] = pool.best().url
+                async with httpx.AsyncClient() as client:
+                    await client.post(failing["url"].removesuffix("/v1") + "/_mock/config", json={"error_rate": 1})
+
+        report["failover"] = summarize(*await drive(pool, "failover", args.reads, args.concurrency, degrade), "failover", pool)
+        report["failover"]["failed_node"] = failing.get("url")
+        await pool.close()
+    finally:
+        for proc, _ in nodes:
+            proc.terminate()
+            proc.wait()
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare one fullnode with a hedged, load-balanced pool")
+    parser.add_argument("--reads", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=10)
+    parser.add_argument("--jitter-ms", type=float, default=3)
+    parser.add_argument("--slow-rate", type=float, default=0.05, help="Share of slow responses on the degraded node")
+    parser.add_argument("--slow-ms", type=float, default=500)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args))
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,324 @@
+"""
+End-to-End Load Test
+Starts the API against a local database and the mock Aptos node, drives a weighted
+mix of marketplace traffic and reports throughput and p50/p95/p99 per endpoint as JSON.
+
+Usage:
+    python benchmarks/load_test.py --concurrency 50 --duration 30 --output run.json
+    python benchmarks/load_test.py --baseline baseline.json --max-regression 0.15
+    python benchmarks/load_test.py --datagen "--datasets 100000 --licenses 1000000"
+    python benchmarks/load_test.py --app-url http://127.0.0.1:8000  # reuse a running server
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shlex
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MIX = "browse=30,category=15,search=15,detail=15,purchase=5,balance=15,licenses=3,transaction=2"
+SEARCH_TERMS = ["data", "climate", "image", "market", "text", "sensor", "protein", "satellite"]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _random_hex(rng: random.Random, length: int = 64) -> str:
+    return "0x" + "".join(rng.choices("0123456789abcdef", k=length))
+
+
+def parse_mix(spec: str) -> dict:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight)
+    unknown = set(mix) - set(SCENARIOS)
+    if unknown:
+        raise SystemExit(f"Unknown scenarios in --mix: {', '.join(sorted(unknown))}")
+    return mix
+
+
+def percentile(sorted_samples, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_samples:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_samples))))
+    return sorted_samples[min(rank, len(sorted_samples)) - 1]
+
+
+class Workload:
+    """Shared state the scenarios draw from (dataset ids, wallets, categories)"""
+
+    def __init__(self, rng: random.Random, wallets: int):
+        self.rng = rng
+        self.dataset_ids = []
+        self.categories = []
+        self.wallets = [_random_hex(rng) for _ in range(wallets)]
+
+    async def discover(self, client: httpx.AsyncClient):
+        datasets = (await client.get("/api/datasets/")).json()
+        self.dataset_ids = [ds["id"] for ds in datasets]
+        self.categories = (await client.get("/api/datasets/categories")).json()
+        if not self.dataset_ids:
+            raise SystemExit("No datasets found; seed the database first")
+
+
+# Each scenario returns (endpoint label, request coroutine)
+def _browse(w, c):
+    return "GET /api/datasets/", c.get("/api/datasets/")
+
+
+def _category(w, c):
+    return "GET /api/datasets/?category", c.get("/api/datasets/", params={"category": w.rng.choice(w.categories)})
+
+
+def _search(w, c):
+    return "GET /api/datasets/?search", c.get("/api/datasets/", params={"search": w.rng.choice(SEARCH_TERMS)})
+
+
+def _detail(w, c):
+    return "GET /api/datasets/{id}", c.get(f"/api/datasets/{w.rng.choice(w.dataset_ids)}")
+
+
+def _purchase(w, c):
+    body = {
+        "dataset_id": w.rng.choice(w.dataset_ids),
+        "user_wallet": w.rng.choice(w.wallets),
+        "license_type": w.rng.choice([0, 1, 2]),
+        "duration_days": w.rng.choice([None, 30, 365]),
+    }
+    return "POST /api/datasets/purchase", c.post("/api/datasets/purchase", json=body)
+
+
+def _balance(w, c):
+    return "GET /aptos/account/balance/{address}", c.get(f"/aptos/account/balance/{w.rng.choice(w.wallets)}")
+
+
+def _licenses(w, c):
+    return "GET /api/datasets/user/{wallet}/licenses", c.get(f"/api/datasets/user/{w.rng.choice(w.wallets)}/licenses")
+
+
+def _transaction(w, c):
+    return "GET /aptos/transaction/{tx_hash}", c.get(f"/aptos/transaction/{_random_hex(w.rng)}")
+
+
+SCENARIOS = {
+    "browse": _browse,
+    "category": _category,
+    "search": _search,
+    "detail": _detail,
+    "purchase": _purchase,
+    "balance": _balance,
+    "licenses": _licenses,
+    "transaction": _transaction,
+}
+
+
+async def run_load(base_url: str, mix: dict, concurrency: int, duration: float, warmup: float, seed: int, wallets: int):
+    rng = random.Random(seed)
+    workload = Workload(rng, wallets)
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        await workload.discover(client)
+
+        record_from = time.perf_counter() + warmup
+        deadline = record_from + duration
+
+        async def worker():
+            while True:
+                now = time.perf_counter()
+                if now >= deadline:
+                    return
+                label, request = SCENARIOS[rng.choices(names, weights)[0]](workload, client)
+                start = time.perf_counter()
+                try:
+                    response = await request
+                    failed = response.status_code >= 400
+                except httpx.HTTPError:
+                    failed = True
+                elapsed = time.perf_counter() - start
+                if start >= record_from:
+                    latencies[label].append(elapsed * 1000)
+                    if failed:
+                        errors[label] += 1
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    endpoints = {}
+    all_samples = []
+    for label, samples in sorted(latencies.items()):
+        samples.sort()
+        all_samples.extend(samples)
+        endpoints[label] = {
+            "requests": len(samples),
+            "errors": errors[label],
+            "throughput_rps": round(len(samples) / duration, 2),
+            "mean_ms": round(sum(samples) / len(samples), 3),
+            "p50_ms": round(percentile(samples, 50), 3),
+            "p95_ms": round(percentile(samples, 95), 3),
+            "p99_ms": round(percentile(samples, 99), 3),
+        }
+    all_samples.sort()
+    total = {
+        "requests": len(all_samples),
+        "errors": sum(errors.values()),
+        "throughput_rps": round(len(all_samples) / duration, 2),
+        "p50_ms": round(percentile(all_samples, 50), 3),
+        "p95_ms": round(percentile(all_samples, 95), 3),
+        "p99_ms": round(percentile(all_samples, 99), 3),
+    }
+    return {"endpoints": endpoints, "total": total}
+
+
+def compare(report: dict, baseline: dict, max_regression: float) -> list:
+    """Return human-readable regressions of p95 latency or throughput beyond the tolerance"""
+    regressions = []
+    for label, current in report["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(label)
+        if not before:
+            continue
+        if before["p95_ms"] and current["p95_ms"] > before["p95_ms"] * (1 + max_regression):
+            regressions.append(f"{label}: p95 {before['p95_ms']}ms -> {current['p95_ms']}ms")
+        if before["throughput_rps"] and current["throughput_rps"] < before["throughput_rps"] * (1 - max_regression):
+            regressions.append(f"{label}: throughput {before['throughput_rps']} -> {current['throughput_rps']} rps")
+    return regressions
+
+
+def _wait_until_up(url: str, timeout: float = 30.0):
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        try:
+            if httpx.get(url, timeout=1).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.05)
+    raise SystemExit(f"{url} did not come up within {timeout}s")
+
+
+def start_stack(args, env: dict):
+    """Start the mock Aptos node and the API, returning (base_url, processes)"""
+    processes = []
+    mock_port = _free_port()
+    mock_env = dict(env, MOCK_APTOS_LATENCY_MS=str(args.aptos_latency_ms), MOCK_APTOS_JITTER_MS=str(args.aptos_jitter_ms))
+    processes.append(subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.mock_aptos:app", "--port", str(mock_port), "--log-level", "warning"],
+        cwd=ROOT, env=mock_env,
+    ))
+    _wait_until_up(f"http://127.0.0.1:{mock_port}/v1")
+
+    env["APTOS_NODE_URL"] = f"http://127.0.0.1:{mock_port}/v1"
+    env["APTOS_FAUCET_URL"] = f"http://127.0.0.1:{mock_port}"
+    # Every simulated user shares one client IP; measure capacity, not the per-IP limits
+    env.setdefault("RATE_LIMIT_ENABLED", "false")
+
+    if args.datagen is not None:
+        subprocess.run(
+            [sys.executable, "datagen.py", "--truncate", *shlex.split(args.datagen)],
+            cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL,
+        )
+    elif not args.skip_seed:
+        subprocess.run([sys.executable, "seed.py"], cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+
+    app_port = _free_port()
+    processes.append(subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(app_port), "--log-level", "warning",
+         "--workers", str(args.workers)],
+        cwd=ROOT, env=env,
+    ))
+    base_url = f"http://127.0.0.1:{app_port}"
+    _wait_until_up(f"{base_url}/health")
+    return base_url, processes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the Valynce API")
+    parser.add_argument("--app-url", help="Benchmark an already running server instead of starting one")
+    parser.add_argument("--database-url", help="Defaults to a throwaway SQLite file")
+    parser.add_argument("--skip-seed", action="store_true", help="Use the database as-is")
+    parser.add_argument("--datagen", help='Load synthetic data instead of seed.py, e.g. "--datasets 100000 --licenses 1000000"')
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the started API")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=20.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Unmeasured seconds before recording")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Scenario weights, e.g. browse=50,detail=50")
+    parser.add_argument("--wallets", type=int, default=200, help="Distinct buyer wallets to simulate")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--aptos-latency-ms", type=float, default=20.0)
+    parser.add_argument("--aptos-jitter-ms", type=float, default=10.0)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--baseline", help="JSON report to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.10, help="Tolerated relative regression")
+    args = parser.parse_args(argv)
+
+    mix = parse_mix(args.mix)
+    processes = []
+    tmpdir = None
+    try:
+        if args.app_url:
+            base_url = args.app_url
+        else:
+            env = dict(os.environ)
+            if args.database_url:
+                env["DATABASE_URL"] = args.database_url
+            else:
+                tmpdir = tempfile.TemporaryDirectory()
+                env["DATABASE_URL"] = f"sqlite:///{tmpdir.name}/loadtest.db"
+            base_url, processes = start_stack(args, env)
+
+        results = asyncio.run(run_load(
+            base_url, mix, args.concurrency, args.duration, args.warmup, args.seed, args.wallets
+        ))
+    finally:
+        for proc in reversed(processes):
+            proc.terminate()
+            proc.wait()
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+    report = {
+        "config": {
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "workers": args.workers,
+            "mix": mix,
+            "seed": args.seed,
+            "aptos_latency_ms": args.aptos_latency_ms,
+        },
+        **results,
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.max_regression)
+        for line in regressions:
+            print(f"❌ regression {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
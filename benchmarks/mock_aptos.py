@@ -0,0 +1,146 @@
+"""
+Mock Aptos Fullnode and Faucet
+A local stand-in that speaks just enough of the fullnode REST API for AptosService
+
+Usage:
+    python benchmarks/mock_aptos.py --port 8081 --latency-ms 20 --jitter-ms 10 --error-rate 0.01
+    python benchmarks/mock_aptos.py --port 8082 --slow-rate 0.05 --slow-ms 800  # heavy tail
+
+Point the API at it with APTOS_NODE_URL=http://127.0.0.1:8081/v1 and
+APTOS_FAUCET_URL=http://127.0.0.1:8081. POST /_mock/config with any of latency_ms,
+jitter_ms, error_rate, slow_rate, slow_ms changes the behaviour of a running node.
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import random
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+# Behaviour knobs, read from the environment so uvicorn workers pick them up
+LATENCY_MS = float(os.getenv("MOCK_APTOS_LATENCY_MS", "0"))
+JITTER_MS = float(os.getenv("MOCK_APTOS_JITTER_MS", "0"))
+ERROR_RATE = float(os.getenv("MOCK_APTOS_ERROR_RATE", "0"))
+# A share of requests takes SLOW_MS extra (tail latency of a degraded node)
+SLOW_RATE = float(os.getenv("MOCK_APTOS_SLOW_RATE", "0"))
+SLOW_MS = float(os.getenv("MOCK_APTOS_SLOW_MS", "1000"))
+DEFAULT_BALANCE = int(os.getenv("MOCK_APTOS_DEFAULT_BALANCE", "500000000"))
+
+app = FastAPI(title="Mock Aptos Node")
+
+balances = {}
+transactions = {}
+ledger = {"version": 1000}
+
+
+def _normalize(address: str) -> str:
+    return "0x" + address.lower().removeprefix("0x").rjust(64, "0")
+
+
+@app.middleware("http")
+async def simulate_network(request: Request, call_next):
+    """Inject configurable latency and failures"""
+    if request.url.path.startswith("/_mock/"):
+        return await call_next(request)
+    delay = LATENCY_MS + random.uniform(-JITTER_MS, JITTER_MS)
+    if SLOW_RATE and random.random() < SLOW_RATE:
+        delay += SLOW_MS
+    if delay > 0:
+        await asyncio.sleep(delay / 1000)
+    if ERROR_RATE and random.random() < ERROR_RATE:
+        return JSONResponse({"message": "injected failure", "error_code": "internal_error"}, status_code=503)
+    return await call_next(request)
+
+
+@app.post("/_mock/config")
+async def configure(request: Request):
+    """Change latency/failure knobs at runtime (e.g. to degrade one node mid-test)"""
+    global LATENCY_MS, JITTER_MS, ERROR_RATE, SLOW_RATE, SLOW_MS
+    knobs = await request.json()
+    LATENCY_MS = float(knobs.get("latency_ms", LATENCY_MS))
+    JITTER_MS = float(knobs.get("jitter_ms", JITTER_MS))
+    ERROR_RATE = float(knobs.get("error_rate", ERROR_RATE))
+    SLOW_RATE = float(knobs.get("slow_rate", SLOW_RATE))
+    SLOW_MS = float(knobs.get("slow_ms", SLOW_MS))
+    return {"latency_ms": LATENCY_MS, "jitter_ms": JITTER_MS, "error_rate": ERROR_RATE, "slow_rate": SLOW_RATE, "slow_ms": SLOW_MS}
+
+
+@app.get("/v1")
+async def ledger_info():
+    ledger["version"] += 1
+    return {
+        "chain_id": 4,
+        "epoch": "1",
+        "ledger_version": str(ledger["version"]),
+        "ledger_timestamp": "0",
+        "node_role": "full_node",
+        "block_height": str(ledger["version"] // 2),
+    }
+
+
+@app.post("/v1/view")
+async def view(request: Request):
+    # 0x1::coin::balance takes the account address as the last BCS argument (32 raw bytes)
+    body = await request.body()
+    address = "0x" + body[-32:].hex()
+    return [str(balances.get(address, DEFAULT_BALANCE))]
+
+
+@app.get("/v1/accounts/{address}")
+async def account(address: str):
+    return {"sequence_number": "0", "authentication_key": _normalize(address)}
+
+
+@app.get("/v1/transactions/by_hash/{tx_hash}")
+async def transaction_by_hash(tx_hash: str):
+    # Any hash we did not mint ourselves is reported as an already committed transaction
+    return transactions.get(tx_hash) or {
+        "type": "user_transaction",
+        "hash": tx_hash,
+        "version": str(ledger["version"]),
+        "success": True,
+        "vm_status": "Executed successfully",
+        "gas_used": "12",
+    }
+
+
+@app.post("/mint")
+async def mint(amount: int, address: str):
+    address = _normalize(address)
+    balances[address] = balances.get(address, DEFAULT_BALANCE) + amount
+    ledger["version"] += 1
+    tx_hash = "0x" + hashlib.sha256(f"{address}{amount}{ledger['version']}".encode()).hexdigest()
+    transactions[tx_hash] = {
+        "type": "user_transaction",
+        "hash": tx_hash,
+        "version": str(ledger["version"]),
+        "success": True,
+        "vm_status": "Executed successfully",
+        "gas_used": "9",
+    }
+    return [tx_hash]
+
+
+@app.get("/", response_class=PlainTextResponse)
+async def faucet_health():
+    return "tap:ok"
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run a mock Aptos fullnode + faucet")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency-ms", type=float, default=LATENCY_MS)
+    parser.add_argument("--jitter-ms", type=float, default=JITTER_MS)
+    parser.add_argument("--error-rate", type=float, default=ERROR_RATE)
+    parser.add_argument("--slow-rate", type=float, default=SLOW_RATE)
+    parser.add_argument("--slow-ms", type=float, default=SLOW_MS)
+    args = parser.parse_args()
+
+    LATENCY_MS, JITTER_MS, ERROR_RATE = args.latency_ms, args.jitter_ms, args.error_rate
+    SLOW_RATE, SLOW_MS = args.slow_rate, args.slow_ms
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,107 @@
+"""
+Startup Benchmark
+Measures `import main` time and time to first successful request of a fresh worker
+
+Usage:
+    python benchmarks/startup.py --runs 5 --output startup.json
+    python benchmarks/startup.py --max-import-ms 800 --max-first-request-ms 2000
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_import(env: dict) -> float:
+    """Wall time of importing the app module in a fresh interpreter, in ms"""
+    code = "import time; t = time.perf_counter(); import main; print((time.perf_counter() - t) * 1000)"
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def measure_first_request(env: dict, path: str, timeout: float) -> float:
+    """Time from spawning uvicorn until `path` answers 2xx, in ms"""
+    port = _free_port()
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        url = f"http://127.0.0.1:{port}{path}"
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if 200 <= response.status < 300:
+                        return (time.perf_counter() - start) * 1000
+            except (urllib.error.URLError, ConnectionError, OSError):
+                time.sleep(0.005)
+        raise TimeoutError(f"{path} did not answer within {timeout}s")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def summarize(samples):
+    return {
+        "runs": len(samples),
+        "min_ms": round(min(samples), 2),
+        "median_ms": round(statistics.median(samples), 2),
+        "max_ms": round(max(samples), 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure Valynce API cold-start time")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--path", default="/", help="Route used as the first request")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--max-import-ms", type=float, help="Fail if median import time exceeds this")
+    parser.add_argument("--max-first-request-ms", type=float, help="Fail if median time to first request exceeds this")
+    args = parser.parse_args(argv)
+
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", "sqlite:///./benchmark.db")
+
+    imports = [measure_import(env) for _ in range(args.runs)]
+    first_requests = [measure_first_request(env, args.path, args.timeout) for _ in range(args.runs)]
+    report = {
+        "import": summarize(imports),
+        "first_request": summarize(first_requests),
+    }
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+    failed = False
+    if args.max_import_ms is not None and report["import"]["median_ms"] > args.max_import_ms:
+        print(f"❌ import time {report['import']['median_ms']}ms > {args.max_import_ms}ms", file=sys.stderr)
+        failed = True
+    if args.max_first_request_ms is not None and report["first_request"]["median_ms"] > args.max_first_request_ms:
+        print(f"❌ first request {report['first_request']['median_ms']}ms > {args.max_first_request_ms}ms", file=sys.stderr)
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
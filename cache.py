@@ -0,0 +1,128 @@
+"""
+Shared Cache Backends
+Process-local LRU or a Redis-compatible server, selected by CACHE_URL
+"""
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+class CacheBackend(ABC):
+    """Async key/value cache with per-key TTLs; values must be JSON-serializable"""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Any]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        """Store a value for `ttl` seconds (0 expires it right away in every backend)"""
+
+    @abstractmethod
+    async def delete(self, *keys: str) -> None:
+        ...
+
+    @abstractmethod
+    async def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        """Atomically add to an integer counter, creating it at 0 (TTL applies on creation)"""
+
+    async def close(self) -> None:
+        pass
+
+
+class InMemoryCache(CacheBackend):
+    """Bounded LRU local to one worker process"""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def _live(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires is not None and expires < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _store(self, key: str, value: Any, ttl: Optional[float]):
+        self._entries[key] = (time.monotonic() + ttl if ttl is not None else None, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._live(key)
+        return entry[1] if entry else None
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        self._store(key, value, ttl)
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._entries.pop(key, None)
+
+    async def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        entry = self._live(key)
+        if entry is None:
+            value = amount
+            self._store(key, value, ttl)
+        else:
+            value = entry[1] + amount
+            self._entries[key] = (entry[0], value)
+        return value
+
+
+class RedisCache(CacheBackend):
+    """Redis (or any RESP-compatible server such as Valkey or a local stand-in)"""
+
+    def __init__(self, url: str, prefix: str = "valynce:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("CACHE_URL points at Redis but the 'redis' package is not installed") from e
+        self.prefix = prefix
+        self.client = redis.Redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = await self.client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        await self.client.set(self.prefix + key, json.dumps(value, default=str), px=max(1, int(ttl * 1000)))
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self.client.delete(*(self.prefix + key for key in keys))
+
+    async def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        full_key = self.prefix + key
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.incrby(full_key, amount)
+            if ttl is not None:
+                pipe.pexpire(full_key, max(1, int(ttl * 1000)), nx=True)
+            value, *_ = await pipe.execute()
+        return int(value)
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+def build_cache(url: Optional[str] = None) -> CacheBackend:
+    """Create the backend for CACHE_URL (memory:// by default, redis:// or rediss:// for shared)"""
+    url = url or os.getenv("CACHE_URL", "memory://")
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisCache(url, prefix=os.getenv("CACHE_PREFIX", "valynce:"))
+    if url.startswith("memory://"):
+        return InMemoryCache(int(os.getenv("CACHE_MAX_ENTRIES", "10000")))
+    raise ValueError(f"Unsupported CACHE_URL: {url}")
+
+
+# Singleton instance
+cache = build_cache()
@@ -0,0 +1,219 @@
+"""
+Response Compression Middleware
+Negotiates brotli/gzip from Accept-Encoding and keeps compressed bytes of hot responses in memory
+"""
+import hashlib
+import os
+import zlib
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+# Responses we never compress (SSE must be flushed event by event)
+EXCLUDED_CONTENT_TYPES = ("text/event-stream",)
+
+# Cacheable GET responses whose compressed bytes are kept in memory
+DEFAULT_HOT_PATHS = ("/api/datasets/", "/api/datasets/categories")
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick the best supported encoding from an Accept-Encoding header"""
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[token] = q
+
+    wildcard = accepted.get("*", 0.0)
+    best, best_q = None, 0.0
+    # Prefer brotli on ties: smaller output for repetitive JSON
+    for encoding in ("br", "gzip"):
+        if encoding == "br" and brotli is None:
+            continue
+        q = accepted.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(body: bytes, encoding: str, gzip_level: int = 6, brotli_quality: int = 4) -> bytes:
+    """Compress a complete body with the given encoding"""
+    if encoding == "br":
+        return brotli.compress(body, quality=brotli_quality)
+    compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+    return compressor.compress(body) + compressor.flush()
+
+
+class _StreamCompressor:
+    """Incremental compressor for streaming responses"""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+            self._zlib = None
+        else:
+            self._brotli = None
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def feed(self, chunk: bytes, final: bool) -> bytes:
+        if self._brotli is not None:
+            out = self._brotli.process(chunk)
+            return out + (self._brotli.finish() if final else self._brotli.flush())
+        out = self._zlib.compress(chunk)
+        return out + self._zlib.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class PrecompressedCache:
+    """Bounded LRU of compressed bodies keyed by (path, encoding, body digest)
+
+    Keying on the digest of the uncompressed body means an entry can never
+    serve stale bytes: a changed payload simply misses and is recompressed.
+    """
+
+    def __init__(self, max_entries: int = 128):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str, bytes], bytes]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compress(self, path: str, encoding: str, body: bytes, **levels) -> bytes:
+        key = (path, encoding, hashlib.blake2b(body, digest_size=16).digest())
+        cached = self._entries.get(key)
+        if cached is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return cached
+
+        self.misses += 1
+        compressed = compress(body, encoding, **levels)
+        self._entries[key] = compressed
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return compressed
+
+    def clear(self):
+        self._entries.clear()
+
+
+class CompressionMiddleware:
+    """Pure ASGI middleware applying brotli/gzip above a minimum body size"""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        hot_paths: Iterable[str] = DEFAULT_HOT_PATHS,
+        cache_entries: int = 128,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.levels = {"gzip_level": gzip_level, "brotli_quality": brotli_quality}
+        self.hot_paths = frozenset(hot_paths)
+        self.cache = PrecompressedCache(cache_entries)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        cacheable = scope["method"] == "GET" and scope["path"] in self.hot_paths
+        start_message: Optional[Message] = None
+        passthrough = False
+        streamer: Optional[_StreamCompressor] = None
+
+        async def send_compressed(message: Message):
+            nonlocal start_message, passthrough, streamer
+
+            if message["type"] == "http.response.start":
+                # Hold the headers until we know whether the body gets compressed
+                start_message = message
+                headers = Headers(raw=message["headers"])
+                passthrough = (
+                    "content-encoding" in headers
+                    or headers.get("content-type", "").startswith(EXCLUDED_CONTENT_TYPES)
+                )
+                return
+
+            if message["type"] != "http.response.body":
+                if start_message is not None:
+                    await send(start_message)
+                    start_message = None
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if passthrough:
+                if start_message is not None:
+                    await send(start_message)
+                    start_message = None
+                await send(message)
+                return
+
+            if streamer is not None:
+                # Remaining chunks of a streaming response
+                message["body"] = streamer.feed(body, final=not more_body)
+                await send(message)
+                return
+
+            headers = MutableHeaders(raw=start_message["headers"])
+            headers.add_vary_header("Accept-Encoding")
+
+            if not more_body:
+                # Complete body in a single message
+                if len(body) >= self.minimum_size:
+                    if cacheable and start_message["status"] == 200:
+                        body = self.cache.get_or_compress(scope["path"], encoding, body, **self.levels)
+                    else:
+                        body = compress(body, encoding, **self.levels)
+                    headers["Content-Encoding"] = encoding
+                    headers["Content-Length"] = str(len(body))
+                    message["body"] = body
+            else:
+                # First chunk of a streaming response
+                streamer = _StreamCompressor(encoding, **self.levels)
+                headers["Content-Encoding"] = encoding
+                del headers["Content-Length"]
+                message["body"] = streamer.feed(body, final=False)
+
+            await send(start_message)
+            start_message = None
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
+
+
+def compression_settings() -> dict:
+    """Read compression settings from the environment"""
+    hot_paths = os.getenv("COMPRESSION_HOT_PATHS")
+    return {
+        "minimum_size": int(os.getenv("COMPRESSION_MIN_SIZE", "1024")),
+        "gzip_level": int(os.getenv("COMPRESSION_GZIP_LEVEL", "6")),
+        "brotli_quality": int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4")),
+        "hot_paths": [p.strip() for p in hot_paths.split(",") if p.strip()] if hot_paths else DEFAULT_HOT_PATHS,
+        "cache_entries": int(os.getenv("COMPRESSION_CACHE_ENTRIES", "128")),
+    }
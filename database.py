@@ -1,8 +1,17 @@
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from dotenv import load_dotenv
+from cache import InMemoryCache, cache
+from db_types import WalletAddress
+import json
+import logging
 import os
+import time
+
+logger = logging.getLogger("valynce.db")
 
 # Load environment variables
 load_dotenv()
@@ -13,20 +22,168 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL environment variable is not set")
 
-# Create SQLAlchemy engine
-engine = create_engine(
-    DATABASE_URL,
-    pool_pre_ping=True,  # Verify connections before using them
-    pool_size=10,
-    max_overflow=20
-)
+# Optional read replica for catalog reads (falls back to the primary)
+READ_REPLICA_URL = os.getenv("READ_REPLICA_URL")
+
+# Seconds a writer's reads stay on the primary so they see their own writes despite replica lag
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+
+def _env_flag(name, default="false"):
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+# Workers per instance (uvicorn/gunicorn honour WEB_CONCURRENCY); every worker owns its own pools
+WORKER_COUNT = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+# Postgres max_connections budget per instance, used to size and validate the pools
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "0")) or None
+DB_CONNECTION_BUDGET = float(os.getenv("DB_CONNECTION_BUDGET", "0.8"))  # share of max_connections we may use
+
+# PgBouncer (transaction pooling) mode: no client-side pool, no server-side prepared statements
+DB_PGBOUNCER = _env_flag("DB_PGBOUNCER")
+
+def _pool_sizes():
+    """Pool size and overflow per worker: explicit, or derived from the connection budget"""
+    pool_size = os.getenv("DB_POOL_SIZE", "auto" if DB_MAX_CONNECTIONS else "10")
+    max_overflow = os.getenv("DB_MAX_OVERFLOW", "auto" if DB_MAX_CONNECTIONS else "20")
+    if "auto" in (pool_size, max_overflow):
+        if not DB_MAX_CONNECTIONS:
+            raise ValueError("DB_POOL_SIZE/DB_MAX_OVERFLOW=auto requires DB_MAX_CONNECTIONS")
+        # The replica is a separate server with its own max_connections, so it shares these sizes
+        per_worker = max(2, int(DB_MAX_CONNECTIONS * DB_CONNECTION_BUDGET) // WORKER_COUNT)
+        auto_size = max(1, per_worker // 2)
+        pool_size = auto_size if pool_size == "auto" else int(pool_size)
+        max_overflow = max(0, per_worker - pool_size) if max_overflow == "auto" else int(max_overflow)
+    return int(pool_size), int(max_overflow)
+
+DB_POOL_SIZE, DB_MAX_OVERFLOW = _pool_sizes()
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds before a connection is replaced
+DB_POOL_PRE_PING = _env_flag("DB_POOL_PRE_PING", "true")
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+DB_CHECKOUT_WARN_MS = float(os.getenv("DB_CHECKOUT_WARN_MS", "100"))
+
+# Observers called with (pool name, seconds) for each pool checkout (metrics, logging)
+checkout_wait_observers = []
+
+def _log_slow_checkout(name, waited):
+    if waited * 1000 >= DB_CHECKOUT_WARN_MS:
+        logger.warning(json.dumps({
+            "event": "slow_pool_checkout",
+            "pool": name,
+            "wait_ms": round(waited * 1000, 2),
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+        }))
+
+checkout_wait_observers.append(_log_slow_checkout)
 
-# Create SessionLocal class
+def _timed_raw_connection(name, raw_connection):
+    """Wrap Engine.raw_connection to time every pool checkout"""
+    def checkout():
+        start = time.perf_counter()
+        try:
+            return raw_connection()
+        finally:
+            waited = time.perf_counter() - start
+            for observer in checkout_wait_observers:
+                observer(name, waited)
+    return checkout
+
+def _engine_options(url):
+    """Pool and driver options for an engine, from the environment"""
+    backend = make_url(url).get_backend_name()
+    driver = make_url(url).get_driver_name()
+    connect_args = {}
+    options = {"pool_pre_ping": DB_POOL_PRE_PING}  # Verify connections before using them
+
+    if DB_PGBOUNCER:
+        # PgBouncer owns pooling; a client pool on top would pin server connections
+        options["poolclass"] = NullPool
+        if driver == "psycopg":
+            connect_args["prepare_threshold"] = None  # psycopg 3 prepares statements by default
+        # psycopg2 never uses server-side prepared statements
+    else:
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+        )
+        if backend == "postgresql" and DB_STATEMENT_TIMEOUT_MS:
+            # Free at connect time; PgBouncer mode sets it per transaction instead (see below)
+            connect_args["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+
+    if connect_args:
+        options["connect_args"] = connect_args
+    return options
+
+def _create_engine(name, url):
+    """Create an engine with the configured pool settings and checkout timing"""
+    new_engine = create_engine(url, **_engine_options(url))
+    new_engine.raw_connection = _timed_raw_connection(name, new_engine.raw_connection)
+    return new_engine
+
+# Create SQLAlchemy engines
+engine = _create_engine("primary", DATABASE_URL)
+read_engine = _create_engine("replica", READ_REPLICA_URL) if READ_REPLICA_URL else engine
+
+# Create SessionLocal classes
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+# PgBouncer transaction pooling rejects startup options; scope the timeout to each transaction
+def _set_local_statement_timeout(session, transaction, connection):
+    if connection.dialect.name == "postgresql":
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {DB_STATEMENT_TIMEOUT_MS}")
+
+if DB_PGBOUNCER and DB_STATEMENT_TIMEOUT_MS:
+    for session_class in (SessionLocal, ReadSessionLocal):
+        event.listen(session_class, "after_begin", _set_local_statement_timeout)
+
+# Validate that every worker's pools fit the server's connection limit
+def validate_pool_capacity(workers=WORKER_COUNT):
+    """Check pool sizing against DB_MAX_CONNECTIONS; raises if workers would exhaust it"""
+    if DB_PGBOUNCER or not DB_MAX_CONNECTIONS or engine.dialect.name == "sqlite":
+        return
+    per_worker = DB_POOL_SIZE + DB_MAX_OVERFLOW
+    # The replica has its own max_connections, so only the primary's pools are counted
+    peak = workers * per_worker
+    budget = int(DB_MAX_CONNECTIONS * DB_CONNECTION_BUDGET)
+    if peak > budget:
+        raise RuntimeError(
+            f"{workers} workers x (pool_size {DB_POOL_SIZE} + max_overflow {DB_MAX_OVERFLOW}) = {peak} "
+            f"connections exceeds {budget} ({DB_CONNECTION_BUDGET:.0%} of DB_MAX_CONNECTIONS={DB_MAX_CONNECTIONS}); "
+            f"lower DB_POOL_SIZE/DB_MAX_OVERFLOW, set them to 'auto' or enable DB_PGBOUNCER"
+        )
+    if peak < budget // 2:
+        print(f"ℹ️  Pools use {peak} of {budget} budgeted connections; DB_POOL_SIZE=auto would size them up")
+    print(f"✅ DB pool capacity OK: {workers} workers x {per_worker} = {peak}/{budget} connections")
+
+def validate_replica_cache(workers=WORKER_COUNT):
+    """Raise if a replica is configured but read-your-writes markers can't be seen across workers"""
+    if read_engine is engine or workers <= 1 or not isinstance(cache, InMemoryCache):
+        return
+    raise RuntimeError(
+        f"READ_REPLICA_URL is set with {workers} workers but CACHE_URL is memory:// (per worker): "
+        f"a write on one worker would not pin the next read on another to the primary; "
+        f"point CACHE_URL at Redis or unset READ_REPLICA_URL"
+    )
 
 # Create Base class for models
 Base = declarative_base()
 
+# Dialect-specific insert() for upserts (ON CONFLICT, RETURNING), which the generic one lacks
+def dialect_insert(db):
+    """sqlalchemy.dialects.<dialect>.insert for the session's database"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise RuntimeError(f"Upserts are not implemented for {dialect}")
+    return insert
+
 # Dependency to get database session
 def get_db():
     db = SessionLocal()
@@ -35,11 +192,60 @@ def get_db():
     finally:
         db.close()
 
-# Initialize database tables
+# Dependency to get a read-only session on the replica (the primary if none is configured)
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+# Read-your-writes: keys (wallets, dataset ids) written recently. The markers live in
+# `cache`, so they only reach other workers (and hosts) when CACHE_URL is shared (Redis);
+# validate_replica_cache refuses a replica with several workers on memory://.
+def _sticky_key(key):
+    return f"sticky:{key}"
+
+async def mark_recent_write(key):
+    """Pin reads for `key` to the primary for REPLICA_STICKY_SECONDS"""
+    if read_engine is engine:
+        return
+    await cache.set(_sticky_key(key), 1, REPLICA_STICKY_SECONDS)
+
+async def recently_written(key):
+    """Whether reads for `key` must still go to the primary"""
+    if read_engine is engine:
+        return False
+    return await cache.get(_sticky_key(key)) is not None
+
+async def _sticky_session(key):
+    return SessionLocal() if await recently_written(key) else ReadSessionLocal()
+
+# Dependency for per-wallet reads that must observe that wallet's own recent writes
+async def get_wallet_read_db(wallet_address: WalletAddress):
+    db = await _sticky_session(f"wallet:{wallet_address}")
+    try:
+        yield db
+    finally:
+        db.close()
+
+# Dependency for per-dataset reads that must observe recent writes to that dataset
+async def get_dataset_read_db(dataset_id: int):
+    db = await _sticky_session(f"dataset:{dataset_id}")
+    try:
+        yield db
+    finally:
+        db.close()
+
+# Initialize database tables (migrations are the only way the schema gets created,
+# so a database set up here can still be upgraded with `manage.py migrate`)
 def init_db():
-    """Create all tables"""
-    Base.metadata.create_all(bind=engine)
-    print("✅ Database tables created successfully!")
+    """Upgrade the schema to the latest migration, same as `manage.py init-db`"""
+    from alembic import command
+    from alembic.config import Config
+
+    command.upgrade(Config(os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini")), "head")
+    print("✅ Database migrated to the latest schema!")
 
 # Test database connection
 def test_db_connection():
@@ -0,0 +1,329 @@
+"""
+Synthetic Data Generator
+Bulk-loads deterministic marketplace data at benchmark scale (COPY on Postgres, executemany elsewhere)
+
+Usage:
+    python datagen.py --users 100000 --datasets 1000000 --licenses 10000000 --transactions 2000000
+    python datagen.py --datasets 5000 --licenses 50000 --dataset-skew 1.2 --seed 7 --truncate
+"""
+import argparse
+import csv
+import io
+import itertools
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, text
+
+from database import engine, init_db
+from models import User, Dataset, License, Transaction
+
+CATEGORIES = [
+    "Climate", "Healthcare", "Finance", "NLP", "Computer Vision",
+    "E-Commerce", "Bioinformatics", "Geospatial", "Robotics", "Audio",
+]
+FORMATS = ["CSV", "Parquet", "JSON", "CSV, Parquet", "PNG, JSON", "GeoTIFF, JSON", "TXT", "PDB, JSON"]
+TOPICS = [
+    "weather", "xray", "stocks", "reddit", "lidar", "customers", "protein", "satellite",
+    "speech", "traffic", "energy", "genomics", "retail", "sensor", "news", "crypto",
+]
+ADJECTIVES = ["Global", "Annotated", "Historical", "Real-Time", "Curated", "Synthetic", "Open", "Labeled"]
+NOUNS = ["Dataset", "Corpus", "Archive", "Collection", "Benchmark", "Feed", "Survey", "Index"]
+TX_TYPES = ["mint", "purchase", "royalty"]
+TX_STATUSES = ["success", "success", "success", "pending", "failed"]
+
+USER_COLUMNS = ["id", "wallet_address", "username", "email", "created_at"]
+DATASET_COLUMNS = [
+    "id", "title", "description", "category", "file_hash", "ipfs_uri", "price_apt", "per_query_price",
+    "owner_id", "nft_minted", "blockchain_tx", "size_mb", "format", "tags", "downloads", "created_at",
+]
+LICENSE_COLUMNS = [
+    "id", "user_id", "dataset_id", "license_type", "expires_at", "transaction_hash", "price_paid", "purchased_at",
+]
+TRANSACTION_COLUMNS = [
+    "id", "from_address", "to_address", "amount_apt", "transaction_type", "blockchain_hash", "status", "created_at",
+]
+
+
+def _ts(dt):
+    # One textual format both COPY and SQLAlchemy's SQLite DateTime parse
+    return dt.strftime("%Y-%m-%d %H:%M:%S.%f") if dt is not None else None
+
+
+def zipf_cum_weights(n: int, skew: float):
+    """Cumulative Zipf weights over ranks 1..n (skew 0 = uniform)"""
+    return list(itertools.accumulate(1.0 / (rank ** skew) for rank in range(1, n + 1)))
+
+
+class ZipfSampler:
+    """Samples ids with Zipf popularity over a seeded random permutation of the ids"""
+
+    def __init__(self, rng: random.Random, first_id: int, n: int, skew: float):
+        self.rng = rng
+        self.ids = list(range(first_id, first_id + n))
+        rng.shuffle(self.ids)
+        self.cum = zipf_cum_weights(n, skew)
+        self.total = self.cum[-1]
+
+    def sample(self, k: int):
+        return self.rng.choices(self.ids, cum_weights=self.cum, k=k)
+
+    def expected_share(self):
+        """Expected fraction of samples per id, keyed by id"""
+        previous = 0.0
+        shares = {}
+        for ident, cum in zip(self.ids, self.cum):
+            shares[ident] = (cum - previous) / self.total
+            previous = cum
+        return shares
+
+
+class Generator:
+    def __init__(self, args, id_offsets):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.now = datetime(2025, 11, 1)
+        self.chunk_size = args.chunk_size
+        self.user_start, self.dataset_start, self.license_start, self.tx_start = id_offsets
+        self.wallets = []
+        self.prices = {}
+        self.owner_sampler = ZipfSampler(self.rng, self.user_start, args.users, args.owner_skew)
+        self.buyer_sampler = ZipfSampler(self.rng, self.user_start, args.users, args.buyer_skew)
+        self.dataset_sampler = ZipfSampler(self.rng, self.dataset_start, args.datasets, args.dataset_skew)
+
+    def _hex(self, bits: int = 256) -> str:
+        return "0x%0*x" % (bits // 4, self.rng.getrandbits(bits))
+
+    def _bytes32(self) -> bytes:
+        # Raw form of Address32/Hash32 columns (same draws as _hex, so seeds stay comparable)
+        return self.rng.getrandbits(256).to_bytes(32, "big")
+
+    def _past(self, days: int) -> datetime:
+        return self.now - timedelta(seconds=self.rng.randrange(days * 86400))
+
+    def _stream(self, sampler):
+        """Endless stream of sampled ids, drawn a chunk at a time"""
+        while True:
+            yield from sampler.sample(self.chunk_size)
+
+    def _chunks(self, rows):
+        while True:
+            chunk = list(itertools.islice(rows, self.chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+    def users(self):
+        def rows():
+            for ident in range(self.user_start, self.user_start + self.args.users):
+                wallet = self._bytes32()
+                self.wallets.append(wallet)
+                yield (ident, wallet, f"user_{ident}", f"user_{ident}@valynce.dev", _ts(self._past(720)))
+        return self._chunks(rows())
+
+    def datasets(self):
+        expected = self.dataset_sampler.expected_share()
+        rng = self.rng
+
+        def rows():
+            owners = self._stream(self.owner_sampler)
+            for ident in range(self.dataset_start, self.dataset_start + self.args.datasets):
+                owner = next(owners)
+                category = rng.choice(CATEGORIES)
+                topics = rng.sample(TOPICS, 3)
+                price = round(rng.uniform(0.5, 25.0), 2)
+                self.prices[ident] = price
+                file_hash = f"Qm{ident:012d}{rng.getrandbits(128):032x}"
+                yield (
+                    ident,
+                    f"{rng.choice(ADJECTIVES)} {topics[0].title()} {rng.choice(NOUNS)} {ident}",
+                    f"{category} data covering {', '.join(topics)}. "
+                    f"Collected from {rng.randrange(10, 10000)} sources and cleaned for ML pipelines.",
+                    category,
+                    file_hash,
+                    f"ipfs://{file_hash}",
+                    price,
+                    round(price / rng.choice([100, 200, 500]), 4),
+                    owner,
+                    rng.random() < 0.5,
+                    self._hex() if rng.random() < 0.5 else None,
+                    round(rng.lognormvariate(7, 1.5), 1),
+                    rng.choice(FORMATS),
+                    ",".join([category.lower().replace(" ", "-")] + topics),
+                    round(expected[ident] * self.args.licenses),
+                    _ts(self._past(720)),
+                )
+        return self._chunks(rows())
+
+    def licenses(self):
+        rng = self.rng
+
+        def rows():
+            ident = self.license_start
+            remaining = self.args.licenses
+            while remaining:
+                k = min(self.chunk_size, remaining)
+                for dataset_id, user_id in zip(self.dataset_sampler.sample(k), self.buyer_sampler.sample(k)):
+                    license_type = rng.randrange(3)
+                    purchased_at = self._past(365)
+                    expires_at = purchased_at + timedelta(days=rng.choice([30, 90, 365])) if license_type == 1 else None
+                    yield (
+                        ident, user_id, dataset_id, license_type, _ts(expires_at),
+                        self._bytes32(), self.prices.get(dataset_id, 1.0), _ts(purchased_at),
+                    )
+                    ident += 1
+                remaining -= k
+        return self._chunks(rows())
+
+    def transactions(self):
+        rng = self.rng
+        wallets = self.wallets
+        user_start = self.user_start
+
+        def rows():
+            ident = self.tx_start
+            remaining = self.args.transactions
+            while remaining:
+                k = min(self.chunk_size, remaining)
+                senders = self.buyer_sampler.sample(k)
+                receivers = self.owner_sampler.sample(k)
+                for sender, receiver in zip(senders, receivers):
+                    yield (
+                        ident,
+                        wallets[sender - user_start],
+                        wallets[receiver - user_start],
+                        round(rng.uniform(0.1, 25.0), 2),
+                        rng.choice(TX_TYPES),
+                        self._bytes32(),
+                        rng.choice(TX_STATUSES),
+                        _ts(self._past(365)),
+                    )
+                    ident += 1
+                remaining -= k
+        return self._chunks(rows())
+
+
+def _copy_chunk(raw_connection, table: str, columns, chunk):
+    """Stream one chunk into Postgres with COPY ... FROM STDIN"""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    # bytea columns take COPY's hex input format
+    writer.writerows(
+        [("\\x" + value.hex()) if isinstance(value, bytes) else value for value in row] for row in chunk
+    )
+    buf.seek(0)
+    with raw_connection.cursor() as cursor:
+        cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buf)
+
+
+def _executemany_chunk(raw_connection, table: str, columns, chunk):
+    """Insert one chunk with the driver's executemany"""
+    placeholder = "?" if engine.dialect.paramstyle == "qmark" else "%s"
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join([placeholder] * len(columns))})"
+    cursor = raw_connection.cursor()
+    try:
+        cursor.executemany(sql, chunk)
+    finally:
+        cursor.close()
+
+
+def load(table: str, columns, chunks) -> int:
+    """Load chunks into a table, committing after each one"""
+    use_copy = engine.dialect.name == "postgresql" and engine.dialect.driver == "psycopg2"
+    write_chunk = _copy_chunk if use_copy else _executemany_chunk
+    start = time.perf_counter()
+    total = 0
+    raw_connection = engine.raw_connection()
+    try:
+        for chunk in chunks:
+            write_chunk(raw_connection, table, columns, chunk)
+            raw_connection.commit()
+            total += len(chunk)
+    finally:
+        raw_connection.close()
+    elapsed = time.perf_counter() - start
+    print(f"   - {table}: {total:,} rows in {elapsed:.1f}s ({total / max(elapsed, 1e-9):,.0f} rows/s)")
+    return total
+
+
+# Tables derived from the generated ones, dependents first. Their id watermarks and
+# per-dataset rows would otherwise point at the old rows once ids start over.
+DERIVED_TABLES = (
+    "royalty_payouts", "royalty_settlement_runs", "royalty_configs",
+    "dataset_similarities", "analytics_rollups", "analytics_watermarks",
+)
+GENERATED_TABLES = ("transactions", "licenses", "datasets", "users")
+
+
+def truncate_tables():
+    """Empty the generated tables and everything derived from them (ids start over on Postgres)"""
+    tables = DERIVED_TABLES + GENERATED_TABLES
+    with engine.begin() as connection:
+        if engine.dialect.name == "postgresql":
+            connection.execute(text(f"TRUNCATE {', '.join(tables)} RESTART IDENTITY CASCADE"))
+        else:
+            for table in tables:
+                connection.execute(text(f"DELETE FROM {table}"))
+
+
+def _id_offsets():
+    """First free id per table so generated rows can append to existing data"""
+    with engine.connect() as connection:
+        return tuple(
+            (connection.execute(func.max(model.id).select()).scalar() or 0) + 1
+            for model in (User, Dataset, License, Transaction)
+        )
+
+
+def _reset_sequences():
+    # Explicit ids bypass Postgres sequences; move them past the loaded rows
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as connection:
+        for table in ("users", "datasets", "licenses", "transactions"):
+            connection.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                f"COALESCE((SELECT MAX(id) FROM {table}), 0) + 1, false)"
+            ))
+
+
+def generate(args):
+    init_db()
+    if args.truncate:
+        truncate_tables()
+    gen = Generator(args, _id_offsets())
+
+    print(f"Generating data (seed={args.seed}, dialect={engine.dialect.name})...")
+    start = time.perf_counter()
+    load("users", USER_COLUMNS, gen.users())
+    load("datasets", DATASET_COLUMNS, gen.datasets())
+    load("licenses", LICENSE_COLUMNS, gen.licenses())
+    load("transactions", TRANSACTION_COLUMNS, gen.transactions())
+    _reset_sequences()
+    if engine.dialect.name == "postgresql":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            connection.execute(text("ANALYZE"))
+    print(f"✅ Generated in {time.perf_counter() - start:.1f}s")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Bulk-load deterministic synthetic marketplace data")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--datasets", type=int, default=10000)
+    parser.add_argument("--licenses", type=int, default=100000)
+    parser.add_argument("--transactions", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-size", type=int, default=50000, help="Rows per COPY/executemany batch")
+    parser.add_argument("--dataset-skew", type=float, default=1.1, help="Zipf exponent for dataset popularity")
+    parser.add_argument("--buyer-skew", type=float, default=0.8, help="Zipf exponent for buyer activity")
+    parser.add_argument("--owner-skew", type=float, default=1.0, help="Zipf exponent for datasets per owner")
+    parser.add_argument("--truncate", action="store_true", help="Delete existing rows first")
+    return parser
+
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    if args.users < 1 or args.datasets < 1:
+        raise SystemExit("--users and --datasets must be at least 1")
+    generate(args)
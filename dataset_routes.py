@@ -1,16 +1,41 @@
 """
 Dataset API Routes
 """
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import or_
+from sqlalchemy.orm import Session, joinedload
 from pydantic import BaseModel, ConfigDict
 from typing import List, Optional
-from database import get_db
-from models import Dataset, User, License, Transaction
+from cache import cache
+from database import SessionLocal, ReadSessionLocal, read_engine, get_db, get_read_db, get_wallet_read_db, get_dataset_read_db, mark_recent_write
+from models import Dataset, DatasetSimilarity, User, License, Transaction
+from db_types import WalletAddress
+from singleflight import SingleFlight
+from license_expiry import access_cache_key
+from realtime import realtime_hub
+from users import user_resolver
+from recommendations import RECOMMENDATIONS_TOP_K, SIMILAR_VERSION_KEY, SIMILAR_VERSION_TTL, stored_version
 from datetime import datetime
+import os
 
 router = APIRouter(prefix="/api/datasets", tags=["Datasets"])
 
+# Shared cache TTLs (seconds). Writes invalidate explicitly; the TTL bounds how stale
+# download counters on catalog pages may get, since purchases don't flush every page.
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "30"))
+DATASET_CACHE_TTL = float(os.getenv("DATASET_CACHE_TTL", "60"))
+ACCESS_CACHE_TTL = float(os.getenv("ACCESS_CACHE_TTL", "60"))
+SIMILAR_CACHE_TTL = float(os.getenv("RECOMMENDATIONS_CACHE_TTL", "300"))
+
+# Catalog page keys embed this version, so one increment invalidates every page
+CATALOG_VERSION_KEY = "catalog:version"
+CATEGORIES_KEY = "catalog:categories"
+
+# Identical concurrent reads share one DB fetch (per worker)
+catalog_flight = SingleFlight("catalog")
+dataset_flight = SingleFlight("dataset")
+
 # Pydantic models
 class DatasetResponse(BaseModel):
     id: int
@@ -30,22 +55,44 @@ class DatasetResponse(BaseModel):
     
     model_config = ConfigDict(from_attributes=True)
 
+def _dataset_payload(dataset, owner_username):
+    """JSON-ready dataset response, safe to store in the shared cache"""
+    return DatasetResponse.model_validate({
+        **dataset.__dict__,
+        "owner_username": owner_username
+    }).model_dump(mode="json")
+
+def _flight_key(db, key):
+    """Keep sticky primary reads from joining a fetch that runs on the replica"""
+    return key if db.get_bind() is read_engine else f"{key}@primary"
+
+def _in_own_session(db, loader, *args):
+    """Run a shared fetch on its own session (bound like `db`) so it outlives the request that started it"""
+    session_class = ReadSessionLocal if db.get_bind() is read_engine else SessionLocal
+    with session_class() as session:
+        return loader(session, *args)
+
+async def _invalidate_catalog():
+    await cache.incr(CATALOG_VERSION_KEY)
+    await cache.delete(CATEGORIES_KEY)
+
 class DatasetCreate(BaseModel):
     title: str
     description: str
     category: str
-    file_hash: str
+    # Optional when the file is sent through /api/uploads, which fills both in
+    file_hash: Optional[str] = None
     ipfs_uri: str
     price_apt: float
     per_query_price: float
-    size_mb: float
+    size_mb: float = 0
     format: str
     tags: str
-    owner_wallet: str
+    owner_wallet: WalletAddress
 
 class LicenseCreate(BaseModel):
     dataset_id: int
-    user_wallet: str
+    user_wallet: WalletAddress
     license_type: int
     duration_days: Optional[int] = None
 
@@ -57,62 +104,154 @@ class LicenseResponse(BaseModel):
     expires_at: Optional[datetime]
     price_paid: float
     purchased_at: datetime
+    is_active: bool
     
     model_config = ConfigDict(from_attributes=True)
 
+class SimilarDataset(BaseModel):
+    id: int
+    title: str
+    category: str
+    format: str
+    price_apt: float
+    downloads: int
+    score: float
+
+class AccessResponse(BaseModel):
+    dataset_id: int
+    wallet_address: str
+    has_access: bool
+    license_id: Optional[int] = None
+    expires_at: Optional[datetime] = None
+
 @router.get("/", response_model=List[DatasetResponse])
 async def get_all_datasets(
     category: Optional[str] = None,
     search: Optional[str] = None,
-    db: Session = Depends(get_db)
+    page: Optional[int] = Query(None, ge=1),
+    page_size: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_read_db)
 ):
-    """Get all datasets with optional filtering"""
-    query = db.query(Dataset)
+    """Get all datasets with optional filtering, newest first (paged when `page` is given)"""
+    if category == "All":
+        category = None
+    version = await cache.get(CATALOG_VERSION_KEY) or 0
+    cache_key = f"catalog:v{version}:{category or ''}:{search or ''}:{page or 'all'}:{page_size}"
+    cached = await cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    async def fetch():
+        result = await run_in_threadpool(_in_own_session, db, _load_catalog_page, category, search, page, page_size)
+        await cache.set(cache_key, result, CATALOG_CACHE_TTL)
+        return result
     
-    if category and category != "All":
+    return await catalog_flight.do(_flight_key(db, cache_key), fetch)
+
+def _load_catalog_page(db, category, search, page, page_size):
+    # Load owners in the same query instead of one lookup per row
+    query = db.query(Dataset).options(joinedload(Dataset.owner))
+    
+    if category:
         query = query.filter(Dataset.category == category)
     
     if search:
         query = query.filter(Dataset.title.ilike(f"%{search}%"))
     
+    # Served by ix_datasets_created_at / ix_datasets_category_created_at
+    query = query.order_by(Dataset.created_at.desc(), Dataset.id.desc())
+    
+    if page is not None:
+        query = query.offset((page - 1) * page_size).limit(page_size)
+    
     datasets = query.all()
     
     result = []
     for ds in datasets:
-        result.append({
-            **ds.__dict__,
-            "owner_username": ds.owner.username if ds.owner else "Unknown"
-        })
+        result.append(_dataset_payload(ds, ds.owner.username if ds.owner else "Unknown"))
     
     return result
 
+@router.get("/categories")
+async def get_categories(db: Session = Depends(get_read_db)):
+    """Get all unique categories"""
+    cached = await cache.get(CATEGORIES_KEY)
+    if cached is not None:
+        return cached
+    categories = [cat[0] for cat in db.query(Dataset.category).distinct().all()]
+    await cache.set(CATEGORIES_KEY, categories, CATALOG_CACHE_TTL)
+    return categories
+
 @router.get("/{dataset_id}", response_model=DatasetResponse)
-async def get_dataset(dataset_id: int, db: Session = Depends(get_db)):
+async def get_dataset(dataset_id: int, db: Session = Depends(get_dataset_read_db)):
     """Get a specific dataset by ID"""
-    dataset = db.query(Dataset).filter(Dataset.id == dataset_id).first()
+    cache_key = f"dataset:{dataset_id}"
+    cached = await cache.get(cache_key)
+    if cached is not None:
+        return cached
     
-    if not dataset:
-        raise HTTPException(status_code=404, detail="Dataset not found")
+    async def fetch():
+        result = await run_in_threadpool(_in_own_session, db, _load_dataset, dataset_id)
+        if result is not None:
+            await cache.set(cache_key, result, DATASET_CACHE_TTL)
+        return result
     
-    return {
-        **dataset.__dict__,
-        "owner_username": dataset.owner.username if dataset.owner else "Unknown"
-    }
+    result = await dataset_flight.do(_flight_key(db, cache_key), fetch)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    return result
+
+def _load_dataset(db, dataset_id):
+    dataset = (
+        db.query(Dataset)
+        .options(joinedload(Dataset.owner))
+        .filter(Dataset.id == dataset_id)
+        .first()
+    )
+    if not dataset:
+        return None
+    return _dataset_payload(dataset, dataset.owner.username if dataset.owner else "Unknown")
+
+@router.get("/{dataset_id}/similar", response_model=List[SimilarDataset])
+async def get_similar_datasets(
+    dataset_id: int,
+    limit: int = Query(10, ge=1, le=RECOMMENDATIONS_TOP_K),
+    db: Session = Depends(get_read_db)
+):
+    """Most similar datasets (content and co-purchases), precomputed by the recommendation job"""
+    version = await cache.get(SIMILAR_VERSION_KEY)
+    if version is None:
+        # The rebuild runs in another process; the stored version is how workers see it
+        version = await run_in_threadpool(stored_version, db)
+        await cache.set(SIMILAR_VERSION_KEY, version, SIMILAR_VERSION_TTL)
+    cache_key = f"similar:v{version}:{dataset_id}"
+    result = await cache.get(cache_key)
+    if result is None:
+        result = await run_in_threadpool(_load_similar, db, dataset_id)
+        if result is None:
+            raise HTTPException(status_code=404, detail="Dataset not found")
+        await cache.set(cache_key, result, SIMILAR_CACHE_TTL)
+    return result[:limit]
+
+def _load_similar(db, dataset_id):
+    row = db.get(DatasetSimilarity, dataset_id)
+    if row is None:
+        # Not built yet (new dataset): empty until the next rebuild
+        exists = db.query(Dataset.id).filter(Dataset.id == dataset_id).first()
+        return [] if exists else None
+    scores = dict(row.neighbors)  # ordered, most similar first
+    datasets = {d.id: d for d in db.query(Dataset).filter(Dataset.id.in_(list(scores))).all()}
+    return [
+        SimilarDataset.model_validate({**datasets[neighbor_id].__dict__, "score": score}).model_dump(mode="json")
+        for neighbor_id, score in scores.items()
+        if neighbor_id in datasets
+    ]
 
 @router.post("/", response_model=DatasetResponse)
 async def create_dataset(dataset: DatasetCreate, db: Session = Depends(get_db)):
     """Create a new dataset"""
     # Find or create user
-    user = db.query(User).filter(User.wallet_address == dataset.owner_wallet).first()
-    
-    if not user:
-        user = User(
-            wallet_address=dataset.owner_wallet,
-            username=f"user_{dataset.owner_wallet[:8]}"
-        )
-        db.add(user)
-        db.commit()
-        db.refresh(user)
+    user = user_resolver.resolve(db, dataset.owner_wallet)
     
     # Create dataset
     new_dataset = Dataset(
@@ -132,6 +271,9 @@ async def create_dataset(dataset: DatasetCreate, db: Session = Depends(get_db)):
     db.add(new_dataset)
     db.commit()
     db.refresh(new_dataset)
+    await mark_recent_write(f"wallet:{dataset.owner_wallet}")
+    await mark_recent_write(f"dataset:{new_dataset.id}")
+    await _invalidate_catalog()
     
     return {
         **new_dataset.__dict__,
@@ -154,6 +296,10 @@ async def mint_dataset_nft(
     dataset.blockchain_tx = transaction_hash
     
     db.commit()
+    await mark_recent_write(f"dataset:{dataset_id}")
+    await cache.delete(f"dataset:{dataset_id}")
+    await _invalidate_catalog()
+    realtime_hub.poke(f"dataset:{dataset_id}")
     
     return {
         "success": True,
@@ -170,15 +316,7 @@ async def purchase_license(license_data: LicenseCreate, db: Session = Depends(ge
         raise HTTPException(status_code=404, detail="Dataset not found")
     
     # Find or create user
-    user = db.query(User).filter(User.wallet_address == license_data.user_wallet).first()
-    if not user:
-        user = User(
-            wallet_address=license_data.user_wallet,
-            username=f"user_{license_data.user_wallet[:8]}"
-        )
-        db.add(user)
-        db.commit()
-        db.refresh(user)
+    user = user_resolver.resolve(db, license_data.user_wallet)
     
     # Create license
     from datetime import timedelta
@@ -191,13 +329,17 @@ async def purchase_license(license_data: LicenseCreate, db: Session = Depends(ge
         dataset_id=dataset.id,
         license_type=license_data.license_type,
         expires_at=expires_at,
-        transaction_hash=f"0x{'pending'}",
+        transaction_hash=None,  # set once the purchase is confirmed on chain
         price_paid=dataset.price_apt
     )
     
     db.add(license)
     dataset.downloads += 1
     db.commit()
+    await mark_recent_write(f"wallet:{license_data.user_wallet}")
+    await mark_recent_write(f"dataset:{dataset.id}")
+    await cache.delete(f"dataset:{dataset.id}", access_cache_key(license_data.user_wallet, dataset.id))
+    realtime_hub.poke(f"dataset:{dataset.id}")
     
     return {
         "success": True,
@@ -206,14 +348,25 @@ async def purchase_license(license_data: LicenseCreate, db: Session = Depends(ge
     }
 
 @router.get("/user/{wallet_address}/licenses", response_model=List[LicenseResponse])
-async def get_user_licenses(wallet_address: str, db: Session = Depends(get_db)):
-    """Get all licenses for a user"""
-    user = db.query(User).filter(User.wallet_address == wallet_address).first()
+async def get_user_licenses(
+    wallet_address: WalletAddress,
+    active_only: bool = False,
+    db: Session = Depends(get_wallet_read_db)
+):
+    """Get all licenses for a user (only unexpired ones with `active_only`)"""
+    user = user_resolver.lookup(db, wallet_address)
     
     if not user:
         return []
     
-    licenses = db.query(License).filter(License.user_id == user.id).all()
+    query = db.query(License).options(joinedload(License.dataset)).filter(License.user_id == user.id)
+    if active_only:
+        # ix_licenses_active_user_id; the expiry check covers licenses the sweeper hasn't reached yet
+        query = query.filter(
+            License.is_active,
+            or_(License.expires_at.is_(None), License.expires_at > datetime.utcnow())
+        )
+    licenses = query.all()
     
     result = []
     for lic in licenses:
@@ -225,14 +378,19 @@ async def get_user_licenses(wallet_address: str, db: Session = Depends(get_db)):
     return result
 
 @router.get("/user/{wallet_address}/owned", response_model=List[DatasetResponse])
-async def get_user_datasets(wallet_address: str, db: Session = Depends(get_db)):
+async def get_user_datasets(wallet_address: WalletAddress, db: Session = Depends(get_wallet_read_db)):
     """Get all datasets owned by a user"""
-    user = db.query(User).filter(User.wallet_address == wallet_address).first()
+    user = user_resolver.lookup(db, wallet_address)
     
     if not user:
         return []
     
-    datasets = db.query(Dataset).filter(Dataset.owner_id == user.id).all()
+    datasets = (
+        db.query(Dataset)
+        .filter(Dataset.owner_id == user.id)
+        .order_by(Dataset.created_at.desc())
+        .all()
+    )
     
     result = []
     for ds in datasets:
@@ -243,8 +401,38 @@ async def get_user_datasets(wallet_address: str, db: Session = Depends(get_db)):
     
     return result
 
-@router.get("/categories")
-async def get_categories(db: Session = Depends(get_db)):
-    """Get all unique categories"""
-    categories = db.query(Dataset.category).distinct().all()
-    return [cat[0] for cat in categories]
+@router.get("/{dataset_id}/access/{wallet_address}", response_model=AccessResponse)
+async def check_access(dataset_id: int, wallet_address: WalletAddress, db: Session = Depends(get_wallet_read_db)):
+    """Check whether a wallet holds an active license for a dataset"""
+    cache_key = access_cache_key(wallet_address, dataset_id)
+    cached = await cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    now = datetime.utcnow()
+    license = (
+        db.query(License)
+        .join(User, User.id == License.user_id)
+        .filter(
+            User.wallet_address == wallet_address,
+            License.dataset_id == dataset_id,
+            License.is_active,
+            or_(License.expires_at.is_(None), License.expires_at > now)
+        )
+        .order_by(License.expires_at.is_(None).desc(), License.expires_at.desc())
+        .first()
+    )
+    
+    result = {
+        "dataset_id": dataset_id,
+        "wallet_address": wallet_address,
+        "has_access": license is not None,
+        "license_id": license.id if license else None,
+        "expires_at": license.expires_at.isoformat() if license and license.expires_at else None
+    }
+    # Never serve a grant past its expiry, even if the sweeper hasn't evicted it yet
+    ttl = ACCESS_CACHE_TTL
+    if license and license.expires_at:
+        ttl = min(ttl, (license.expires_at - now).total_seconds())
+    await cache.set(cache_key, result, ttl)
+    return result
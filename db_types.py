@@ -0,0 +1,82 @@
+"""
+Column Types
+Wallet addresses and transaction hashes stored as canonical 32-byte binary values.
+
+Addresses are parsed with AccountAddress (AIP-40: any case, with or without 0x, zero
+padding optional) and rendered back in its canonical string form, so "0xAB", "ab" and
+"0x00…ab" are one user and every index holds 32 bytes instead of a 66-character string.
+"""
+from typing import Annotated
+
+from aptos_sdk.account_address import AccountAddress
+from pydantic import AfterValidator
+from sqlalchemy import LargeBinary
+from sqlalchemy.types import TypeDecorator
+
+HASH_LENGTH = 32
+
+
+def address_bytes(value: str) -> bytes:
+    """32-byte form of an account address string; raises ValueError"""
+    try:
+        return AccountAddress.from_str_relaxed(value.strip()).address
+    except (RuntimeError, ValueError, AttributeError):
+        raise ValueError(f"Invalid account address: {value!r}")
+
+
+def hash_bytes(value: str) -> bytes:
+    """32-byte form of a transaction hash string (64 hex digits, 0x optional); raises ValueError"""
+    digits = value.strip()
+    if digits[:2] in ("0x", "0X"):
+        digits = digits[2:]
+    try:
+        raw = bytes.fromhex(digits)
+    except ValueError:
+        raw = b""
+    if len(raw) != HASH_LENGTH:
+        raise ValueError(f"Invalid transaction hash: {value!r}")
+    return raw
+
+
+def normalize_address(value: str) -> str:
+    """Canonical string form of an account address; raises ValueError"""
+    return str(AccountAddress(address_bytes(value)))
+
+
+def normalize_hash(value: str) -> str:
+    return "0x" + hash_bytes(value).hex()
+
+
+# Request field/parameter types: validated (422 on bad input) and canonicalized at the API boundary
+WalletAddress = Annotated[str, AfterValidator(normalize_address)]
+TxHash = Annotated[str, AfterValidator(normalize_hash)]
+
+
+class Address32(TypeDecorator):
+    """Account address column: 32 raw bytes in the database, canonical string in Python"""
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, bytes):
+            return value
+        return address_bytes(value)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else str(AccountAddress(bytes(value)))
+
+
+class Hash32(TypeDecorator):
+    """Transaction hash column: 32 raw bytes in the database, 0x-prefixed hex in Python"""
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, bytes):
+            return value
+        return hash_bytes(value)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else "0x" + bytes(value).hex()
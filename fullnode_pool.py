@@ -0,0 +1,268 @@
+"""
+Fullnode Pool
+Spreads Aptos fullnode reads over several nodes (APTOS_NODE_URLS)
+
+Each read goes to the node with the lowest expected latency (EWMA, inflated by recent
+errors and requests in flight), apart from a small share that re-measures the others.
+If it runs past that node's p95 a duplicate is sent to the next best node and the first
+answer wins. Transport errors, timeouts and 5xx/429 responses fail over to the next node,
+and a node with APTOS_BREAKER_FAILURES consecutive failures is ejected for
+APTOS_BREAKER_COOLDOWN seconds before a single probe may retry it.
+"""
+import asyncio
+import os
+import random
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, TypeVar
+from urllib.parse import urlsplit
+
+from dotenv import load_dotenv
+
+from metrics import FULLNODE_EJECTED, FULLNODE_HEDGES, FULLNODE_REQUESTS
+
+load_dotenv()
+
+T = TypeVar("T")
+
+HEDGE_ENABLED = os.getenv("APTOS_HEDGE_ENABLED", "true").lower() == "true"
+# Hedge delay: the primary node's p95, but never below the floor; the default applies
+# until a node has enough samples for a p95
+HEDGE_MIN_DELAY = float(os.getenv("APTOS_HEDGE_MIN_DELAY_MS", "20")) / 1000
+HEDGE_DEFAULT_DELAY = float(os.getenv("APTOS_HEDGE_DEFAULT_DELAY_MS", "300")) / 1000
+REQUEST_TIMEOUT = float(os.getenv("APTOS_REQUEST_TIMEOUT", "10"))
+BREAKER_FAILURES = int(os.getenv("APTOS_BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN = float(os.getenv("APTOS_BREAKER_COOLDOWN", "30"))
+
+_LATENCY_WINDOW = 200
+_MIN_P95_SAMPLES = 20
+_EWMA_ALPHA = 0.2
+# Weight of the recent error rate in a node's score: 10% errors doubles its expected latency
+_ERROR_PENALTY = 10
+# Share of reads sent to a random node first, so a node with a bad score gets re-measured
+# (hedging bounds what a slow pick costs)
+_EXPLORE_RATE = 0.02
+
+
+class FullnodeUnavailable(Exception):
+    """Every configured fullnode is ejected by its circuit breaker"""
+
+
+def _is_node_failure(error: BaseException) -> bool:
+    """Transport errors, timeouts, 5xx and 429 mean the node is unhealthy; other API errors are answers"""
+    status = getattr(error, "status_code", None)
+    return status is None or status >= 500 or status == 429
+
+
+class Endpoint:
+    def __init__(self, url: str):
+        self.url = url
+        self.name = urlsplit(url).netloc or url
+        self._client = None
+        self.latency_ewma: Optional[float] = None
+        self.error_rate = 0.0
+        self.latencies: Deque[float] = deque(maxlen=_LATENCY_WINDOW)
+        self.in_flight = 0
+        self.failures = 0  # consecutive
+        self.open_until = 0.0
+        self.probing = False
+
+    @property
+    def client(self):
+        """Fullnode REST client (aptos_sdk.async_client pulls in aiohttp, so import lazily)"""
+        if self._client is None:
+            from aptos_sdk.async_client import RestClient
+            self._client = RestClient(self.url)
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+    def state(self, now: float) -> str:
+        if self.failures < BREAKER_FAILURES:
+            return "closed"
+        return "open" if now < self.open_until else "half_open"
+
+    def admits(self, now: float) -> bool:
+        state = self.state(now)
+        return state == "closed" or (state == "half_open" and not self.probing)
+
+    def score(self) -> float:
+        """Expected latency, inflated by recent errors and requests already in flight"""
+        if self.latency_ewma is None:
+            # Untried nodes go first so they get measured; nodes that only ever failed go last
+            return 0.0 if self.error_rate == 0 else float("inf")
+        return self.latency_ewma * (1 + self.in_flight) * (1 + _ERROR_PENALTY * self.error_rate)
+
+    def p95(self) -> Optional[float]:
+        if len(self.latencies) < _MIN_P95_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+    def observe(self, seconds: float) -> None:
+        self.latencies.append(seconds)
+        if self.latency_ewma is None:
+            self.latency_ewma = seconds
+        else:
+            self.latency_ewma += _EWMA_ALPHA * (seconds - self.latency_ewma)
+
+    def record_success(self, seconds: float) -> None:
+        self.observe(seconds)
+        self.error_rate *= 1 - _EWMA_ALPHA
+        if self.failures >= BREAKER_FAILURES:
+            print(f"✅ Fullnode {self.name} is back in rotation")
+            FULLNODE_EJECTED.labels(self.name).set(0)
+        self.failures = 0
+
+    def record_failure(self, now: float) -> None:
+        self.error_rate += _EWMA_ALPHA * (1 - self.error_rate)
+        self.failures += 1
+        if self.failures >= BREAKER_FAILURES:
+            if self.failures == BREAKER_FAILURES:
+                print(f"⚠️  Fullnode {self.name} ejected after {self.failures} consecutive failures")
+            # Also restarts the cool-down when a half-open probe fails
+            self.open_until = now + BREAKER_COOLDOWN
+            FULLNODE_EJECTED.labels(self.name).set(1)
+
+    def snapshot(self, now: float) -> dict:
+        p95 = self.p95()
+        return {
+            "url": self.url,
+            "state": self.state(now),
+            "latency_ewma_ms": None if self.latency_ewma is None else round(self.latency_ewma * 1000, 2),
+            "latency_p95_ms": None if p95 is None else round(p95 * 1000, 2),
+            "error_rate": round(self.error_rate, 4),
+            "in_flight": self.in_flight,
+        }
+
+
+class FullnodePool:
+    def __init__(self, urls: List[str], hedge: bool = HEDGE_ENABLED, timeout: float = REQUEST_TIMEOUT):
+        if not urls:
+            raise ValueError("At least one fullnode URL is required")
+        self.endpoints = [Endpoint(url) for url in urls]
+        self.hedge = hedge
+        self.timeout = timeout
+
+    def ranked(self) -> List[Endpoint]:
+        """Nodes that may take a request now, best first"""
+        now = time.monotonic()
+        usable = [endpoint for endpoint in self.endpoints if endpoint.admits(now)]
+        if not usable:
+            retry_in = min(endpoint.open_until for endpoint in self.endpoints) - now
+            raise FullnodeUnavailable(f"All fullnodes are ejected; retrying in {max(0.0, retry_in):.0f}s")
+        ranked = sorted(usable, key=Endpoint.score)
+        if len(ranked) > 1 and random.random() < _EXPLORE_RATE:
+            ranked.insert(0, ranked.pop(random.randrange(1, len(ranked))))
+        return ranked
+
+    def best(self) -> Endpoint:
+        """The node reads would go to now (any node if all are ejected)"""
+        try:
+            return self.ranked()[0]
+        except FullnodeUnavailable:
+            return self.endpoints[0]
+
+    def _hedge_delay(self, endpoint: Endpoint) -> float:
+        p95 = endpoint.p95()
+        return HEDGE_DEFAULT_DELAY if p95 is None else max(HEDGE_MIN_DELAY, p95)
+
+    async def _attempt(self, endpoint: Endpoint, call: Callable[[object], Awaitable[T]]) -> T:
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(call(endpoint.client), timeout=self.timeout)
+        except asyncio.CancelledError:
+            # Lost a hedge race: its latency is at least this long, which keeps a slow
+            # node from looking fast just because its answers are never waited for
+            endpoint.observe(time.perf_counter() - start)
+            FULLNODE_REQUESTS.labels(endpoint.name, "cancelled").inc()
+            raise
+        except Exception as e:
+            if _is_node_failure(e):
+                endpoint.record_failure(time.monotonic())
+                FULLNODE_REQUESTS.labels(endpoint.name, "error").inc()
+            else:
+                endpoint.record_success(time.perf_counter() - start)
+                FULLNODE_REQUESTS.labels(endpoint.name, "ok").inc()
+            raise
+        endpoint.record_success(time.perf_counter() - start)
+        FULLNODE_REQUESTS.labels(endpoint.name, "ok").inc()
+        return result
+
+    def _start(self, endpoint: Endpoint, call: Callable[[object], Awaitable[T]]) -> asyncio.Task:
+        # Claimed here and released in the done callback, which runs even for a task
+        # cancelled before it started
+        probe = endpoint.state(time.monotonic()) == "half_open"
+        endpoint.probing = endpoint.probing or probe
+        endpoint.in_flight += 1
+
+        def finished(task: asyncio.Task) -> None:
+            endpoint.in_flight -= 1
+            if probe:
+                endpoint.probing = False
+            # A loser may still fail after the winner returned; mark its error as seen
+            if not task.cancelled():
+                task.exception()
+
+        task = asyncio.create_task(self._attempt(endpoint, call))
+        task.add_done_callback(finished)
+        return task
+
+    async def read(self, operation: str, call: Callable[[object], Awaitable[T]]) -> T:
+        """Run `call(rest_client)` on the best node, hedging past its p95 and failing over on node errors"""
+        candidates = self.ranked()
+        pending: Dict[asyncio.Task, Endpoint] = {}
+        hedged = False
+        last_error: Optional[BaseException] = None
+
+        def launch() -> Endpoint:
+            endpoint = candidates.pop(0)
+            pending[self._start(endpoint, call)] = endpoint
+            return endpoint
+
+        primary = launch()
+        try:
+            while pending:
+                can_hedge = self.hedge and not hedged and candidates and len(pending) == 1
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=self._hedge_delay(primary) if can_hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    hedged = True
+                    FULLNODE_HEDGES.labels(operation).inc()
+                    launch()
+                    continue
+                for task in done:
+                    pending.pop(task)
+                    error = task.exception()
+                    if error is None:
+                        return task.result()
+                    if not _is_node_failure(error):
+                        raise error
+                    last_error = error
+                if not pending and candidates:
+                    # Fail over to the next node
+                    primary = launch()
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def snapshot(self) -> List[dict]:
+        now = time.monotonic()
+        return [endpoint.snapshot(now) for endpoint in self.endpoints]
+
+    async def close(self) -> None:
+        for endpoint in self.endpoints:
+            await endpoint.close()
+
+
+def node_urls() -> List[str]:
+    """APTOS_NODE_URLS (comma-separated), falling back to the single APTOS_NODE_URL"""
+    urls = [url.strip() for url in os.getenv("APTOS_NODE_URLS", "").split(",") if url.strip()]
+    return urls or [os.getenv("APTOS_NODE_URL", "https://fullnode.testnet.aptoslabs.com/v1")]
@@ -0,0 +1,116 @@
+"""
+Health Monitor
+Checks the DB pool and Aptos fullnode in the background and serves cached results
+"""
+import asyncio
+import os
+import time
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+
+from aptos_service import aptos_service
+from database import engine, read_engine
+
+
+def _ping(db_engine) -> None:
+    with db_engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+
+
+class HealthMonitor:
+    def __init__(self, interval: float = 10.0, timeout: float = 3.0):
+        self.interval = interval
+        self.timeout = timeout
+        self.components = {
+            "database": {"status": "unknown", "critical": True},
+            "aptos_fullnode": {"status": "unknown", "critical": False},
+        }
+        if read_engine is not engine:
+            self.components["database_replica"] = {"status": "unknown", "critical": False}
+        self.ready = False
+        self.last_checked: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def _check(self, name: str, probe) -> None:
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(probe(), timeout=self.timeout)
+            status, error = "up", None
+        except Exception as e:
+            status, error = "down", str(e) or type(e).__name__
+        component = {
+            "status": status,
+            "critical": self.components[name]["critical"],
+            "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+            "checked_at": datetime.now().isoformat(),
+        }
+        if error:
+            component["error"] = error
+        self.components[name] = component
+
+    async def _probe_fullnode(self) -> None:
+        # Build the lazily imported REST client off the event loop
+        await run_in_threadpool(getattr, aptos_service, "client")
+        result = await aptos_service.get_ledger_info()
+        if not result["success"]:
+            raise RuntimeError(result["error"])
+
+    async def check_once(self) -> None:
+        """Run every component check concurrently and refresh the cached state"""
+        checks = [
+            self._check("database", lambda: run_in_threadpool(_ping, engine)),
+            self._check("aptos_fullnode", self._probe_fullnode),
+        ]
+        if "database_replica" in self.components:
+            checks.append(self._check("database_replica", lambda: run_in_threadpool(_ping, read_engine)))
+        await asyncio.gather(*checks)
+        self.ready = all(
+            c["status"] == "up" for c in self.components.values() if c["critical"]
+        )
+        self.last_checked = datetime.now().isoformat()
+
+    async def _run(self) -> None:
+        while True:
+            await self.check_once()
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def liveness(self) -> dict:
+        """Cheap liveness answer from the cached database state"""
+        db_up = self.components["database"]["status"] == "up"
+        return {
+            "status": "healthy" if db_up else "unhealthy",
+            "timestamp": datetime.now().isoformat(),
+            "service": "Valynce API",
+            "database": "connected" if db_up else "disconnected",
+        }
+
+    def readiness(self) -> dict:
+        """Readiness with per-component detail from the last background check"""
+        return {
+            "ready": self.ready,
+            "last_checked": self.last_checked,
+            "components": self.components,
+        }
+
+
+# Singleton instance
+health_monitor = HealthMonitor(
+    interval=float(os.getenv("HEALTH_CHECK_INTERVAL", "10")),
+    timeout=float(os.getenv("HEALTH_CHECK_TIMEOUT", "3")),
+)
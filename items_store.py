@@ -0,0 +1,172 @@
+"""
+Items Store
+Storage behind the /items CRUD routes: an id-keyed in-memory store or the database
+"""
+import os
+from abc import ABC, abstractmethod
+from datetime import datetime
+from itertools import count, islice
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+from fastapi.concurrency import run_in_threadpool
+
+from database import SessionLocal
+from models import ItemRecord
+
+load_dotenv()
+
+ITEM_FIELDS = ("id", "name", "description", "price", "created_at")
+
+
+class ItemStore(ABC):
+    """Async item storage; items are plain dicts with ITEM_FIELDS"""
+
+    @abstractmethod
+    async def list(self, name: Optional[str] = None, offset: int = 0, limit: Optional[int] = None) -> List[dict]:
+        """Items in creation order, optionally only those with an exact `name`"""
+
+    @abstractmethod
+    async def get(self, item_id: int) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def create(self, data: dict) -> dict:
+        ...
+
+    @abstractmethod
+    async def update(self, item_id: int, changes: dict) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def delete(self, item_id: int) -> bool:
+        ...
+
+
+class InMemoryItemStore(ItemStore):
+    """Dict keyed by id with a name index; ids are only unique within one worker process"""
+
+    def __init__(self):
+        self._items: Dict[int, dict] = {}
+        # name -> ids, kept in insertion (= id) order by using dicts as ordered sets
+        self._by_name: Dict[str, Dict[int, None]] = {}
+        self._ids = count(1)
+
+    def _index(self, item: dict):
+        self._by_name.setdefault(item["name"], {})[item["id"]] = None
+
+    def _unindex(self, item: dict):
+        ids = self._by_name.get(item["name"])
+        if ids is not None:
+            ids.pop(item["id"], None)
+            if not ids:
+                del self._by_name[item["name"]]
+
+    async def list(self, name: Optional[str] = None, offset: int = 0, limit: Optional[int] = None) -> List[dict]:
+        if name is None:
+            items = iter(self._items.values())
+        else:
+            items = (self._items[item_id] for item_id in self._by_name.get(name, ()))
+        stop = offset + limit if limit is not None else None
+        return list(islice(items, offset, stop))
+
+    async def get(self, item_id: int) -> Optional[dict]:
+        return self._items.get(item_id)
+
+    async def create(self, data: dict) -> dict:
+        item = {**data, "id": next(self._ids), "created_at": datetime.now()}
+        self._items[item["id"]] = item
+        self._index(item)
+        return item
+
+    async def update(self, item_id: int, changes: dict) -> Optional[dict]:
+        item = self._items.get(item_id)
+        if item is None:
+            return None
+        updated = {**item, **changes}
+        self._unindex(item)
+        self._items[item_id] = updated
+        self._index(updated)
+        return updated
+
+    async def delete(self, item_id: int) -> bool:
+        item = self._items.pop(item_id, None)
+        if item is None:
+            return False
+        self._unindex(item)
+        return True
+
+
+class DatabaseItemStore(ItemStore):
+    """Items in the `items` table, shared by every worker (ids from the database)"""
+
+    @staticmethod
+    def _as_dict(record) -> dict:
+        return {field: getattr(record, field) for field in ITEM_FIELDS}
+
+    @staticmethod
+    def _run(work, *args):
+        with SessionLocal() as db:
+            return work(db, *args)
+
+    def _list(self, db, name, offset, limit):
+        query = db.query(ItemRecord)
+        if name is not None:
+            query = query.filter(ItemRecord.name == name)
+        query = query.order_by(ItemRecord.id).offset(offset)
+        if limit is not None:
+            query = query.limit(limit)
+        return [self._as_dict(record) for record in query]
+
+    def _get(self, db, item_id):
+        record = db.get(ItemRecord, item_id)
+        return self._as_dict(record) if record else None
+
+    def _create(self, db, data):
+        record = ItemRecord(**{key: data[key] for key in ("name", "description", "price")})
+        db.add(record)
+        db.commit()
+        return self._as_dict(record)
+
+    def _update(self, db, item_id, changes):
+        record = db.get(ItemRecord, item_id)
+        if record is None:
+            return None
+        for key, value in changes.items():
+            setattr(record, key, value)
+        db.commit()
+        return self._as_dict(record)
+
+    def _delete(self, db, item_id):
+        deleted = db.query(ItemRecord).filter(ItemRecord.id == item_id).delete()
+        db.commit()
+        return deleted > 0
+
+    async def list(self, name: Optional[str] = None, offset: int = 0, limit: Optional[int] = None) -> List[dict]:
+        return await run_in_threadpool(self._run, self._list, name, offset, limit)
+
+    async def get(self, item_id: int) -> Optional[dict]:
+        return await run_in_threadpool(self._run, self._get, item_id)
+
+    async def create(self, data: dict) -> dict:
+        return await run_in_threadpool(self._run, self._create, data)
+
+    async def update(self, item_id: int, changes: dict) -> Optional[dict]:
+        return await run_in_threadpool(self._run, self._update, item_id, changes)
+
+    async def delete(self, item_id: int) -> bool:
+        return await run_in_threadpool(self._run, self._delete, item_id)
+
+
+def build_items_store(backend: Optional[str] = None) -> ItemStore:
+    """Create the store for ITEMS_BACKEND (memory by default, or database)"""
+    backend = backend or os.getenv("ITEMS_BACKEND", "memory")
+    if backend == "memory":
+        return InMemoryItemStore()
+    if backend == "database":
+        return DatabaseItemStore()
+    raise ValueError(f"Unsupported ITEMS_BACKEND: {backend}")
+
+
+# Singleton instance
+items_store = build_items_store()
@@ -0,0 +1,105 @@
+"""
+License Expiry Sweeper
+Periodically deactivates licenses whose expires_at has passed, in batches
+"""
+import asyncio
+import os
+import random
+import time
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import select, update
+from starlette.concurrency import run_in_threadpool
+
+from cache import cache
+from database import SessionLocal
+from metrics import LICENSE_SWEEP_DURATION, LICENSES_EXPIRED
+from models import License, User
+
+
+def access_cache_key(wallet_address: str, dataset_id: int) -> str:
+    """Shared-cache key of a wallet's access decision for a dataset"""
+    return f"access:{wallet_address}:{dataset_id}"
+
+
+def _expire_batch(batch_size: int) -> List[Tuple[int, str, int]]:
+    """Deactivate up to batch_size expired licenses; returns (id, wallet, dataset_id) of each"""
+    with SessionLocal() as db:
+        # Served by the partial index ix_licenses_active_expires_at; SKIP LOCKED lets
+        # every worker run the sweeper without deactivating the same rows
+        expired = db.execute(
+            select(License.id, User.wallet_address, License.dataset_id)
+            .join(User, User.id == License.user_id)
+            .where(License.is_active, License.expires_at.is_not(None), License.expires_at <= datetime.utcnow())
+            .order_by(License.expires_at)
+            .limit(batch_size)
+            .with_for_update(of=License, skip_locked=True)
+        ).all()
+        if expired:
+            db.execute(
+                update(License)
+                .where(License.id.in_([row.id for row in expired]))
+                .values(is_active=False)
+            )
+            db.commit()
+        return [tuple(row) for row in expired]
+
+
+class LicenseExpirySweeper:
+    def __init__(self, interval: float = 60.0, batch_size: int = 1000, max_batches: int = 100):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+        self.last_run: Optional[str] = None
+        self.last_expired = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def sweep_once(self) -> int:
+        """Deactivate expired licenses batch by batch and evict their cached access decisions"""
+        start = time.perf_counter()
+        total = 0
+        for _ in range(self.max_batches):
+            expired = await run_in_threadpool(_expire_batch, self.batch_size)
+            if expired:
+                await cache.delete(*(access_cache_key(wallet, dataset_id) for _, wallet, dataset_id in expired))
+                LICENSES_EXPIRED.inc(len(expired))
+                total += len(expired)
+            if len(expired) < self.batch_size:
+                break
+        LICENSE_SWEEP_DURATION.observe(time.perf_counter() - start)
+        self.last_run = datetime.now().isoformat()
+        self.last_expired = total
+        if total:
+            print(f"⏳ Deactivated {total} expired licenses")
+        return total
+
+    async def _run(self) -> None:
+        # Spread workers out so they don't all sweep at the same instant
+        await asyncio.sleep(random.uniform(0, self.interval))
+        while True:
+            try:
+                await self.sweep_once()
+            except Exception as e:
+                print(f"❌ License expiry sweep failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Singleton instance (LICENSE_SWEEP_INTERVAL=0 disables the background job)
+license_sweeper = LicenseExpirySweeper(
+    interval=float(os.getenv("LICENSE_SWEEP_INTERVAL", "60")),
+    batch_size=int(os.getenv("LICENSE_SWEEP_BATCH_SIZE", "1000")),
+)
@@ -1,28 +1,59 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime
+from contextlib import asynccontextmanager
 import uvicorn
-from database import test_db_connection, init_db
+from database import engine, read_engine, validate_pool_capacity, validate_replica_cache
+from aptos_service import aptos_service
+from compression import CompressionMiddleware, compression_settings
+from cache import cache
+from metrics import MetricsMiddleware, instrument_engine, mark_worker_exit, metrics_response
+from sql_profiling import install_sql_profiling
+from health import health_monitor
+from items_store import items_store
+from license_expiry import license_sweeper
+from analytics import analytics_job
+from realtime import realtime_hub
+from uploads import upload_sweeper
+from rate_limit import UpstreamSaturated
 from aptos_routes import router as aptos_router
 from dataset_routes import router as dataset_router
+from analytics_routes import router as analytics_router
+from realtime_routes import router as realtime_router
+from upload_routes import router as upload_router
+
+# Application lifespan: keep start-up free of network round trips.
+# Schema changes are an explicit step (`python manage.py migrate`), not part of boot.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    print("🚀 Starting Valynce API...")
+    validate_pool_capacity()
+    validate_replica_cache()
+    health_monitor.start()
+    license_sweeper.start()
+    analytics_job.start()
+    upload_sweeper.start()
+    yield
+    await upload_sweeper.stop()
+    await analytics_job.stop()
+    await realtime_hub.stop()
+    await license_sweeper.stop()
+    await health_monitor.stop()
+    await aptos_service.close()
+    await cache.close()
+    mark_worker_exit()
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Valynce API",
     description="Dataset Marketplace with Aptos Blockchain Integration",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
-# Test database connection and initialize on startup
-@app.on_event("startup")
-async def startup_event():
-    print("🚀 Starting Valynce API...")
-    test_db_connection()
-    init_db()
-    print("✅ Database initialized!")
-
 # CORS middleware configuration
 app.add_middleware(
     CORSMiddleware,
@@ -32,9 +63,33 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Response compression (brotli/gzip) with precompressed hot payloads
+app.add_middleware(CompressionMiddleware, **compression_settings())
+
+# Prometheus metrics: route latency, DB pool and Aptos upstream stats
+app.add_middleware(MetricsMiddleware, fastapi_app=app)
+instrument_engine(engine)
+if read_engine is not engine:
+    instrument_engine(read_engine, "replica")
+
+# Opt-in per-request SQL profiling (SQL_PROFILING=true)
+install_sql_profiling(app, *{engine, read_engine})
+
+# Admission control: fail fast when outbound Aptos capacity is exhausted
+@app.exception_handler(UpstreamSaturated)
+async def upstream_saturated_handler(request: Request, exc: UpstreamSaturated):
+    return JSONResponse(
+        {"detail": str(exc)},
+        status_code=503,
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
 # Include routers
 app.include_router(aptos_router)
 app.include_router(dataset_router)
+app.include_router(analytics_router)
+app.include_router(realtime_router)
+app.include_router(upload_router)
 
 # Pydantic models
 class Item(BaseModel):
@@ -49,10 +104,6 @@ class ItemUpdate(BaseModel):
     description: Optional[str] = None
     price: Optional[float] = None
 
-# In-memory storage (replace with database in production)
-items_db: List[Item] = []
-item_counter = 1
-
 # Root endpoint
 @app.get("/")
 async def root():
@@ -62,71 +113,75 @@ async def root():
         "version": "2.0.0",
         "docs": "/docs",
         "health": "/health",
+        "ready": "/ready",
         "aptos": "/aptos",
         "datasets": "/api/datasets"
     }
 
-# Health check endpoint
+# Health check endpoint (liveness, served from the background monitor's cache)
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    db_status = test_db_connection()
-    return {
-        "status": "healthy" if db_status else "unhealthy",
-        "timestamp": datetime.now().isoformat(),
-        "service": "Valynce API",
-        "database": "connected" if db_status else "disconnected"
-    }
+    return health_monitor.liveness()
+
+# Readiness endpoint with per-component detail
+@app.get("/ready")
+async def readiness_check():
+    """Readiness check endpoint"""
+    readiness = health_monitor.readiness()
+    return JSONResponse(readiness, status_code=200 if readiness["ready"] else 503)
+
+# Prometheus scrape endpoint
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Expose Prometheus metrics"""
+    return metrics_response()
 
 # Get all items
 @app.get("/items", response_model=List[Item])
-async def get_items():
-    """Get all items"""
-    return items_db
+async def get_items(
+    name: Optional[str] = None,
+    page: Optional[int] = Query(None, ge=1),
+    page_size: int = Query(50, ge=1, le=200)
+):
+    """Get all items, optionally by exact name (paged when `page` is given)"""
+    if page is None:
+        return await items_store.list(name=name)
+    return await items_store.list(name=name, offset=(page - 1) * page_size, limit=page_size)
 
 # Get item by ID
 @app.get("/items/{item_id}", response_model=Item)
 async def get_item(item_id: int):
     """Get a specific item by ID"""
-    for item in items_db:
-        if item.id == item_id:
-            return item
-    raise HTTPException(status_code=404, detail="Item not found")
+    item = await items_store.get(item_id)
+    if item is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return item
 
 # Create new item
 @app.post("/items", response_model=Item, status_code=201)
 async def create_item(item: Item):
     """Create a new item"""
-    global item_counter
-    item.id = item_counter
-    item.created_at = datetime.now()
-    item_counter += 1
-    items_db.append(item)
-    return item
+    return await items_store.create(item.dict(exclude={"id", "created_at"}))
 
 # Update item
 @app.put("/items/{item_id}", response_model=Item)
 async def update_item(item_id: int, item_update: ItemUpdate):
     """Update an existing item"""
-    for idx, item in enumerate(items_db):
-        if item.id == item_id:
-            updated_data = item_update.dict(exclude_unset=True)
-            updated_item = item.copy(update=updated_data)
-            items_db[idx] = updated_item
-            return updated_item
-    raise HTTPException(status_code=404, detail="Item not found")
+    updated_item = await items_store.update(item_id, item_update.dict(exclude_unset=True))
+    if updated_item is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return updated_item
 
 # Delete item
 @app.delete("/items/{item_id}")
 async def delete_item(item_id: int):
     """Delete an item"""
-    for idx, item in enumerate(items_db):
-        if item.id == item_id:
-            items_db.pop(idx)
-            return {"message": f"Item {item_id} deleted successfully"}
-    raise HTTPException(status_code=404, detail="Item not found")
+    if not await items_store.delete(item_id):
+        raise HTTPException(status_code=404, detail="Item not found")
+    return {"message": f"Item {item_id} deleted successfully"}
 
-# Run the application
+# Run the application (development; production uses server.py)
 if __name__ == "__main__":
     uvicorn.run(
         "main:app",
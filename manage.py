@@ -0,0 +1,210 @@
+"""
+Management CLI
+Explicit operational steps that must not run on every worker boot
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def _alembic_config():
+    from alembic.config import Config
+
+    return Config(os.path.join(ROOT, "alembic.ini"))
+
+
+def migrate_command(args):
+    """Upgrade the schema to a revision (default: latest)"""
+    from alembic import command
+
+    command.upgrade(_alembic_config(), args.revision, sql=args.sql)
+    return 0
+
+
+def rollback_command(args):
+    """Downgrade the schema (default: one revision)"""
+    from alembic import command
+
+    command.downgrade(_alembic_config(), args.revision, sql=args.sql)
+    return 0
+
+
+def makemigrations_command(args):
+    """Autogenerate a revision from the difference between models and the database"""
+    from alembic import command
+
+    command.revision(_alembic_config(), message=args.message, autogenerate=not args.empty)
+    return 0
+
+
+def stamp_command(args):
+    """Record a revision as applied without running it"""
+    from alembic import command
+
+    command.stamp(_alembic_config(), args.revision)
+    return 0
+
+
+def current_command(args):
+    """Show the revision the database is at"""
+    from alembic import command
+
+    command.current(_alembic_config(), verbose=args.verbose)
+    return 0
+
+
+def history_command(args):
+    """List revisions"""
+    from alembic import command
+
+    command.history(_alembic_config(), verbose=args.verbose)
+    return 0
+
+
+def init_db_command(args):
+    """Bring a database up to the latest schema"""
+    from database import test_db_connection
+
+    if not test_db_connection():
+        return 1
+    args.revision, args.sql = "head", False
+    return migrate_command(args)
+
+
+def check_db_command(args):
+    """Verify the database is reachable, the pools fit its connection limit and a replica has a shared cache"""
+    from database import WORKER_COUNT, test_db_connection, validate_pool_capacity, validate_replica_cache
+
+    if not test_db_connection():
+        return 1
+    try:
+        validate_pool_capacity(args.workers or WORKER_COUNT)
+        validate_replica_cache(args.workers or WORKER_COUNT)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return 1
+    return 0
+
+
+def settle_royalties_command(args):
+    """Compute and pay out royalties for a period (default: yesterday, UTC)"""
+    from royalties import SettlementInProgress, preview_period, settle_period
+
+    end = datetime.fromisoformat(args.end) if args.end else datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    start = datetime.fromisoformat(args.start) if args.start else end - timedelta(days=1)
+    if start >= end:
+        print("❌ --start must be before --end")
+        return 1
+
+    if args.dry_run:
+        print(json.dumps(preview_period(start, end), indent=2))
+        return 0
+
+    from aptos_sdk.account import Account
+
+    private_key = os.getenv("APTOS_PRIVATE_KEY")
+    if not private_key:
+        print("❌ APTOS_PRIVATE_KEY is required to sign Royalties::distribute")
+        return 1
+    try:
+        summary = asyncio.run(settle_period(
+            start, end, Account.load_key(private_key), batch_size=args.batch_size, retry_failed=args.retry_failed
+        ))
+    except (ValueError, SettlementInProgress) as e:
+        print(f"❌ {e}")
+        return 1
+    print(json.dumps(summary, indent=2))
+    return 0 if summary["status"] == "settled" else 1
+
+
+def rollup_analytics_command(args):
+    """Fold licenses and ledger transactions into the analytics rollups (backfill or catch up)"""
+    from analytics import roll_up
+
+    consumed = roll_up(batch_size=args.batch_size, settle_seconds=args.settle_seconds)
+    print(json.dumps(consumed, indent=2))
+    return 0
+
+
+def build_recommendations_command(args):
+    """Recompute the precomputed similar-dataset lists (changed datasets only unless --full)"""
+    from recommendations import recommendation_job
+
+    if args.top_k:
+        recommendation_job.k = args.top_k
+    if args.watch:
+        # Dedicated process: rebuilds are too heavy for the API workers
+        if recommendation_job.interval <= 0:
+            print("❌ --watch needs RECOMMENDATIONS_INTERVAL > 0")
+            return 1
+        print(f"🔁 Rebuilding recommendations every {recommendation_job.interval:.0f}s")
+        asyncio.run(recommendation_job.run_forever())
+        return 0
+    result = asyncio.run(recommendation_job.run_once(full=args.full))
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Valynce management commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    sub = subparsers.add_parser("migrate", help="Apply migrations up to a revision")
+    sub.add_argument("revision", nargs="?", default="head")
+    sub.add_argument("--sql", action="store_true", help="Print SQL instead of executing it")
+    sub.set_defaults(func=migrate_command)
+
+    sub = subparsers.add_parser("rollback", help="Revert migrations down to a revision")
+    sub.add_argument("revision", nargs="?", default="-1")
+    sub.add_argument("--sql", action="store_true", help="Print SQL instead of executing it")
+    sub.set_defaults(func=rollback_command)
+
+    sub = subparsers.add_parser("makemigrations", help="Create a new revision")
+    sub.add_argument("-m", "--message", required=True)
+    sub.add_argument("--empty", action="store_true", help="Don't autogenerate operations")
+    sub.set_defaults(func=makemigrations_command)
+
+    sub = subparsers.add_parser("stamp", help="Mark a revision as applied")
+    sub.add_argument("revision")
+    sub.set_defaults(func=stamp_command)
+
+    for name, func in (("current", current_command), ("history", history_command)):
+        sub = subparsers.add_parser(name, help=func.__doc__)
+        sub.add_argument("-v", "--verbose", action="store_true")
+        sub.set_defaults(func=func)
+
+    subparsers.add_parser("init-db", help="Migrate the database to the latest schema").set_defaults(func=init_db_command)
+    sub = subparsers.add_parser("check-db", help="Test the database connection and pool sizing")
+    sub.add_argument("--workers", type=int, default=None, help="Worker count to validate (default: WEB_CONCURRENCY)")
+    sub.set_defaults(func=check_db_command)
+
+    sub = subparsers.add_parser("settle-royalties", help="Pay out royalties for a sales period")
+    sub.add_argument("--start", help="Period start, ISO date/time (default: end - 1 day)")
+    sub.add_argument("--end", help="Period end, exclusive (default: today 00:00 UTC)")
+    sub.add_argument("--batch-size", type=int, default=None, help="Payouts per distribute batch")
+    sub.add_argument("--retry-failed", action="store_true", help="Resubmit payouts whose batch failed")
+    sub.add_argument("--dry-run", action="store_true", help="Print totals without recording or paying")
+    sub.set_defaults(func=settle_royalties_command)
+
+    sub = subparsers.add_parser("rollup-analytics", help="Catch the analytics rollups up with new sales")
+    sub.add_argument("--batch-size", type=int, default=5000, help="Source rows per transaction")
+    sub.add_argument("--settle-seconds", type=float, default=10.0, help="Leave rows newer than this for the next run")
+    sub.set_defaults(func=rollup_analytics_command)
+
+    sub = subparsers.add_parser("build-recommendations", help="Rebuild the similar-dataset lists")
+    sub.add_argument("--full", action="store_true", help="Recompute every dataset, not just changed ones")
+    sub.add_argument("--top-k", type=int, default=None, help="Neighbours kept per dataset (default: RECOMMENDATIONS_TOP_K)")
+    sub.add_argument("--watch", action="store_true", help="Keep running, rebuilding every RECOMMENDATIONS_INTERVAL seconds")
+    sub.set_defaults(func=build_recommendations_command)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
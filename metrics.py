@@ -0,0 +1,231 @@
+"""
+Prometheus Metrics
+Per-route latency, DB pool state and Aptos upstream call statistics
+"""
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+from prometheus_client.core import GaugeMetricFamily, REGISTRY
+from starlette.responses import Response
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Buckets tuned for an API whose fast paths answer in a few ms and slow ones in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being served",
+    ["method", "route"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_CHECKOUT = Histogram(
+    "db_pool_checkout_seconds",
+    "Time spent acquiring a pooled connection (queue wait, connect and pre-ping)",
+    ["pool"],
+    buckets=LATENCY_BUCKETS,
+)
+UPSTREAM_LATENCY = Histogram(
+    "aptos_upstream_duration_seconds",
+    "Latency of calls to the Aptos fullnode and faucet",
+    ["upstream", "operation"],
+    buckets=LATENCY_BUCKETS,
+)
+UPSTREAM_ERRORS = Counter(
+    "aptos_upstream_errors_total",
+    "Failed calls to the Aptos fullnode and faucet",
+    ["upstream", "operation"],
+)
+FULLNODE_REQUESTS = Counter(
+    "aptos_fullnode_requests_total",
+    "Fullnode read attempts per node (hedges included) by outcome: ok, error, cancelled",
+    ["node", "outcome"],
+)
+FULLNODE_HEDGES = Counter(
+    "aptos_fullnode_hedged_reads_total",
+    "Reads duplicated to a second fullnode after running past the first one's p95",
+    ["operation"],
+)
+FULLNODE_EJECTED = Gauge(
+    "aptos_fullnode_ejected",
+    "1 while a fullnode's circuit breaker keeps it out of rotation",
+    ["node"],
+    multiprocess_mode="livemax",
+)
+RATE_LIMITED = Counter(
+    "rate_limited_requests_total",
+    "Requests rejected with 429 by a route rate limit",
+    ["limit", "key"],
+)
+ADMISSION_REJECTED = Counter(
+    "admission_rejected_total",
+    "Outbound calls rejected because the concurrency cap and its queue were full",
+    ["upstream"],
+)
+LICENSES_EXPIRED = Counter(
+    "licenses_expired_total",
+    "Licenses deactivated by the expiry sweeper",
+)
+LICENSE_SWEEP_DURATION = Histogram(
+    "license_sweep_duration_seconds",
+    "Duration of one license expiry sweep",
+    buckets=LATENCY_BUCKETS,
+)
+ANALYTICS_ROWS_ROLLED_UP = Counter(
+    "analytics_rows_rolled_up_total",
+    "Source rows folded into the analytics rollups",
+    ["source"],
+)
+RECOMMENDATION_ROWS_UPDATED = Counter(
+    "recommendation_rows_updated_total",
+    "Similar-dataset lists rewritten by the recommendation job",
+    ["mode"],
+)
+REALTIME_CONNECTIONS = Gauge(
+    "realtime_connections",
+    "Open realtime subscription connections",
+    ["transport"],
+    multiprocess_mode="livesum",
+)
+REALTIME_WATCHERS = Gauge(
+    "realtime_watchers",
+    "Subjects currently watched (one watcher per subject per worker)",
+    ["kind"],
+    multiprocess_mode="livesum",
+)
+REALTIME_EVENTS_DROPPED = Counter(
+    "realtime_events_dropped_total",
+    "Events dropped from full subscriber queues (slow consumers)",
+)
+SINGLEFLIGHT_EXECUTIONS = Counter(
+    "singleflight_executions_total",
+    "Fetches actually executed by a single-flight group",
+    ["flight"],
+)
+SINGLEFLIGHT_COALESCED = Counter(
+    "singleflight_coalesced_total",
+    "Requests served by joining an identical in-flight fetch",
+    ["flight"],
+)
+
+
+def _route_template(app, scope: Scope) -> str:
+    """Resolve the route path template so ids don't explode label cardinality"""
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", scope["path"])
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """Records per-route latency histograms and in-flight gauges"""
+
+    def __init__(self, app: ASGIApp, fastapi_app):
+        self.app = app
+        self.fastapi_app = fastapi_app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = _route_template(self.fastapi_app, scope)
+        status = "500"
+
+        async def send_with_status(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        in_flight = REQUESTS_IN_FLIGHT.labels(method, route)
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUEST_LATENCY.labels(method, route, status).observe(time.perf_counter() - start)
+            in_flight.dec()
+
+
+class PoolCollector:
+    """Reads SQLAlchemy QueuePool counters at scrape time"""
+
+    GAUGES = (
+        ("db_pool_size", "Configured pool size", lambda pool: pool.size()),
+        ("db_pool_checked_out", "Connections currently checked out", lambda pool: pool.checkedout()),
+        ("db_pool_checked_in", "Idle connections in the pool", lambda pool: pool.checkedin()),
+        # QueuePool.overflow() counts up from -pool_size until the pool is full
+        ("db_pool_overflow", "Connections open beyond pool_size", lambda pool: max(pool.overflow(), 0)),
+    )
+
+    def __init__(self):
+        self.engines = {}
+
+    def collect(self):
+        # NullPool and friends don't keep counters
+        pools = {
+            name: engine.pool for name, engine in self.engines.items() if hasattr(engine.pool, "checkedout")
+        }
+        for metric_name, documentation, reader in self.GAUGES:
+            family = GaugeMetricFamily(metric_name, documentation, labels=["pool"])
+            for name, pool in pools.items():
+                family.add_metric([name], reader(pool))
+            yield family
+
+
+POOL_COLLECTOR = PoolCollector()
+REGISTRY.register(POOL_COLLECTOR)
+
+
+def _observe_checkout(pool_name: str, seconds: float):
+    DB_POOL_CHECKOUT.labels(pool_name).observe(seconds)
+
+
+def instrument_engine(engine, name: str = "primary"):
+    """Export pool gauges and checkout wait time for an engine"""
+    from database import checkout_wait_observers
+
+    POOL_COLLECTOR.engines[name] = engine
+    if _observe_checkout not in checkout_wait_observers:
+        checkout_wait_observers.append(_observe_checkout)
+
+
+@contextmanager
+def observe_upstream(upstream: str, operation: str):
+    """Time an Aptos fullnode/faucet call and count it as an error if it raises"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        UPSTREAM_ERRORS.labels(upstream, operation).inc()
+        raise
+    finally:
+        UPSTREAM_LATENCY.labels(upstream, operation).observe(time.perf_counter() - start)
+
+
+def metrics_response() -> Response:
+    """Render all registered metrics in the Prometheus text format"""
+    if not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
+    # Multi-worker mode (server.py): merge every worker's samples; pool gauges are this worker's
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    registry.register(POOL_COLLECTOR)
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+
+def mark_worker_exit():
+    """Drop this worker's live gauges from the multi-worker aggregate"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(os.getpid())
@@ -0,0 +1,47 @@
+"""
+Online Schema Change Helpers
+Index builds that don't lock writers on Postgres (CREATE INDEX CONCURRENTLY)
+"""
+from alembic import op
+from sqlalchemy import text
+
+
+def _is_postgres() -> bool:
+    return op.get_bind().dialect.name == "postgresql"
+
+
+def _drop_invalid_index(name: str):
+    # A failed CONCURRENTLY build leaves an INVALID index behind that IF NOT EXISTS would skip
+    if op.get_context().as_sql:
+        return
+    invalid = op.get_bind().execute(text(
+        "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE c.relname = :name AND NOT i.indisvalid"
+    ), {"name": name}).first()
+    if invalid:
+        op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"')
+
+
+def create_index_concurrently(name: str, table: str, columns, unique: bool = False, **kw):
+    """Create an index without blocking writes on Postgres; a plain CREATE INDEX elsewhere
+
+    Postgres refuses CONCURRENTLY inside a transaction, so the build runs in an
+    autocommit block (env.py uses one transaction per migration to allow this).
+    """
+    if not _is_postgres():
+        op.create_index(name, table, columns, unique=unique, if_not_exists=True, **kw)
+        return
+    with op.get_context().autocommit_block():
+        _drop_invalid_index(name)
+        op.create_index(
+            name, table, columns, unique=unique, if_not_exists=True, postgresql_concurrently=True, **kw
+        )
+
+
+def drop_index_concurrently(name: str, table: str):
+    """Drop an index without blocking writes on Postgres"""
+    if not _is_postgres():
+        op.drop_index(name, table_name=table, if_exists=True)
+        return
+    with op.get_context().autocommit_block():
+        op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
@@ -0,0 +1,96 @@
+"""Initial schema (users, datasets, licenses, transactions)
+
+Databases created earlier by Base.metadata.create_all already have these tables;
+they are left untouched so the revision can be applied to them as a baseline.
+
+Revision ID: 0001
+Revises:
+Create Date: 2025-11-20 10:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Offline (--sql) runs have no connection to inspect
+    existing = set() if op.get_context().as_sql else set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "users" not in existing:
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("wallet_address", sa.String(), nullable=True),
+            sa.Column("username", sa.String(), nullable=True),
+            sa.Column("email", sa.String(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.UniqueConstraint("username"),
+            sa.UniqueConstraint("email"),
+        )
+        op.create_index("ix_users_id", "users", ["id"])
+        op.create_index("ix_users_wallet_address", "users", ["wallet_address"], unique=True)
+
+    if "datasets" not in existing:
+        op.create_table(
+            "datasets",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("title", sa.String(), nullable=True),
+            sa.Column("description", sa.Text(), nullable=True),
+            sa.Column("category", sa.String(), nullable=True),
+            sa.Column("file_hash", sa.String(), nullable=True),
+            sa.Column("ipfs_uri", sa.String(), nullable=True),
+            sa.Column("price_apt", sa.Float(), nullable=True),
+            sa.Column("per_query_price", sa.Float(), nullable=True),
+            sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+            sa.Column("nft_minted", sa.Boolean(), nullable=True),
+            sa.Column("blockchain_tx", sa.String(), nullable=True),
+            sa.Column("size_mb", sa.Float(), nullable=True),
+            sa.Column("format", sa.String(), nullable=True),
+            sa.Column("tags", sa.String(), nullable=True),
+            sa.Column("downloads", sa.Integer(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.UniqueConstraint("file_hash"),
+        )
+        op.create_index("ix_datasets_id", "datasets", ["id"])
+        op.create_index("ix_datasets_title", "datasets", ["title"])
+
+    if "licenses" not in existing:
+        op.create_table(
+            "licenses",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+            sa.Column("dataset_id", sa.Integer(), sa.ForeignKey("datasets.id"), nullable=True),
+            sa.Column("license_type", sa.Integer(), nullable=True),
+            sa.Column("expires_at", sa.DateTime(), nullable=True),
+            sa.Column("transaction_hash", sa.String(), nullable=True),
+            sa.Column("price_paid", sa.Float(), nullable=True),
+            sa.Column("purchased_at", sa.DateTime(), nullable=True),
+        )
+        op.create_index("ix_licenses_id", "licenses", ["id"])
+
+    if "transactions" not in existing:
+        op.create_table(
+            "transactions",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("from_address", sa.String(), nullable=True),
+            sa.Column("to_address", sa.String(), nullable=True),
+            sa.Column("amount_apt", sa.Float(), nullable=True),
+            sa.Column("transaction_type", sa.String(), nullable=True),
+            sa.Column("blockchain_hash", sa.String(), nullable=True),
+            sa.Column("status", sa.String(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.UniqueConstraint("blockchain_hash"),
+        )
+        op.create_index("ix_transactions_id", "transactions", ["id"])
+
+
+def downgrade():
+    op.drop_table("transactions")
+    op.drop_table("licenses")
+    op.drop_table("datasets")
+    op.drop_table("users")
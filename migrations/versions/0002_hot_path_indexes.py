@@ -0,0 +1,37 @@
+"""Composite indexes for the hot lookup paths
+
+Built with CREATE INDEX CONCURRENTLY on Postgres so datasets/licenses/transactions
+stay writable while the indexes are created.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2025-11-20 10:05:00
+"""
+from migrations.online import create_index_concurrently, drop_index_concurrently
+
+# revision identifiers, used by Alembic.
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_licenses_user_id_dataset_id", "licenses", ["user_id", "dataset_id"]),
+    ("ix_licenses_dataset_id_purchased_at", "licenses", ["dataset_id", "purchased_at"]),
+    ("ix_datasets_created_at", "datasets", ["created_at"]),
+    ("ix_datasets_category_created_at", "datasets", ["category", "created_at"]),
+    ("ix_datasets_owner_id_created_at", "datasets", ["owner_id", "created_at"]),
+    ("ix_transactions_from_address_created_at", "transactions", ["from_address", "created_at"]),
+    ("ix_transactions_to_address_created_at", "transactions", ["to_address", "created_at"]),
+    ("ix_transactions_created_at", "transactions", ["created_at"]),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        create_index_concurrently(name, table, columns)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        drop_index_concurrently(name, table)
@@ -0,0 +1,31 @@
+"""Items table for the database-backed /items store (ITEMS_BACKEND=database)
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2025-11-24 09:30:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "items",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("price", sa.Float(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_items_name", "items", ["name"])
+
+
+def downgrade():
+    op.drop_index("ix_items_name", table_name="items")
+    op.drop_table("items")
@@ -0,0 +1,71 @@
+"""Royalty configs, settlement runs and payouts
+
+ix_licenses_purchased_at lets a settlement run aggregate one period without
+scanning the whole licenses table; it is built concurrently on Postgres.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2025-11-26 14:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.online import create_index_concurrently, drop_index_concurrently
+
+# revision identifiers, used by Alembic.
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "royalty_configs",
+        sa.Column("dataset_id", sa.Integer(), sa.ForeignKey("datasets.id"), primary_key=True),
+        sa.Column("main_owner", sa.String(), nullable=False),
+        sa.Column("contributors", sa.JSON(), nullable=False),
+        sa.Column("share_percentage", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    )
+    op.create_table(
+        "royalty_settlement_runs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("period_start", sa.DateTime(), nullable=False),
+        sa.Column("period_end", sa.DateTime(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("dataset_count", sa.Integer(), nullable=True),
+        sa.Column("total_octas", sa.BigInteger(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("completed_at", sa.DateTime(), nullable=True),
+        sa.UniqueConstraint("period_start", "period_end", name="uq_royalty_settlement_runs_period"),
+    )
+    op.create_table(
+        "royalty_payouts",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("run_id", sa.Integer(), sa.ForeignKey("royalty_settlement_runs.id"), nullable=False),
+        sa.Column("dataset_id", sa.Integer(), sa.ForeignKey("datasets.id"), nullable=False),
+        sa.Column("license_count", sa.Integer(), nullable=False),
+        sa.Column("gross_octas", sa.BigInteger(), nullable=False),
+        sa.Column("owner_octas", sa.BigInteger(), nullable=False),
+        sa.Column("contributor_octas", sa.BigInteger(), nullable=False),
+        sa.Column("contributor_count", sa.Integer(), nullable=False),
+        sa.Column("dust_octas", sa.BigInteger(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("transaction_hash", sa.String(), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("settled_at", sa.DateTime(), nullable=True),
+        sa.UniqueConstraint("run_id", "dataset_id", name="uq_royalty_payouts_run_id_dataset_id"),
+    )
+    op.create_index(
+        "ix_royalty_payouts_run_id_status_dataset_id", "royalty_payouts", ["run_id", "status", "dataset_id"]
+    )
+    create_index_concurrently("ix_licenses_purchased_at", "licenses", ["purchased_at"])
+
+
+def downgrade():
+    drop_index_concurrently("ix_licenses_purchased_at", "licenses")
+    op.drop_index("ix_royalty_payouts_run_id_status_dataset_id", table_name="royalty_payouts")
+    op.drop_table("royalty_payouts")
+    op.drop_table("royalty_settlement_runs")
+    op.drop_table("royalty_configs")
@@ -0,0 +1,45 @@
+"""License is_active flag with partial indexes over active licenses
+
+The column gets a constant server default, so adding it doesn't rewrite the
+table on Postgres. Already-expired licenses are not backfilled here; the
+expiry sweeper deactivates them in batches once the app runs.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2025-11-28 11:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.online import create_index_concurrently, drop_index_concurrently
+
+# revision identifiers, used by Alembic.
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+# (name, columns, Postgres predicate, SQLite predicate); SQLite renders boolean filters as "= 1"
+PARTIAL_INDEXES = [
+    ("ix_licenses_active_expires_at", ["expires_at"],
+     "is_active AND expires_at IS NOT NULL", "is_active = 1 AND expires_at IS NOT NULL"),
+    ("ix_licenses_active_user_id", ["user_id"], "is_active", "is_active = 1"),
+]
+
+
+def upgrade():
+    op.add_column(
+        "licenses",
+        sa.Column("is_active", sa.Boolean(), nullable=False, server_default=sa.true()),
+    )
+    for name, columns, pg_where, sqlite_where in PARTIAL_INDEXES:
+        create_index_concurrently(
+            name, "licenses", columns, postgresql_where=sa.text(pg_where), sqlite_where=sa.text(sqlite_where)
+        )
+
+
+def downgrade():
+    for name, *_ in reversed(PARTIAL_INDEXES):
+        drop_index_concurrently(name, "licenses")
+    with op.batch_alter_table("licenses") as batch_op:
+        batch_op.drop_column("is_active")
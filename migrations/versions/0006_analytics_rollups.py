@@ -0,0 +1,45 @@
+"""Analytics rollups (hourly/daily sales and ledger totals) and their watermarks
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2025-12-02 16:20:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "analytics_rollups",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("granularity", sa.String(), nullable=False),
+        sa.Column("dimension", sa.String(), nullable=False),
+        sa.Column("key", sa.String(), nullable=False),
+        sa.Column("bucket", sa.DateTime(), nullable=False),
+        sa.Column("count", sa.BigInteger(), nullable=False),
+        sa.Column("amount_octas", sa.BigInteger(), nullable=False),
+        sa.UniqueConstraint("granularity", "dimension", "key", "bucket", name="uq_analytics_rollups_series"),
+    )
+    op.create_index(
+        "ix_analytics_rollups_granularity_dimension_bucket",
+        "analytics_rollups",
+        ["granularity", "dimension", "bucket"],
+    )
+    op.create_table(
+        "analytics_watermarks",
+        sa.Column("source", sa.String(), primary_key=True),
+        sa.Column("last_id", sa.BigInteger(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_table("analytics_watermarks")
+    op.drop_index("ix_analytics_rollups_granularity_dimension_bucket", table_name="analytics_rollups")
+    op.drop_table("analytics_rollups")
@@ -0,0 +1,188 @@
+"""Store wallet addresses and transaction hashes as 32-byte binary values
+
+users.wallet_address, transactions.from_address/to_address/blockchain_hash and
+licenses.transaction_hash become BYTEA/BLOB holding the canonical 32 bytes
+(see db_types.py); their indexes are rebuilt on the smaller keys.
+
+Users whose addresses only differ in case, 0x prefix or zero padding are merged
+into the oldest one (datasets and licenses move to it). Transaction addresses and
+hashes that don't parse (e.g. the old "0xpending" placeholder) become NULL, and
+later duplicates of a transaction hash lose theirs. Invalid user wallets abort the
+migration so they can be fixed by hand.
+
+On Postgres the column type changes rewrite the tables under an exclusive lock;
+run this in a maintenance window. The downgrade restores long-form hex strings
+but cannot split merged users.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2025-12-05 10:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+# (table, column, kind)
+COLUMNS = [
+    ("users", "wallet_address", "address"),
+    ("transactions", "from_address", "address"),
+    ("transactions", "to_address", "address"),
+    ("transactions", "blockchain_hash", "hash"),
+    ("licenses", "transaction_hash", "hash"),
+]
+
+# Postgres: canonical bytes of a hex column, NULL when it doesn't parse
+_PG_CANONICAL = {
+    "address": (
+        "CASE WHEN {col} ~* '^(0x)?[0-9a-f]{{1,64}}$' "
+        "THEN decode(lpad(regexp_replace(lower({col}), '^0x', ''), 64, '0'), 'hex') END"
+    ),
+    "hash": (
+        "CASE WHEN {col} ~* '^(0x)?[0-9a-f]{{64}}$' "
+        "THEN decode(regexp_replace(lower({col}), '^0x', ''), 'hex') END"
+    ),
+}
+_BATCH_SIZE = 10000
+
+
+def _canonical(kind, value):
+    """Python twin of _PG_CANONICAL (kept here so the migration doesn't depend on app code)"""
+    if value is None:
+        return None
+    digits = value.strip().lower()
+    if digits.startswith("0x"):
+        digits = digits[2:]
+    if not 0 < len(digits) <= 64 or (kind == "hash" and len(digits) != 64):
+        return None
+    try:
+        return bytes.fromhex(digits.rjust(64, "0"))
+    except ValueError:
+        return None
+
+
+def _merge_plan(wallets):
+    """{duplicate user id: id kept} for (id, wallet) rows in id order; raises on invalid wallets"""
+    keep, merges, invalid = {}, {}, []
+    for user_id, wallet in wallets:
+        if wallet is None:
+            continue
+        canonical = _canonical("address", wallet)
+        if canonical is None:
+            invalid.append(user_id)
+        elif canonical in keep:
+            merges[user_id] = keep[canonical]
+        else:
+            keep[canonical] = user_id
+    if invalid:
+        raise RuntimeError(f"users.wallet_address is not an account address for user ids {invalid[:20]}; fix them first")
+    return merges
+
+
+def _upgrade_postgresql():
+    users_canonical = _PG_CANONICAL["address"].format(col="wallet_address")
+    op.execute(f"""
+        DO $$ BEGIN
+            IF EXISTS (SELECT 1 FROM users WHERE wallet_address IS NOT NULL AND ({users_canonical}) IS NULL) THEN
+                RAISE EXCEPTION 'users.wallet_address has values that are not account addresses; fix them first';
+            END IF;
+        END $$
+    """)
+    op.execute(f"""
+        CREATE TEMPORARY TABLE user_merges ON COMMIT DROP AS
+        SELECT id AS old_id, keep_id FROM (
+            SELECT id, min(id) OVER (PARTITION BY {users_canonical}) AS keep_id
+            FROM users WHERE wallet_address IS NOT NULL
+        ) candidates WHERE id <> keep_id
+    """)
+    op.execute("UPDATE datasets SET owner_id = m.keep_id FROM user_merges m WHERE datasets.owner_id = m.old_id")
+    op.execute("UPDATE licenses SET user_id = m.keep_id FROM user_merges m WHERE licenses.user_id = m.old_id")
+    op.execute("DELETE FROM users USING user_merges m WHERE users.id = m.old_id")
+
+    hash_canonical = _PG_CANONICAL["hash"].format(col="blockchain_hash")
+    op.execute(f"""
+        UPDATE transactions SET blockchain_hash = NULL WHERE id IN (
+            SELECT id FROM (
+                SELECT id, row_number() OVER (PARTITION BY {hash_canonical} ORDER BY id) AS n
+                FROM transactions WHERE ({hash_canonical}) IS NOT NULL
+            ) ranked WHERE n > 1
+        )
+    """)
+    for table, column, kind in COLUMNS:
+        op.alter_column(
+            table, column, type_=sa.LargeBinary(),
+            postgresql_using=_PG_CANONICAL[kind].format(col=column),
+        )
+
+
+def _rewrite_sqlite(bind, table, column, convert):
+    """Rewrite a column row by row in batches (SQLite stores any value type in any column)"""
+    last_id = 0
+    while True:
+        rows = bind.execute(sa.text(
+            f"SELECT id, {column} FROM {table} WHERE id > :last_id AND {column} IS NOT NULL ORDER BY id LIMIT :limit"
+        ), {"last_id": last_id, "limit": _BATCH_SIZE}).all()
+        if not rows:
+            return
+        bind.execute(
+            sa.text(f"UPDATE {table} SET {column} = :value WHERE id = :id"),
+            [{"id": row[0], "value": convert(row[1])} for row in rows],
+        )
+        last_id = rows[-1][0]
+
+
+def _upgrade_sqlite():
+    bind = op.get_bind()
+    merges = _merge_plan(bind.execute(sa.text("SELECT id, wallet_address FROM users ORDER BY id")))
+    for old_id, keep_id in merges.items():
+        params = {"old_id": old_id, "keep_id": keep_id}
+        bind.execute(sa.text("UPDATE datasets SET owner_id = :keep_id WHERE owner_id = :old_id"), params)
+        bind.execute(sa.text("UPDATE licenses SET user_id = :keep_id WHERE user_id = :old_id"), params)
+        bind.execute(sa.text("DELETE FROM users WHERE id = :old_id"), params)
+
+    seen_hashes = set()
+
+    def first_hash(value):
+        canonical = _canonical("hash", value)
+        if canonical in seen_hashes:
+            return None
+        seen_hashes.add(canonical)
+        return canonical
+
+    for table, column, kind in COLUMNS:
+        if (table, column) == ("transactions", "blockchain_hash"):
+            _rewrite_sqlite(bind, table, column, first_hash)
+        else:
+            _rewrite_sqlite(bind, table, column, lambda value, kind=kind: _canonical(kind, value))
+    for table in ("users", "transactions", "licenses"):
+        with op.batch_alter_table(table) as batch_op:
+            for _, column, _ in (c for c in COLUMNS if c[0] == table):
+                batch_op.alter_column(column, type_=sa.LargeBinary(), existing_type=sa.String())
+
+
+def upgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        _upgrade_postgresql()
+    else:
+        _upgrade_sqlite()
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        for table, column, _ in COLUMNS:
+            op.alter_column(
+                table, column, type_=sa.String(),
+                postgresql_using=f"CASE WHEN {column} IS NOT NULL THEN '0x' || encode({column}, 'hex') END",
+            )
+        return
+    bind = op.get_bind()
+    for table, column, _ in COLUMNS:
+        _rewrite_sqlite(bind, table, column, lambda value: "0x" + bytes(value).hex())
+    for table in ("users", "transactions", "licenses"):
+        with op.batch_alter_table(table) as batch_op:
+            for _, column, _ in (c for c in COLUMNS if c[0] == table):
+                batch_op.alter_column(column, type_=sa.String(), existing_type=sa.LargeBinary())
@@ -0,0 +1,28 @@
+"""Precomputed similar-dataset lists
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2025-12-08 11:30:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "dataset_similarities",
+        sa.Column("dataset_id", sa.Integer(), sa.ForeignKey("datasets.id"), primary_key=True),
+        sa.Column("neighbors", sa.JSON(), nullable=False),
+        sa.Column("kth_score", sa.Float(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_table("dataset_similarities")
@@ -0,0 +1,25 @@
+"""Settlement run lease, so only one process settles a period at a time
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2025-12-10 09:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("royalty_settlement_runs", sa.Column("lease_owner", sa.String(), nullable=True))
+    op.add_column("royalty_settlement_runs", sa.Column("lease_expires_at", sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("royalty_settlement_runs") as batch_op:
+        batch_op.drop_column("lease_expires_at")
+        batch_op.drop_column("lease_owner")
@@ -0,0 +1,122 @@
+"""Store royalty addresses and hashes in canonical form
+
+royalty_configs.main_owner and royalty_payouts.transaction_hash become BYTEA/BLOB
+holding the canonical 32 bytes, like the columns converted in 0007, and the
+addresses in royalty_configs.contributors are rewritten in canonical string form
+(AIP-40, as db_types.normalize_address renders them).
+
+Payout hashes that don't parse become NULL. Invalid owner or contributor addresses
+abort the migration so they can be fixed by hand. The downgrade restores long-form
+hex strings but leaves the contributors canonical.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2025-12-11 09:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+# (table, key column, column, kind)
+COLUMNS = [
+    ("royalty_configs", "dataset_id", "main_owner", "address"),
+    ("royalty_payouts", "id", "transaction_hash", "hash"),
+]
+
+# Postgres: canonical bytes of a hex column, NULL when it doesn't parse (same as 0007)
+_PG_CANONICAL = {
+    "address": (
+        "CASE WHEN {col} ~* '^(0x)?[0-9a-f]{{1,64}}$' "
+        "THEN decode(lpad(regexp_replace(lower({col}), '^0x', ''), 64, '0'), 'hex') END"
+    ),
+    "hash": (
+        "CASE WHEN {col} ~* '^(0x)?[0-9a-f]{{64}}$' "
+        "THEN decode(regexp_replace(lower({col}), '^0x', ''), 'hex') END"
+    ),
+}
+
+
+def _canonical(kind, value):
+    """Python twin of _PG_CANONICAL (kept here so the migration doesn't depend on app code)"""
+    if value is None:
+        return None
+    digits = value.strip().lower()
+    if digits.startswith("0x"):
+        digits = digits[2:]
+    if not 0 < len(digits) <= 64 or (kind == "hash" and len(digits) != 64):
+        return None
+    try:
+        return bytes.fromhex(digits.rjust(64, "0"))
+    except ValueError:
+        return None
+
+
+def _address_string(raw):
+    """AIP-40 string form: 0x0-0xf short, everything else 64 hex digits"""
+    if not any(raw[:-1]) and raw[-1] < 16:
+        return f"0x{raw[-1]:x}"
+    return "0x" + raw.hex()
+
+
+def _canonical_contributors(bind):
+    configs = sa.table("royalty_configs", sa.column("dataset_id", sa.Integer), sa.column("contributors", sa.JSON))
+    for dataset_id, contributors in bind.execute(sa.select(configs.c.dataset_id, configs.c.contributors)).all():
+        canonical = [_canonical("address", str(address)) for address in contributors]
+        if None in canonical:
+            raise RuntimeError(f"royalty_configs.contributors has an invalid address for dataset {dataset_id}; fix it first")
+        bind.execute(
+            configs.update()
+            .where(configs.c.dataset_id == dataset_id)
+            .values(contributors=[_address_string(raw) for raw in canonical])
+        )
+
+
+def upgrade():
+    bind = op.get_bind()
+    owners = bind.execute(sa.text("SELECT dataset_id, main_owner FROM royalty_configs")).all()
+    invalid = [dataset_id for dataset_id, owner in owners if _canonical("address", owner) is None]
+    if invalid:
+        raise RuntimeError(f"royalty_configs.main_owner is not an account address for datasets {invalid[:20]}; fix them first")
+    _canonical_contributors(bind)
+
+    if bind.dialect.name == "postgresql":
+        for table, _, column, kind in COLUMNS:
+            op.alter_column(
+                table, column, type_=sa.LargeBinary(),
+                postgresql_using=_PG_CANONICAL[kind].format(col=column),
+            )
+        return
+    for table, key, column, kind in COLUMNS:
+        rows = bind.execute(sa.text(f"SELECT {key}, {column} FROM {table} WHERE {column} IS NOT NULL")).all()
+        if rows:
+            bind.execute(
+                sa.text(f"UPDATE {table} SET {column} = :value WHERE {key} = :key"),
+                [{"key": row[0], "value": _canonical(kind, row[1])} for row in rows],
+            )
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column(column, type_=sa.LargeBinary(), existing_type=sa.String())
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        for table, _, column, _ in COLUMNS:
+            op.alter_column(
+                table, column, type_=sa.String(),
+                postgresql_using=f"CASE WHEN {column} IS NOT NULL THEN '0x' || encode({column}, 'hex') END",
+            )
+        return
+    for table, key, column, _ in COLUMNS:
+        rows = bind.execute(sa.text(f"SELECT {key}, {column} FROM {table} WHERE {column} IS NOT NULL")).all()
+        if rows:
+            bind.execute(
+                sa.text(f"UPDATE {table} SET {column} = :value WHERE {key} = :key"),
+                [{"key": row[0], "value": "0x" + bytes(row[1]).hex()} for row in rows],
+            )
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column(column, type_=sa.String(), existing_type=sa.LargeBinary())
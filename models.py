@@ -1,16 +1,17 @@
 """
 SQLAlchemy Database Models
 """
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, Float, DateTime, Boolean, Text, ForeignKey, Index, JSON, UniqueConstraint, text, true
 from sqlalchemy.orm import relationship
 from database import Base
+from db_types import Address32, Hash32
 from datetime import datetime
 
 class User(Base):
     __tablename__ = "users"
     
     id = Column(Integer, primary_key=True, index=True)
-    wallet_address = Column(String, unique=True, index=True)
+    wallet_address = Column(Address32, unique=True, index=True)
     username = Column(String, unique=True)
     email = Column(String, unique=True, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -42,6 +43,12 @@ class Dataset(Base):
     # Relationships
     owner = relationship("User", back_populates="datasets")
     licenses = relationship("License", back_populates="dataset")
+    
+    __table_args__ = (
+        Index("ix_datasets_created_at", "created_at"),
+        Index("ix_datasets_category_created_at", "category", "created_at"),
+        Index("ix_datasets_owner_id_created_at", "owner_id", "created_at"),
+    )
 
 class License(Base):
     __tablename__ = "licenses"
@@ -51,22 +58,139 @@ class License(Base):
     dataset_id = Column(Integer, ForeignKey("datasets.id"))
     license_type = Column(Integer)  # 0=unlimited, 1=time-based, 2=per-query
     expires_at = Column(DateTime, nullable=True)
-    transaction_hash = Column(String)
+    transaction_hash = Column(Hash32, nullable=True)  # NULL until the purchase is on chain
     price_paid = Column(Float)
     purchased_at = Column(DateTime, default=datetime.utcnow)
+    is_active = Column(Boolean, nullable=False, default=True, server_default=true())  # cleared by the expiry sweeper
     
     # Relationships
     user = relationship("User", back_populates="licenses")
     dataset = relationship("Dataset", back_populates="licenses")
+    
+    __table_args__ = (
+        Index("ix_licenses_user_id_dataset_id", "user_id", "dataset_id"),
+        Index("ix_licenses_dataset_id_purchased_at", "dataset_id", "purchased_at"),
+        Index("ix_licenses_purchased_at", "purchased_at"),
+        # Partial indexes over active licenses only: the sweeper's expiry scan and active listings.
+        # Predicates match how each dialect renders a bare `License.is_active` filter.
+        Index(
+            "ix_licenses_active_expires_at", "expires_at",
+            postgresql_where=text("is_active AND expires_at IS NOT NULL"),
+            sqlite_where=text("is_active = 1 AND expires_at IS NOT NULL"),
+        ),
+        Index(
+            "ix_licenses_active_user_id", "user_id",
+            postgresql_where=text("is_active"),
+            sqlite_where=text("is_active = 1"),
+        ),
+    )
 
 class Transaction(Base):
     __tablename__ = "transactions"
     
     id = Column(Integer, primary_key=True, index=True)
-    from_address = Column(String)
-    to_address = Column(String)
+    from_address = Column(Address32)
+    to_address = Column(Address32)
     amount_apt = Column(Float)
     transaction_type = Column(String)  # mint, purchase, royalty
-    blockchain_hash = Column(String, unique=True)
+    blockchain_hash = Column(Hash32, unique=True)
     status = Column(String)  # pending, success, failed
     created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_transactions_from_address_created_at", "from_address", "created_at"),
+        Index("ix_transactions_to_address_created_at", "to_address", "created_at"),
+        Index("ix_transactions_created_at", "created_at"),
+    )
+
+class ItemRecord(Base):
+    __tablename__ = "items"
+    
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False, index=True)
+    description = Column(Text, nullable=True)
+    price = Column(Float, nullable=False)
+    created_at = Column(DateTime, default=datetime.now)
+
+class RoyaltyConfig(Base):
+    __tablename__ = "royalty_configs"
+    
+    dataset_id = Column(Integer, ForeignKey("datasets.id"), primary_key=True)
+    main_owner = Column(Address32, nullable=False)
+    contributors = Column(JSON, nullable=False)  # canonical addresses, in on-chain order
+    share_percentage = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class RoyaltySettlementRun(Base):
+    __tablename__ = "royalty_settlement_runs"
+    
+    id = Column(Integer, primary_key=True)
+    period_start = Column(DateTime, nullable=False)
+    period_end = Column(DateTime, nullable=False)
+    status = Column(String, nullable=False, default="pending")  # pending, computed, settled
+    dataset_count = Column(Integer, default=0)
+    total_octas = Column(BigInteger, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    completed_at = Column(DateTime, nullable=True)
+    # Held by the process settling the run; renewed every batch
+    lease_owner = Column(String, nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    
+    __table_args__ = (
+        UniqueConstraint("period_start", "period_end", name="uq_royalty_settlement_runs_period"),
+    )
+
+class RoyaltyPayout(Base):
+    __tablename__ = "royalty_payouts"
+    
+    id = Column(Integer, primary_key=True)
+    run_id = Column(Integer, ForeignKey("royalty_settlement_runs.id"), nullable=False)
+    dataset_id = Column(Integer, ForeignKey("datasets.id"), nullable=False)
+    license_count = Column(Integer, nullable=False)
+    gross_octas = Column(BigInteger, nullable=False)
+    owner_octas = Column(BigInteger, nullable=False)
+    contributor_octas = Column(BigInteger, nullable=False)  # paid to each contributor
+    contributor_count = Column(Integer, nullable=False)
+    dust_octas = Column(BigInteger, nullable=False)  # integer-division remainder left with the payer
+    status = Column(String, nullable=False, default="pending")  # pending, submitted, settled, failed
+    transaction_hash = Column(Hash32, nullable=True)
+    error = Column(Text, nullable=True)
+    settled_at = Column(DateTime, nullable=True)
+    
+    __table_args__ = (
+        UniqueConstraint("run_id", "dataset_id", name="uq_royalty_payouts_run_id_dataset_id"),
+        Index("ix_royalty_payouts_run_id_status_dataset_id", "run_id", "status", "dataset_id"),
+    )
+
+class AnalyticsRollup(Base):
+    __tablename__ = "analytics_rollups"
+    
+    id = Column(Integer, primary_key=True)
+    granularity = Column(String, nullable=False)  # hour, day
+    dimension = Column(String, nullable=False)  # dataset, owner, category (sales); ledger (transactions)
+    key = Column(String, nullable=False)  # dataset id, owner user id, category or transaction type
+    bucket = Column(DateTime, nullable=False)  # start of the hour/day (UTC)
+    count = Column(BigInteger, nullable=False, default=0)
+    amount_octas = Column(BigInteger, nullable=False, default=0)
+    
+    __table_args__ = (
+        # Upsert target and per-key time series (e.g. one owner's revenue)
+        UniqueConstraint("granularity", "dimension", "key", "bucket", name="uq_analytics_rollups_series"),
+        # Leaderboards and totals over a window
+        Index("ix_analytics_rollups_granularity_dimension_bucket", "granularity", "dimension", "bucket"),
+    )
+
+class AnalyticsWatermark(Base):
+    __tablename__ = "analytics_watermarks"
+    
+    source = Column(String, primary_key=True)  # licenses, transactions; similar:* (recommendations.py)
+    last_id = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class DatasetSimilarity(Base):
+    __tablename__ = "dataset_similarities"
+    
+    dataset_id = Column(Integer, ForeignKey("datasets.id"), primary_key=True)
+    neighbors = Column(JSON, nullable=False)  # [[dataset id, score], ...], most similar first
+    kth_score = Column(Float, nullable=False)  # lowest kept score (0 while the list isn't full)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
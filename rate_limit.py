@@ -0,0 +1,242 @@
+"""
+Rate Limiting and Admission Control
+Token buckets per wallet and per client IP, and a concurrency cap for outbound calls
+"""
+import asyncio
+import hashlib
+import ipaddress
+import math
+import os
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Optional, Sequence
+
+from dotenv import load_dotenv
+from fastapi import HTTPException, Request
+from fastapi.requests import HTTPConnection
+
+from cache import cache
+from db_types import normalize_address
+from metrics import ADMISSION_REJECTED, RATE_LIMITED
+
+load_dotenv()
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+# local: exact per-worker token buckets; shared: fixed windows on CACHE_URL, enforced across workers
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "local")
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600}
+
+# Proxies whose X-Forwarded-For is believed (same setting as server.py): "*", or
+# comma-separated IPs/CIDRs. Behind a load balancer or Azure front end this must cover
+# it, or every client shares the proxy's per-IP bucket.
+FORWARDED_ALLOW_IPS = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+
+# Request fields that identify the calling wallet, in lookup order
+_WALLET_FIELDS = ("address", "wallet_address", "user_wallet", "owner_wallet", "user_address")
+_KEY_FIELDS = ("private_key", "buyer_private_key")
+
+
+class UpstreamSaturated(Exception):
+    """Raised when no outbound slot frees up in time; served as 503 with Retry-After"""
+
+    def __init__(self, upstream: str, retry_after: int):
+        super().__init__(f"{upstream} is saturated, retry in {retry_after}s")
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+
+def parse_limit(spec: str):
+    """Parse "N/period" (period: second, minute or hour) into (capacity, tokens per second)"""
+    if spec.lower() in ("", "off", "none"):
+        return None
+    count, _, period = spec.partition("/")
+    seconds = _PERIODS.get(period.strip().lower().rstrip("s") or "second")
+    if seconds is None or int(count) <= 0:
+        raise ValueError(f"Invalid rate limit: {spec!r} (expected e.g. '10/minute' or 'off')")
+    return int(count), int(count) / seconds
+
+
+class LocalBuckets:
+    """Token buckets in this worker's memory, least recently used evicted first"""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, tuple]" = OrderedDict()
+
+    async def take_all(self, keys: Sequence[str], capacity: int, rate: float):
+        """Take one token from every bucket, or from none if any is empty
+
+        Returns (None, 0) if allowed, else (index of the empty bucket, seconds until it refills).
+        """
+        now = time.monotonic()
+        levels = []
+        for key in keys:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            levels.append(min(capacity, tokens + (now - updated) * rate))
+        for index, tokens in enumerate(levels):
+            if tokens < 1:
+                return index, (1 - tokens) / rate
+        for key, tokens in zip(keys, levels):
+            self._buckets[key] = (tokens - 1, now)
+            self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return None, 0.0
+
+
+class SharedBuckets:
+    """Fixed-window approximation of a token bucket on the shared cache (one INCR per check)"""
+
+    async def take_all(self, keys: Sequence[str], capacity: int, rate: float):
+        window = capacity / rate
+        now = time.time()
+        slot = int(now // window)
+        counters = [f"ratelimit:{key}:{slot}" for key in keys]
+        counts = [await cache.incr(counter, ttl=window) for counter in counters]
+        blocked = next((index for index, count in enumerate(counts) if count > capacity), None)
+        if blocked is None:
+            return None, 0.0
+        # Rejected requests don't count against the other buckets
+        for counter in counters:
+            await cache.incr(counter, -1, ttl=window)
+        return blocked, (slot + 1) * window - now
+
+
+buckets = SharedBuckets() if RATE_LIMIT_BACKEND == "shared" else LocalBuckets()
+
+
+async def _request_json(request: Request) -> dict:
+    if request.method not in ("POST", "PUT", "PATCH"):
+        return {}
+    try:
+        # Starlette caches the body, so the endpoint can still read it
+        body = await request.json()
+    except ValueError:
+        return {}
+    return body if isinstance(body, dict) else {}
+
+
+def _wallet_key(value) -> str:
+    # Every spelling of an address shares one bucket
+    try:
+        return normalize_address(str(value))
+    except ValueError:
+        return str(value).lower()
+
+
+async def _wallet_identity(request: Request) -> Optional[str]:
+    for field in _WALLET_FIELDS:
+        if field in request.path_params:
+            return _wallet_key(request.path_params[field])
+    body = await _request_json(request)
+    for field in _WALLET_FIELDS:
+        if body.get(field):
+            return _wallet_key(body[field])
+    for field in _KEY_FIELDS:
+        if body.get(field):
+            # Same key, same wallet; never keep the key itself around
+            return "key:" + hashlib.sha256(str(body[field]).encode()).hexdigest()[:32]
+    return None
+
+
+def _parse_networks(spec: str):
+    if spec.strip() == "*":
+        return None
+    return [ipaddress.ip_network(part.strip(), strict=False) for part in spec.split(",") if part.strip()]
+
+
+_TRUSTED_PROXIES = _parse_networks(FORWARDED_ALLOW_IPS)
+
+
+def _trusted_proxy(host: str) -> bool:
+    if _TRUSTED_PROXIES is None:
+        return True
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in _TRUSTED_PROXIES)
+
+
+def _ip_identity(request: HTTPConnection) -> Optional[str]:
+    """Client IP: the nearest X-Forwarded-For hop not added by a trusted proxy"""
+    if not request.client:
+        return None
+    host = request.client.host
+    # uvicorn's proxy_headers has usually resolved this already; other servers haven't
+    hops = [hop.strip() for hop in request.headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+    while hops and _trusted_proxy(host):
+        host = hops.pop()
+    return host
+
+
+class RateLimit:
+    """FastAPI dependency limiting a route per wallet and/or per client IP
+
+    The limit is `default` unless overridden with RATE_LIMIT_<NAME> (e.g. "5/minute" or "off").
+    """
+
+    def __init__(self, name: str, default: str, keys: Sequence[str] = ("wallet", "ip")):
+        self.name = name
+        self.keys = tuple(keys)
+        self.limit = parse_limit(os.getenv(f"RATE_LIMIT_{name.upper()}", default))
+
+    async def __call__(self, request: HTTPConnection):
+        # HTTPConnection so IP-keyed limits also apply to WebSockets (wallet keys read the body)
+        if not RATE_LIMIT_ENABLED or self.limit is None:
+            return
+        capacity, rate = self.limit
+        kinds, keys = [], []
+        for kind in self.keys:
+            identity = await _wallet_identity(request) if kind == "wallet" else _ip_identity(request)
+            if identity is not None:
+                kinds.append(kind)
+                keys.append(f"{self.name}:{kind}:{identity}")
+        if not keys:
+            return
+        # All or nothing: a request refused by its IP bucket doesn't spend its wallet's token
+        blocked, wait = await buckets.take_all(keys, capacity, rate)
+        if blocked is not None:
+            RATE_LIMITED.labels(self.name, kinds[blocked]).inc()
+            raise HTTPException(
+                status_code=429,
+                detail=f"Rate limit exceeded for {self.name}",
+                headers={"Retry-After": str(max(1, math.ceil(wait)))},
+            )
+
+
+class ConcurrencyLimiter:
+    """Caps concurrent outbound calls; waiters beyond the queue limit or timeout are rejected"""
+
+    def __init__(self, name: str, limit: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(limit)
+        self._waiting = 0
+
+    def _reject(self):
+        ADMISSION_REJECTED.labels(self.name).inc()
+        return UpstreamSaturated(self.name, max(1, math.ceil(self.queue_timeout)))
+
+    @asynccontextmanager
+    async def slot(self):
+        if self._semaphore.locked():
+            if self._waiting >= self.max_queue:
+                raise self._reject()
+            self._waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                raise self._reject() from None
+            finally:
+                self._waiting -= 1
+        else:
+            await self._semaphore.acquire()
+        try:
+            yield
+        finally:
+            self._semaphore.release()
@@ -0,0 +1,225 @@
+"""
+Realtime Subscription Hub
+Fans out transaction confirmations, wallet balance changes and dataset updates to
+WebSocket/SSE subscribers. Each subject is watched by one task per worker however many
+clients subscribe to it, and every subscriber has a bounded queue.
+
+Subjects: "tx:<hash>", "wallet:<address>", "dataset:<id>"
+"""
+import asyncio
+import os
+import re
+import time
+from datetime import datetime
+from typing import Dict, Optional, Set
+
+from dotenv import load_dotenv
+from starlette.concurrency import run_in_threadpool
+
+from aptos_service import aptos_service
+from database import ReadSessionLocal
+from db_types import normalize_address, normalize_hash
+from metrics import REALTIME_EVENTS_DROPPED, REALTIME_WATCHERS
+from models import Dataset
+from rate_limit import UpstreamSaturated
+
+load_dotenv()
+
+REALTIME_QUEUE_SIZE = int(os.getenv("REALTIME_QUEUE_SIZE", "100"))
+REALTIME_MAX_SUBJECTS = int(os.getenv("REALTIME_MAX_SUBJECTS", "20"))
+TX_POLL_INTERVAL = float(os.getenv("REALTIME_TX_POLL_INTERVAL", "1"))
+TX_WATCH_TIMEOUT = float(os.getenv("REALTIME_TX_TIMEOUT", "120"))
+WALLET_POLL_INTERVAL = float(os.getenv("REALTIME_WALLET_POLL_INTERVAL", "5"))
+DATASET_POLL_INTERVAL = float(os.getenv("REALTIME_DATASET_POLL_INTERVAL", "5"))
+
+
+def _dataset_id(value: str) -> str:
+    if not re.fullmatch(r"[0-9]{1,18}", value):
+        raise ValueError(f"Invalid dataset id: {value!r}")
+    return str(int(value))
+
+
+_SUBJECT_PARSERS = {"tx": normalize_hash, "wallet": normalize_address, "dataset": _dataset_id}
+
+
+def parse_subject(subject: str) -> tuple:
+    """Split, validate and canonicalize a subject into (kind, value); raises ValueError"""
+    kind, _, value = subject.partition(":")
+    try:
+        return kind, _SUBJECT_PARSERS[kind](value)
+    except (KeyError, ValueError):
+        raise ValueError(f"Invalid subject: {subject!r} (expected tx:<hash>, wallet:<address> or dataset:<id>)")
+
+
+def canonical_subject(subject: str) -> str:
+    """The subject as the hub keys it (e.g. wallet:0xABC -> wallet:0x000...abc); raises ValueError"""
+    kind, value = parse_subject(subject)
+    return f"{kind}:{value}"
+
+
+class Subscriber:
+    """One client connection: its subjects and a bounded event queue"""
+
+    def __init__(self, max_queue: int = REALTIME_QUEUE_SIZE):
+        self.queue: asyncio.Queue = asyncio.Queue(max_queue)
+        self.subjects: Set[str] = set()
+        self.dropped = 0
+
+    def offer(self, event: dict) -> None:
+        # A slow consumer loses its oldest events rather than growing the queue
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+            REALTIME_EVENTS_DROPPED.inc()
+        self.queue.put_nowait(event)
+
+    async def next_event(self, timeout: Optional[float] = None) -> Optional[dict]:
+        """The next event, or None if none arrived within `timeout` seconds"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class RealtimeHub:
+    def __init__(self):
+        self._subscribers: Dict[str, Set[Subscriber]] = {}
+        self._watchers: Dict[str, asyncio.Task] = {}
+        self._wakeups: Dict[str, asyncio.Event] = {}
+        # Latest state per subject, replayed to clients that join a running watcher
+        self._last: Dict[str, dict] = {}
+
+    def subscribe(self, subscriber: Subscriber, subject: str) -> str:
+        """Add a subject to a subscriber (normalized); raises ValueError"""
+        kind, value = parse_subject(subject)
+        subject = f"{kind}:{value}"
+        if subject in subscriber.subjects:
+            return subject
+        if len(subscriber.subjects) >= REALTIME_MAX_SUBJECTS:
+            raise ValueError(f"At most {REALTIME_MAX_SUBJECTS} subjects per connection")
+        subscriber.subjects.add(subject)
+        self._subscribers.setdefault(subject, set()).add(subscriber)
+        if subject in self._last:
+            subscriber.offer(self._last[subject])
+        if subject not in self._watchers:
+            wakeup = self._wakeups[subject] = asyncio.Event()
+            self._watchers[subject] = asyncio.create_task(self._watch(subject, kind, value, wakeup))
+        return subject
+
+    def unsubscribe(self, subscriber: Subscriber, subject: str) -> str:
+        """Remove a subject from a subscriber (normalized like subscribe); raises ValueError"""
+        subject = canonical_subject(subject)
+        subscriber.subjects.discard(subject)
+        subscribers = self._subscribers.get(subject)
+        if subscribers is None:
+            return subject
+        subscribers.discard(subscriber)
+        if not subscribers:
+            # Last subscriber gone: stop watching the subject
+            del self._subscribers[subject]
+            watcher = self._forget(subject)
+            if watcher is not None:
+                watcher.cancel()
+        return subject
+
+    def _forget(self, subject: str) -> Optional[asyncio.Task]:
+        self._wakeups.pop(subject, None)
+        self._last.pop(subject, None)
+        return self._watchers.pop(subject, None)
+
+    def close(self, subscriber: Subscriber) -> None:
+        for subject in list(subscriber.subjects):
+            self.unsubscribe(subscriber, subject)
+
+    def publish(self, subject: str, event: str, data: dict) -> None:
+        message = {"subject": subject, "event": event, "data": data, "at": datetime.utcnow().isoformat()}
+        self._last[subject] = message
+        for subscriber in self._subscribers.get(subject, ()):
+            subscriber.offer(message)
+
+    def poke(self, subject: str) -> None:
+        """Make a subject's watcher check now (e.g. after a local write) instead of at its next poll"""
+        wakeup = self._wakeups.get(subject)
+        if wakeup is not None:
+            wakeup.set()
+
+    async def _sleep(self, wakeup: asyncio.Event, interval: float) -> None:
+        try:
+            await asyncio.wait_for(wakeup.wait(), interval)
+        except asyncio.TimeoutError:
+            pass
+        wakeup.clear()
+
+    async def _watch(self, subject: str, kind: str, value: str, wakeup: asyncio.Event) -> None:
+        watch = {"tx": self._watch_tx, "wallet": self._watch_wallet, "dataset": self._watch_dataset}[kind]
+        REALTIME_WATCHERS.labels(kind).inc()
+        try:
+            await watch(subject, value, wakeup)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            print(f"❌ Realtime watcher for {subject} failed: {e}")
+            self.publish(subject, "error", {"error": str(e)})
+        finally:
+            REALTIME_WATCHERS.labels(kind).dec()
+            # A cancelled watcher may already have been replaced by a new subscription
+            if self._watchers.get(subject) is asyncio.current_task():
+                self._forget(subject)
+
+    async def _watch_tx(self, subject: str, tx_hash: str, wakeup: asyncio.Event) -> None:
+        """Poll until the transaction is committed (or the watch times out), then stop"""
+        self.publish(subject, "pending", {"hash": tx_hash})
+        deadline = time.monotonic() + TX_WATCH_TIMEOUT
+        while time.monotonic() < deadline:
+            try:
+                status = await aptos_service.get_transaction_status(tx_hash)
+            except UpstreamSaturated:
+                status = {}
+            # Only committed transactions carry a ledger version
+            if status.get("version") is not None:
+                self.publish(subject, "confirmed" if status["success"] else "failed", status)
+                return
+            await self._sleep(wakeup, TX_POLL_INTERVAL)
+        self.publish(subject, "timeout", {"hash": tx_hash})
+
+    async def _watch_wallet(self, subject: str, address: str, wakeup: asyncio.Event) -> None:
+        """Publish the balance whenever it changes (balances are shared-cached for BALANCE_CACHE_TTL)"""
+        balance = None
+        while True:
+            try:
+                current = await aptos_service.fetch_account_balance(address)
+            except Exception:
+                # No reading this round (saturated or the fullnodes failed): nothing changed
+                current = balance
+            if current is not None and current != balance:
+                balance = current
+                self.publish(subject, "balance", {"address": address, "balance": balance, "balance_apt": balance / 100000000})
+            await self._sleep(wakeup, WALLET_POLL_INTERVAL)
+
+    async def _watch_dataset(self, subject: str, dataset_id: str, wakeup: asyncio.Event) -> None:
+        """Publish a dataset's sales/mint/price state whenever it changes"""
+        state = None
+        while True:
+            current = await run_in_threadpool(_dataset_state, int(dataset_id))
+            if current != state:
+                state = current
+                self.publish(subject, "dataset" if state is not None else "not_found", state or {"id": int(dataset_id)})
+            await self._sleep(wakeup, DATASET_POLL_INTERVAL)
+
+    async def stop(self) -> None:
+        watchers = list(self._watchers.values())
+        for watcher in watchers:
+            watcher.cancel()
+        await asyncio.gather(*watchers, return_exceptions=True)
+
+
+def _dataset_state(dataset_id: int) -> Optional[dict]:
+    with ReadSessionLocal() as db:
+        row = db.query(
+            Dataset.id, Dataset.downloads, Dataset.nft_minted, Dataset.blockchain_tx, Dataset.price_apt
+        ).filter(Dataset.id == dataset_id).first()
+    return dict(row._mapping) if row else None
+
+
+# Singleton instance
+realtime_hub = RealtimeHub()
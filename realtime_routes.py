@@ -0,0 +1,151 @@
+"""
+Realtime API Routes
+Push transaction confirmations, balance changes and dataset updates over WebSocket or
+Server-Sent Events instead of clients polling /aptos/transaction and /aptos/account/balance
+"""
+import asyncio
+import json
+import os
+from typing import List
+
+from fastapi import APIRouter, HTTPException, Depends, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+
+from metrics import REALTIME_CONNECTIONS
+from rate_limit import RateLimit
+from realtime import REALTIME_MAX_SUBJECTS, Subscriber, canonical_subject, parse_subject, realtime_hub
+
+router = APIRouter(prefix="/api/realtime", tags=["Realtime"])
+
+# Per-worker cap on open streams; each holds a queue of at most REALTIME_QUEUE_SIZE events
+REALTIME_MAX_CONNECTIONS = int(os.getenv("REALTIME_MAX_CONNECTIONS", "1000"))
+HEARTBEAT_SECONDS = float(os.getenv("REALTIME_HEARTBEAT_SECONDS", "15"))
+
+connect_limit = RateLimit("realtime_connect", "30/minute", keys=("ip",))
+_open_connections = 0
+
+def _subscribe_all(subscriber: Subscriber, subjects: List[str]) -> List[str]:
+    # Validate the whole request (syntax and the subject cap) first so it is never half applied
+    if len(subscriber.subjects | {canonical_subject(subject) for subject in subjects}) > REALTIME_MAX_SUBJECTS:
+        raise ValueError(f"At most {REALTIME_MAX_SUBJECTS} subjects per connection")
+    return [realtime_hub.subscribe(subscriber, subject) for subject in subjects]
+
+def _unsubscribe_all(subscriber: Subscriber, subjects: List[str]) -> List[str]:
+    for subject in subjects:
+        parse_subject(subject)
+    return [realtime_hub.unsubscribe(subscriber, subject) for subject in subjects]
+
+def _lagged(subscriber: Subscriber, reported: int):
+    """A notice for events dropped since the last one reported, if any"""
+    if subscriber.dropped > reported:
+        return {"event": "lagged", "dropped": subscriber.dropped - reported}
+    return None
+
+@router.websocket("/ws")
+async def realtime_websocket(websocket: WebSocket):
+    """Subscribe with ?subject=... and/or {"action": "subscribe"|"unsubscribe", "subjects": [...]}"""
+    global _open_connections
+    if _open_connections >= REALTIME_MAX_CONNECTIONS:
+        await websocket.close(code=1013)  # Try again later
+        return
+    try:
+        await connect_limit(websocket)
+    except HTTPException:
+        await websocket.close(code=1008)  # Policy violation: same per-IP limit as /events
+        return
+    await websocket.accept()
+    _open_connections += 1
+    REALTIME_CONNECTIONS.labels("websocket").inc()
+    subscriber = Subscriber()
+
+    def handle(action, subjects):
+        # Acks and errors go through the queue so only the writer sends on the socket
+        try:
+            if action == "subscribe":
+                subscriber.offer({"event": "subscribed", "subjects": _subscribe_all(subscriber, subjects)})
+            elif action == "unsubscribe":
+                subscriber.offer({"event": "unsubscribed", "subjects": _unsubscribe_all(subscriber, subjects)})
+            else:
+                raise ValueError(f"Unknown action: {action!r}")
+        except ValueError as e:
+            subscriber.offer({"event": "error", "error": str(e)})
+
+    async def reader():
+        while True:
+            try:
+                message = json.loads(await websocket.receive_text())
+                action, subjects = message["action"], list(message.get("subjects", []))
+            except (ValueError, KeyError, TypeError, AttributeError):
+                subscriber.offer({"event": "error", "error": "Expected {\"action\": ..., \"subjects\": [...]}"})
+                continue
+            handle(action, subjects)
+
+    async def writer():
+        reported = 0
+        while True:
+            event = await subscriber.next_event()
+            lagged = _lagged(subscriber, reported)
+            if lagged:
+                reported = subscriber.dropped
+                await websocket.send_json(lagged)
+            await websocket.send_json(event)
+
+    try:
+        subjects = websocket.query_params.getlist("subject")
+        if subjects:
+            handle("subscribe", subjects)
+        tasks = [asyncio.create_task(reader()), asyncio.create_task(writer())]
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        for task in done:
+            if not isinstance(task.exception(), WebSocketDisconnect):
+                task.result()
+    finally:
+        realtime_hub.close(subscriber)
+        _open_connections -= 1
+        REALTIME_CONNECTIONS.labels("websocket").dec()
+
+@router.get("/events", dependencies=[Depends(connect_limit)])
+async def realtime_events(subject: List[str] = Query(..., description="tx:<hash>, wallet:<address> or dataset:<id>")):
+    """Server-Sent Events stream for the given subjects"""
+    global _open_connections
+    if _open_connections >= REALTIME_MAX_CONNECTIONS:
+        raise HTTPException(status_code=503, detail="Too many realtime connections", headers={"Retry-After": "5"})
+    try:
+        if len({canonical_subject(name) for name in subject}) > REALTIME_MAX_SUBJECTS:
+            raise ValueError(f"At most {REALTIME_MAX_SUBJECTS} subjects per connection")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def stream():
+        global _open_connections
+        _open_connections += 1
+        REALTIME_CONNECTIONS.labels("sse").inc()
+        # Subscribed only once streaming starts, so nothing leaks if the client is already gone
+        subscriber = Subscriber()
+        reported = 0
+        try:
+            _subscribe_all(subscriber, subject)
+            while True:
+                event = await subscriber.next_event(HEARTBEAT_SECONDS)
+                if event is None:
+                    # Comment line: keeps proxies from timing out an idle stream
+                    yield ": keep-alive\n\n"
+                    continue
+                lagged = _lagged(subscriber, reported)
+                if lagged:
+                    reported = subscriber.dropped
+                    yield f"event: lagged\ndata: {json.dumps(lagged)}\n\n"
+                yield f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            # Starlette cancels the stream when the client disconnects
+            realtime_hub.close(subscriber)
+            _open_connections -= 1
+            REALTIME_CONNECTIONS.labels("sse").dec()
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
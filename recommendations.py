@@ -0,0 +1,359 @@
+"""
+Similar Dataset Recommendations
+Precomputes every dataset's top-k most similar datasets, so /api/datasets/{id}/similar is
+a single primary-key read instead of a scan of the catalog
+
+Each dataset becomes one float32 vector of L2-normalised blocks, each scaled by
+sqrt(weight), so a dot product is the weighted sum of the per-block cosines:
+    text      TF-IDF of title + description (feature-hashed terms)
+    tags      comma-separated tags (feature-hashed)
+    category  one-hot
+    format    one-hot
+    buyers    users holding a license for it (feature-hashed): the co-purchase signal
+
+Neighbours come from blocked matrix products against the whole catalog. Incremental runs
+only recompute datasets that are new or have new licenses and merge their fresh scores into
+the other lists; the periodic full rebuild picks up IDF drift and pairs whose similarity
+dropped without either side changing.
+
+Rebuilds are CPU- and memory-heavy, so they run in their own process, never in the API
+workers: `python manage.py build-recommendations` once, or with --watch every
+RECOMMENDATIONS_INTERVAL seconds.
+"""
+import asyncio
+import math
+import os
+import re
+import zlib
+from itertools import chain
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+
+from cache import cache
+from database import SessionLocal, dialect_insert
+from metrics import RECOMMENDATION_ROWS_UPDATED
+from models import AnalyticsWatermark, Dataset, DatasetSimilarity, License
+
+RECOMMENDATIONS_TOP_K = int(os.getenv("RECOMMENDATIONS_TOP_K", "20"))
+TEXT_DIMENSIONS = int(os.getenv("RECOMMENDATIONS_TEXT_DIMENSIONS", "1024"))
+BUYER_DIMENSIONS = int(os.getenv("RECOMMENDATIONS_BUYER_DIMENSIONS", "256"))
+TAG_DIMENSIONS = 128
+# Block weights; they sum to 1 so scores stay within [0, 1]
+WEIGHTS = {"text": 0.35, "tags": 0.25, "category": 0.15, "format": 0.05, "buyers": 0.20}
+
+# Similarity cells computed per block (rows x catalog size): bounds peak memory at ~64 MB
+_BLOCK_CELLS = 16 * 1024 * 1024
+# Past this share of changed datasets an incremental run costs about as much as a full one
+_INCREMENTAL_MAX_FRACTION = 0.1
+_WRITE_CHUNK = 1000
+_LICENSE_FETCH = 50000
+
+# Watermarks (analytics_watermarks rows): highest dataset/license id reflected in the lists,
+# the highest dataset id covered by the last full rebuild (updated_at = when it ran), and a
+# counter bumped by every run that changed a list
+DATASETS_MARK = "similar:datasets"
+LICENSES_MARK = "similar:licenses"
+FULL_MARK = "similar:full"
+VERSION_MARK = "similar:version"
+MARKS = (DATASETS_MARK, LICENSES_MARK, FULL_MARK, VERSION_MARK)
+
+# Response cache keys embed the stored version (VERSION_MARK). Workers re-read it at most
+# every SIMILAR_VERSION_TTL seconds; a rebuild drops it from the cache so that with a
+# shared CACHE_URL they pick up the new lists at once.
+SIMILAR_VERSION_KEY = "similar:version"
+SIMILAR_VERSION_TTL = 10
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOP_WORDS = frozenset(
+    "a an and are as at be by for from has in into is it its of on or that the this to with".split()
+)
+
+Neighbors = List[Tuple[int, float]]
+
+
+def _terms(text: Optional[str]) -> List[str]:
+    return [t for t in _TOKEN.findall((text or "").lower()) if len(t) > 1 and t not in _STOP_WORDS]
+
+
+def _hashed_counts(documents, dimensions: int) -> np.ndarray:
+    """Term counts per document, each term hashed to one of `dimensions` columns"""
+    # crc32 rather than hash(): stable across processes, so stored scores stay comparable
+    columns: Dict[str, int] = {}
+    rows, cols = [], []
+    for row, terms in enumerate(documents):
+        for term in terms:
+            column = columns.get(term)
+            if column is None:
+                column = columns[term] = zlib.crc32(term.encode()) % dimensions
+            rows.append(row)
+            cols.append(column)
+    counts = np.zeros((len(documents), dimensions), dtype=np.float32)
+    np.add.at(counts, (np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)), 1)
+    return counts
+
+
+def _tfidf(counts: np.ndarray) -> np.ndarray:
+    """Sublinear TF times smoothed IDF"""
+    document_frequency = np.count_nonzero(counts, axis=0)
+    idf = np.log((1 + len(counts)) / (1 + document_frequency)) + 1
+    return np.log1p(counts) * idf.astype(np.float32)
+
+
+def _one_hot(values) -> np.ndarray:
+    """One column per distinct value; blank values get an all-zero row"""
+    labels = np.asarray([(value or "").strip().lower() for value in values], dtype=object)
+    vocabulary, codes = np.unique(labels, return_inverse=True) if len(labels) else ([], labels)
+    block = np.zeros((len(labels), len(vocabulary)), dtype=np.float32)
+    present = labels != ""
+    block[np.flatnonzero(present), codes[present]] = 1
+    return block
+
+
+def _buyers(db, ids: np.ndarray) -> np.ndarray:
+    """Licensed users per dataset, hashed to BUYER_DIMENSIONS columns"""
+    block = np.zeros((len(ids), BUYER_DIMENSIONS), dtype=np.float32)
+    result = db.execute(
+        select(License.dataset_id, License.user_id).where(License.user_id.is_not(None))
+        .execution_options(yield_per=_LICENSE_FETCH)
+    )
+    for partition in result.partitions():
+        pairs = np.fromiter(chain.from_iterable(partition), dtype=np.int64, count=2 * len(partition)).reshape(-1, 2)
+        positions = np.searchsorted(ids, pairs[:, 0])
+        known = positions < len(ids)
+        known[known] = ids[positions[known]] == pairs[known, 0]
+        # Multiplicative hashing spreads consecutive user ids over the columns
+        columns = (pairs[known, 1] * 2654435761) % (1 << 32) % BUYER_DIMENSIONS
+        block[positions[known], columns] = 1
+    return block
+
+
+def _normalize(block: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(block, axis=1, keepdims=True)
+    np.divide(block, norms, out=block, where=norms > 0)
+    return block
+
+
+def build_features(db) -> Tuple[np.ndarray, np.ndarray]:
+    """(dataset ids, ascending; one feature row per dataset)"""
+    rows = db.execute(
+        select(Dataset.id, Dataset.title, Dataset.description, Dataset.tags, Dataset.category, Dataset.format)
+        .order_by(Dataset.id)
+    ).all()
+    ids = np.fromiter((row.id for row in rows), dtype=np.int64, count=len(rows))
+    blocks = {
+        "text": _tfidf(_hashed_counts([_terms(f"{row.title or ''} {row.description or ''}") for row in rows], TEXT_DIMENSIONS)),
+        "tags": _hashed_counts(
+            [{tag.strip().lower() for tag in (row.tags or "").split(",")} - {""} for row in rows], TAG_DIMENSIONS
+        ),
+        "category": _one_hot([row.category for row in rows]),
+        "format": _one_hot([row.format for row in rows]),
+        "buyers": _buyers(db, ids),
+    }
+    features = np.hstack([_normalize(block) * np.float32(math.sqrt(WEIGHTS[name])) for name, block in blocks.items()])
+    return ids, features
+
+
+def _score_blocks(features: np.ndarray, positions: np.ndarray):
+    """Yield (positions, their similarity to every dataset) a bounded block of rows at a time"""
+    step = max(1, _BLOCK_CELLS // max(1, len(features)))
+    for start in range(0, len(positions), step):
+        chunk = positions[start:start + step]
+        yield chunk, features[chunk] @ features.T
+
+
+def _top_k(scores: np.ndarray, chunk: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Best k (positions, scores) per row of a block, best first; excludes each row itself"""
+    scores[np.arange(len(chunk)), chunk] = -np.inf
+    k = min(k, scores.shape[1])
+    top = np.argpartition(scores, -k, axis=1)[:, -k:]
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1)
+    return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+
+def _neighbors(ids: np.ndarray, positions, scores) -> Neighbors:
+    return [(int(ids[p]), round(float(s), 4)) for p, s in zip(positions, scores) if s > 0]
+
+
+def _kth_score(neighbors: Neighbors, k: int) -> float:
+    """Score a candidate must beat to enter a list (anything positive while it isn't full)"""
+    return neighbors[-1][1] if len(neighbors) >= k else 0.0
+
+
+def _lock_marks(db) -> Optional[Dict[str, AnalyticsWatermark]]:
+    """The watermark rows, locked; None if another process is rebuilding"""
+    marks = {
+        mark.source: mark for mark in db.execute(
+            select(AnalyticsWatermark).where(AnalyticsWatermark.source.in_(MARKS)).with_for_update(skip_locked=True)
+        ).scalars()
+    }
+    if len(marks) < len(MARKS):
+        existing = db.scalar(select(func.count()).where(AnalyticsWatermark.source.in_(MARKS)))
+        if existing > len(marks):
+            return None
+        for source in set(MARKS) - set(marks):
+            marks[source] = AnalyticsWatermark(source=source, last_id=0)
+            db.add(marks[source])
+        try:
+            db.flush()
+        except IntegrityError:
+            return None  # created concurrently by another process
+    return marks
+
+
+def _changed_datasets(db, marks, max_dataset_id: int, max_license_id: int) -> set:
+    """Ids of datasets created, or licensed, since the last run"""
+    created = db.scalars(
+        select(Dataset.id).where(Dataset.id > marks[DATASETS_MARK].last_id, Dataset.id <= max_dataset_id)
+    )
+    licensed = db.scalars(
+        select(License.dataset_id).distinct()
+        .where(License.id > marks[LICENSES_MARK].last_id, License.id <= max_license_id)
+    )
+    return set(created) | set(licensed)
+
+
+def _fresh_candidates(best_positions, best_scores, chunk, scores, k):
+    """Keep, per dataset (column), the k best scores seen so far from changed datasets (rows)"""
+    merged_scores = np.vstack([best_scores, scores])
+    merged_positions = np.vstack([best_positions, np.broadcast_to(chunk[:, None], scores.shape)])
+    if len(merged_scores) <= k:
+        return merged_positions, merged_scores
+    keep = np.argpartition(merged_scores, -k, axis=0)[-k:]
+    return np.take_along_axis(merged_positions, keep, axis=0), np.take_along_axis(merged_scores, keep, axis=0)
+
+
+def _write(db, lists: Dict[int, Neighbors], k: int) -> None:
+    insert = dialect_insert(db)
+    now = datetime.utcnow()
+    rows = [
+        {"dataset_id": dataset_id, "neighbors": neighbors, "kth_score": _kth_score(neighbors, k), "updated_at": now}
+        for dataset_id, neighbors in sorted(lists.items())
+    ]
+    for start in range(0, len(rows), _WRITE_CHUNK):
+        stmt = insert(DatasetSimilarity).values(rows[start:start + _WRITE_CHUNK])
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=["dataset_id"],
+            set_={"neighbors": stmt.excluded.neighbors, "kth_score": stmt.excluded.kth_score, "updated_at": now},
+        ))
+
+
+def stored_version(db) -> int:
+    """Counter of rebuilds that changed the stored lists"""
+    return db.scalar(select(AnalyticsWatermark.last_id).where(AnalyticsWatermark.source == VERSION_MARK)) or 0
+
+
+def rebuild(full: bool = False, k: Optional[int] = None, full_rebuild_hours: float = 24.0) -> Dict[str, object]:
+    """Bring the stored neighbour lists up to date; returns what was recomputed"""
+    k = k or RECOMMENDATIONS_TOP_K
+    with SessionLocal() as db:
+        marks = _lock_marks(db)
+        if marks is None:
+            return {"mode": "skipped", "recomputed": 0, "merged": 0}
+        max_dataset_id = db.scalar(select(func.max(Dataset.id))) or 0
+        max_license_id = db.scalar(select(func.max(License.id))) or 0
+        full_mark = marks[FULL_MARK]
+        full = (
+            full
+            or full_mark.last_id == 0
+            or full_mark.updated_at is None
+            or datetime.utcnow() - full_mark.updated_at > timedelta(hours=full_rebuild_hours)
+        )
+        changed = set() if full else _changed_datasets(db, marks, max_dataset_id, max_license_id)
+        if not full and not changed:
+            return {"mode": "incremental", "recomputed": 0, "merged": 0}
+
+        ids, features = build_features(db)
+        if not full and len(changed) > _INCREMENTAL_MAX_FRACTION * len(ids):
+            full = True
+        dirty = np.arange(len(ids)) if full else np.flatnonzero(np.isin(ids, list(changed)))
+        is_dirty = np.zeros(len(ids), dtype=bool)
+        is_dirty[dirty] = True
+
+        lists: Dict[int, Neighbors] = {}
+        best_positions = np.zeros((0, len(ids)), dtype=np.int64)
+        best_scores = np.zeros((0, len(ids)), dtype=np.float32)
+        for chunk, scores in _score_blocks(features, dirty):
+            if not full:
+                best_positions, best_scores = _fresh_candidates(best_positions, best_scores, chunk, scores, k)
+            top, top_scores = _top_k(scores, chunk, k)
+            for position, neighbor_positions, neighbor_scores in zip(chunk, top, top_scores):
+                lists[int(ids[position])] = _neighbors(ids, neighbor_positions, neighbor_scores)
+
+        merged = 0
+        if not full and len(best_scores):
+            merged = _merge_into_others(db, ids, is_dirty, best_positions, best_scores, lists, k)
+
+        _write(db, lists, k)
+        marks[DATASETS_MARK].last_id = max_dataset_id
+        marks[LICENSES_MARK].last_id = max_license_id
+        if full:
+            full_mark.last_id = max_dataset_id
+            full_mark.updated_at = datetime.utcnow()
+        marks[VERSION_MARK].last_id += 1
+        mode = "full" if full else "incremental"
+        RECOMMENDATION_ROWS_UPDATED.labels(mode).inc(len(lists))
+        db.commit()
+        return {"mode": mode, "recomputed": len(dirty), "merged": merged}
+
+
+def _merge_into_others(db, ids, is_dirty, best_positions, best_scores, lists, k) -> int:
+    """Fold changed datasets' fresh scores into the lists of unchanged ones they now rank in"""
+    kth = np.zeros(len(ids), dtype=np.float32)
+    stored_kth = db.execute(select(DatasetSimilarity.dataset_id, DatasetSimilarity.kth_score)).all()
+    if stored_kth:
+        stored = np.asarray(stored_kth, dtype=np.float64)
+        positions = np.searchsorted(ids, stored[:, 0].astype(np.int64))
+        known = positions < len(ids)
+        kth[positions[known]] = stored[known, 1]
+    # Only lists a fresh score can enter; stale entries elsewhere wait for the full rebuild
+    columns = np.flatnonzero(~is_dirty & (best_scores.max(axis=0) > kth))
+    changed_ids = {int(i) for i in ids[is_dirty]}
+    for start in range(0, len(columns), _WRITE_CHUNK):
+        chunk = columns[start:start + _WRITE_CHUNK]
+        stored_lists = dict(db.execute(
+            select(DatasetSimilarity.dataset_id, DatasetSimilarity.neighbors)
+            .where(DatasetSimilarity.dataset_id.in_([int(ids[c]) for c in chunk]))
+        ).all())
+        for column in chunk:
+            dataset_id = int(ids[column])
+            kept = [(n, s) for n, s in stored_lists.get(dataset_id, []) if n not in changed_ids]
+            fresh = _neighbors(ids, best_positions[:, column], best_scores[:, column])
+            lists[dataset_id] = sorted(kept + fresh, key=lambda pair: -pair[1])[:k]
+    return len(columns)
+
+
+class RecommendationJob:
+    def __init__(self, interval: float = 300.0, k: int = RECOMMENDATIONS_TOP_K, full_rebuild_hours: float = 24.0):
+        self.interval = interval
+        self.k = k
+        self.full_rebuild_hours = full_rebuild_hours
+
+    async def run_once(self, full: bool = False) -> Dict[str, object]:
+        result = await run_in_threadpool(rebuild, full, self.k, self.full_rebuild_hours)
+        if result["recomputed"]:
+            await cache.delete(SIMILAR_VERSION_KEY)
+        return result
+
+    async def run_forever(self) -> None:
+        """Incremental rebuilds every `interval` seconds (a full one every full_rebuild_hours)"""
+        while True:
+            try:
+                result = await self.run_once()
+                if result["recomputed"]:
+                    print(f"🔁 Recommendations: {result}")
+            except Exception as e:
+                print(f"❌ Recommendation rebuild failed: {e}")
+            await asyncio.sleep(self.interval)
+
+
+# Singleton instance, run by `manage.py build-recommendations --watch`
+recommendation_job = RecommendationJob(
+    interval=float(os.getenv("RECOMMENDATIONS_INTERVAL", "300")),
+    full_rebuild_hours=float(os.getenv("RECOMMENDATIONS_FULL_REBUILD_HOURS", "24")),
+)
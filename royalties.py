@@ -0,0 +1,313 @@
+"""
+Royalty Settlement
+Aggregates license sales per dataset over a period and pays owners and contributors
+through batched Royalties::distribute calls
+
+A run is keyed by its period, so re-running the same period resumes it instead of
+paying twice: one process at a time holds the run's lease, payouts are computed once
+(unique per run and dataset) and each batch moves pending -> submitted -> settled.
+A batch's transaction hashes are stored with its "submitted" status before anything
+is sent; a resumed run looks those up on chain rather than sending them again.
+"""
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+
+import numpy as np
+from aptos_sdk.account import Account
+from sqlalchemy import BigInteger, cast, func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from aptos_service import aptos_service
+from database import SessionLocal
+from models import License, RoyaltyConfig, RoyaltyPayout, RoyaltySettlementRun
+
+OCTAS_PER_APT = 100_000_000
+ROYALTY_BATCH_SIZE = int(os.getenv("ROYALTY_BATCH_SIZE", "500"))
+# A run's lease lapses this long after its last batch, if its holder died
+ROYALTY_LEASE_SECONDS = float(os.getenv("ROYALTY_LEASE_SECONDS", "300"))
+_INSERT_CHUNK = 10000
+
+
+class SettlementInProgress(Exception):
+    """Another process holds the lease of this settlement run"""
+
+
+def compute_payouts(gross, share, contributor_count):
+    """Royalties::distribute's u64 integer math, vectorized over many datasets
+
+    Returns (owner, per_contributor, dust) arrays in octas; dust is the
+    remainder of share_amount / num that the contract leaves with the payer.
+    """
+    gross = np.asarray(gross, dtype=np.int64)
+    share = np.asarray(share, dtype=np.int64)
+    count = np.asarray(contributor_count, dtype=np.int64)
+    if (gross < 0).any() or (gross > np.iinfo(np.int64).max // 100).any():
+        raise ValueError("Gross amount out of range for u64 royalty math")
+    if (count <= 0).any():
+        raise ValueError("Royalties::distribute aborts for datasets without contributors")
+    share_amount = gross * share // 100
+    owner = gross - share_amount
+    per_contributor = share_amount // count
+    dust = share_amount - per_contributor * count
+    return owner, per_contributor, dust
+
+
+def aggregate_sales(db, period_start: datetime, period_end: datetime):
+    """Per-dataset license count and gross octas for datasets with a royalty config"""
+    octas = cast(func.round(License.price_paid * OCTAS_PER_APT), BigInteger)
+    sales = (
+        select(
+            License.dataset_id,
+            func.count(License.id).label("license_count"),
+            cast(func.sum(octas), BigInteger).label("gross_octas"),
+        )
+        .where(License.purchased_at >= period_start, License.purchased_at < period_end)
+        .group_by(License.dataset_id)
+        .subquery()
+    )
+    rows = db.execute(
+        select(
+            sales.c.dataset_id,
+            sales.c.license_count,
+            sales.c.gross_octas,
+            RoyaltyConfig.share_percentage,
+            RoyaltyConfig.contributors,
+        )
+        .join(RoyaltyConfig, RoyaltyConfig.dataset_id == sales.c.dataset_id)
+        .order_by(sales.c.dataset_id)
+    ).all()
+    rows = [row for row in rows if row.contributors and row.gross_octas]
+    return {
+        "dataset_id": np.fromiter((row.dataset_id for row in rows), dtype=np.int64, count=len(rows)),
+        "license_count": np.fromiter((row.license_count for row in rows), dtype=np.int64, count=len(rows)),
+        "gross": np.fromiter((row.gross_octas for row in rows), dtype=np.int64, count=len(rows)),
+        "share": np.fromiter((row.share_percentage for row in rows), dtype=np.int64, count=len(rows)),
+        "contributors": np.fromiter((len(row.contributors) for row in rows), dtype=np.int64, count=len(rows)),
+    }
+
+
+def _get_or_create_run(db, period_start: datetime, period_end: datetime) -> RoyaltySettlementRun:
+    query = select(RoyaltySettlementRun).where(
+        RoyaltySettlementRun.period_start == period_start,
+        RoyaltySettlementRun.period_end == period_end,
+    )
+    run = db.execute(query).scalar_one_or_none()
+    if run is not None:
+        return run
+    overlapping = db.execute(
+        select(RoyaltySettlementRun.id).where(
+            RoyaltySettlementRun.period_start < period_end,
+            RoyaltySettlementRun.period_end > period_start,
+        )
+    ).first()
+    if overlapping:
+        raise ValueError(f"Period overlaps settlement run {overlapping.id}; sales would be paid twice")
+    try:
+        run = RoyaltySettlementRun(period_start=period_start, period_end=period_end, status="pending")
+        db.add(run)
+        db.commit()
+    except IntegrityError:
+        # Another process created the run first
+        db.rollback()
+        run = db.execute(query).scalar_one()
+    return run
+
+
+def _compute_run(db, run: RoyaltySettlementRun):
+    """Aggregate and store every payout of the run in one transaction"""
+    sales = aggregate_sales(db, run.period_start, run.period_end)
+    owner, per_contributor, dust = compute_payouts(sales["gross"], sales["share"], sales["contributors"])
+    columns = {
+        "dataset_id": sales["dataset_id"].tolist(),
+        "license_count": sales["license_count"].tolist(),
+        "gross_octas": sales["gross"].tolist(),
+        "owner_octas": owner.tolist(),
+        "contributor_octas": per_contributor.tolist(),
+        "contributor_count": sales["contributors"].tolist(),
+        "dust_octas": dust.tolist(),
+    }
+    rows = [
+        {"run_id": run.id, "status": "pending", **dict(zip(columns, values))}
+        for values in zip(*columns.values())
+    ]
+    for start in range(0, len(rows), _INSERT_CHUNK):
+        db.execute(insert(RoyaltyPayout), rows[start:start + _INSERT_CHUNK])
+    run.status = "computed"
+    run.dataset_count = len(rows)
+    run.total_octas = int(sales["gross"].sum())
+    db.commit()
+
+
+def _take_lease(db, run: RoyaltySettlementRun, owner: str) -> None:
+    """Acquire or renew the run's lease (a conditional UPDATE, atomic on every dialect)"""
+    now = datetime.utcnow()
+    taken = db.execute(
+        update(RoyaltySettlementRun)
+        .where(
+            RoyaltySettlementRun.id == run.id,
+            or_(
+                RoyaltySettlementRun.lease_owner == owner,
+                RoyaltySettlementRun.lease_expires_at.is_(None),
+                RoyaltySettlementRun.lease_expires_at < now,
+            ),
+        )
+        .values(lease_owner=owner, lease_expires_at=now + timedelta(seconds=ROYALTY_LEASE_SECONDS))
+    ).rowcount
+    db.commit()
+    if not taken:
+        raise SettlementInProgress(f"Settlement run {run.id} is being settled by another process")
+
+
+def _release_lease(db, run: RoyaltySettlementRun, owner: str) -> None:
+    # Everything worth keeping is committed; this only clears a failed transaction
+    db.rollback()
+    db.execute(
+        update(RoyaltySettlementRun)
+        .where(RoyaltySettlementRun.id == run.id, RoyaltySettlementRun.lease_owner == owner)
+        .values(lease_owner=None, lease_expires_at=None)
+    )
+    db.commit()
+
+
+async def _reconcile(db, run: RoyaltySettlementRun, status: str) -> None:
+    """Settle or fail payouts in `status` by looking up their stored hashes on chain
+
+    Transactions that can't be found (still pending, expired, or the node is down)
+    are left as they are, so nothing that may already be on chain is sent twice.
+    """
+    rows = db.execute(
+        select(RoyaltyPayout.id, RoyaltyPayout.transaction_hash)
+        .where(
+            RoyaltyPayout.run_id == run.id,
+            RoyaltyPayout.status == status,
+            RoyaltyPayout.transaction_hash.is_not(None),
+        )
+    ).all()
+    for row in rows:
+        tx = await aptos_service.get_transaction_status(row.transaction_hash)
+        if tx.get("version") is None:
+            continue
+        if tx["success"]:
+            values = {"status": "settled", "error": None, "settled_at": datetime.utcnow()}
+        else:
+            values = {"status": "failed", "error": tx.get("vm_status")}
+        db.execute(update(RoyaltyPayout).where(RoyaltyPayout.id == row.id).values(**values))
+        db.commit()
+
+
+async def _settle_run(db, run: RoyaltySettlementRun, payer: Account, batch_size: int, owner: str):
+    """Submit pending payouts batch by batch until none are left"""
+    # Batches a crashed runner claimed: settled only if their transactions made it on chain
+    await _reconcile(db, run, "submitted")
+
+    while True:
+        _take_lease(db, run, owner)
+        batch = db.execute(
+            select(RoyaltyPayout.id, RoyaltyPayout.dataset_id, RoyaltyPayout.gross_octas)
+            .where(RoyaltyPayout.run_id == run.id, RoyaltyPayout.status == "pending")
+            .order_by(RoyaltyPayout.dataset_id)
+            .limit(batch_size)
+        ).all()
+        if not batch:
+            break
+        ids = [row.id for row in batch]
+        try:
+            transactions = aptos_service.sign_royalty_batch(
+                payer, [(row.dataset_id, row.gross_octas) for row in batch], run.id
+            )
+        except Exception as e:
+            db.execute(update(RoyaltyPayout).where(RoyaltyPayout.id.in_(ids)).values(status="failed", error=str(e)))
+            db.commit()
+            continue
+        # Claim the batch and record its hashes before anything is sent
+        hashes = {tx["dataset_id"]: tx["transaction_hash"] for tx in transactions}
+        db.execute(update(RoyaltyPayout), [
+            {"id": row.id, "status": "submitted", "transaction_hash": hashes[row.dataset_id]}
+            for row in batch
+        ])
+        db.commit()
+
+        result = await aptos_service.submit_royalty_batch(transactions)
+        if result["success"]:
+            db.execute(
+                update(RoyaltyPayout)
+                .where(RoyaltyPayout.id.in_(ids))
+                .values(status="settled", settled_at=datetime.utcnow())
+            )
+        else:
+            db.execute(
+                update(RoyaltyPayout)
+                .where(RoyaltyPayout.id.in_(ids))
+                .values(status="failed", error=result.get("error"))
+            )
+        db.commit()
+
+
+def _status_counts(db, run_id: int) -> dict:
+    rows = db.execute(
+        select(RoyaltyPayout.status, func.count())
+        .where(RoyaltyPayout.run_id == run_id)
+        .group_by(RoyaltyPayout.status)
+    ).all()
+    return dict(rows)
+
+
+async def settle_period(
+    period_start: datetime,
+    period_end: datetime,
+    payer: Account,
+    batch_size: Optional[int] = None,
+    retry_failed: bool = False,
+) -> dict:
+    """Compute (once) and settle all royalty payouts for a period; safe to re-run"""
+    batch_size = batch_size or ROYALTY_BATCH_SIZE
+    owner = uuid.uuid4().hex
+    with SessionLocal() as db:
+        run = _get_or_create_run(db, period_start, period_end)
+        _take_lease(db, run, owner)
+        try:
+            # Whoever held the lease before may have computed the run already
+            db.refresh(run)
+            if run.status == "pending":
+                _compute_run(db, run)
+            if retry_failed:
+                # A failed submission may still have landed; only resend what isn't on chain
+                await _reconcile(db, run, "failed")
+                db.execute(
+                    update(RoyaltyPayout)
+                    .where(RoyaltyPayout.run_id == run.id, RoyaltyPayout.status == "failed")
+                    .values(status="pending", error=None, transaction_hash=None)
+                )
+                db.commit()
+            await _settle_run(db, run, payer, batch_size, owner)
+
+            counts = _status_counts(db, run.id)
+            if counts.get("settled", 0) == run.dataset_count:
+                run.status = "settled"
+                run.completed_at = run.completed_at or datetime.utcnow()
+                db.commit()
+        finally:
+            _release_lease(db, run, owner)
+        return {
+            "run_id": run.id,
+            "status": run.status,
+            "datasets": run.dataset_count,
+            "total_octas": run.total_octas,
+            "payouts": counts,
+        }
+
+
+def preview_period(period_start: datetime, period_end: datetime) -> dict:
+    """Compute the payouts for a period without recording or paying anything"""
+    with SessionLocal() as db:
+        sales = aggregate_sales(db, period_start, period_end)
+    owner, per_contributor, dust = compute_payouts(sales["gross"], sales["share"], sales["contributors"])
+    return {
+        "datasets": len(sales["dataset_id"]),
+        "total_octas": int(sales["gross"].sum()),
+        "owner_octas": int(owner.sum()),
+        "contributor_octas": int((per_contributor * sales["contributors"]).sum()),
+        "dust_octas": int(dust.sum()),
+    }
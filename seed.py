@@ -1,7 +1,9 @@
 """
 Seed database with fake data
+(small curated demo set; use datagen.py for benchmark-scale volumes)
 """
 from database import SessionLocal, init_db
+from datagen import truncate_tables
 from models import User, Dataset, License, Transaction
 from datetime import datetime, timedelta
 import random
@@ -11,12 +13,9 @@ def seed_database():
     db = SessionLocal()
     
     try:
-        # Clear existing data
-        db.query(Transaction).delete()
-        db.query(License).delete()
-        db.query(Dataset).delete()
-        db.query(User).delete()
-        db.commit()
+        # Clear existing data, along with the rollups, similarities, royalties and
+        # watermarks derived from it (they reference dataset ids that start over)
+        truncate_tables()
         
         # Create fake users
         users = [
@@ -0,0 +1,66 @@
+"""
+Production Server
+Runs the API under uvicorn with multiple workers, uvloop/httptools and graceful shutdown
+
+    python server.py                 # WEB_CONCURRENCY workers (default: CPU count)
+    WEB_CONCURRENCY=4 PORT=8080 python server.py
+"""
+import importlib.util
+import os
+import shutil
+import tempfile
+
+import uvicorn
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _available(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def _prepare_multiprocess_metrics(workers: int):
+    """Point prometheus_client at a shared directory so /metrics aggregates every worker"""
+    if workers <= 1 or os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        return None
+    path = os.path.join(tempfile.gettempdir(), f"valynce-metrics-{os.getpid()}")
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = path
+    return path
+
+
+def main():
+    workers = int(os.getenv("WEB_CONCURRENCY") or os.cpu_count() or 1)
+    # Workers read WEB_CONCURRENCY to size their DB pools (see database.py)
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+    metrics_dir = _prepare_multiprocess_metrics(workers)
+
+    loop = "uvloop" if _available("uvloop") else "asyncio"
+    http = "httptools" if _available("httptools") else "h11"
+    print(f"🚀 Serving Valynce API with {workers} workers ({loop}/{http})")
+
+    try:
+        uvicorn.run(
+            "main:app",
+            host=os.getenv("HOST", "0.0.0.0"),
+            port=int(os.getenv("PORT", "8000")),
+            workers=workers,
+            loop=loop,
+            http=http,
+            # Let in-flight requests finish before workers exit on SIGTERM
+            timeout_graceful_shutdown=int(os.getenv("GRACEFUL_SHUTDOWN_SECONDS", "20")),
+            timeout_keep_alive=int(os.getenv("KEEP_ALIVE_SECONDS", "5")),
+            proxy_headers=True,
+            forwarded_allow_ips=os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1"),
+            log_level=os.getenv("LOG_LEVEL", "info"),
+            access_log=os.getenv("ACCESS_LOG", "false").lower() in ("1", "true", "yes"),
+        )
+    finally:
+        if metrics_dir:
+            shutil.rmtree(metrics_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
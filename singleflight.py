@@ -0,0 +1,44 @@
+"""
+Request Coalescing (single-flight)
+Concurrent callers asking for the same key share one in-flight fetch and its result
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, TypeVar
+
+from metrics import SINGLEFLIGHT_COALESCED, SINGLEFLIGHT_EXECUTIONS
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Deduplicates concurrent calls per key within one worker process"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[str, asyncio.Task] = {}
+
+    def _finished(self, key: str, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the exception retrieved even if every caller went away
+        if not task.cancelled():
+            task.exception()
+
+    async def do(self, key: str, fetch: Callable[[], Awaitable[T]]) -> T:
+        """Run `fetch` for `key`, or wait for the identical call already running
+
+        The result object is shared by every caller, so treat it as read-only.
+        """
+        task = self._calls.get(key)
+        if task is None:
+            SINGLEFLIGHT_EXECUTIONS.labels(self.name).inc()
+            # A task of its own, so one caller disconnecting doesn't cancel the others' fetch
+            task = asyncio.ensure_future(fetch())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+        else:
+            SINGLEFLIGHT_COALESCED.labels(self.name).inc()
+        return await asyncio.shield(task)
+
+    def in_flight(self) -> int:
+        return len(self._calls)
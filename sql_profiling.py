@@ -0,0 +1,135 @@
+"""
+Per-Request SQL Profiling
+Opt-in statement counting, Server-Timing headers and a structured slow-query log
+"""
+import json
+import logging
+import os
+import re
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger("valynce.sql")
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+_IN_LIST = re.compile(r"\((?:\s*\?\s*,)+\s*\?\s*\)")
+
+
+class RequestSQLStats:
+    """SQL counters for a single request"""
+
+    __slots__ = ("scope", "statements", "db_time")
+
+    def __init__(self, scope: Scope):
+        self.scope = scope
+        self.statements = 0
+        self.db_time = 0.0
+
+    @property
+    def route(self) -> str:
+        # The router stores the matched route on the shared scope dict
+        route = self.scope.get("route")
+        return getattr(route, "path", None) or self.scope.get("path", "")
+
+
+_request_stats: ContextVar[Optional[RequestSQLStats]] = ContextVar("request_sql_stats", default=None)
+
+
+def current_stats() -> Optional[RequestSQLStats]:
+    """SQL stats of the request being served, if profiling is active"""
+    return _request_stats.get()
+
+
+def normalize_sql(statement: str) -> str:
+    """Collapse whitespace and strip literals so similar statements group together"""
+    sql = _STRING_LITERAL.sub("?", statement)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    sql = _WHITESPACE.sub(" ", sql).strip()
+    return _IN_LIST.sub("(?)", sql)
+
+
+class SQLProfilingMiddleware:
+    """Binds per-request SQL stats and reports them as Server-Timing"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestSQLStats(scope)
+        token = _request_stats.set(stats)
+
+        async def send_with_timing(message: Message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing",
+                    f'db;dur={stats.db_time * 1000:.2f};desc="{stats.statements} queries"',
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_stats.reset(token)
+
+
+def instrument_engine(engine, slow_query_ms: float):
+    """Attach cursor-execute listeners that feed request stats and the slow-query log"""
+    threshold = slow_query_ms / 1000
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+        if context is not None:
+            context._sql_profiling_started = True
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.db_time += elapsed
+        if elapsed >= threshold:
+            logger.warning(json.dumps({
+                "event": "slow_query",
+                "duration_ms": round(elapsed * 1000, 2),
+                "route": stats.route if stats is not None else None,
+                "sql": normalize_sql(statement),
+                "executemany": executemany,
+            }))
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        # A failed statement never reaches after_cursor_execute; drop its start time so
+        # later statements on this connection aren't timed from it. Errors raised before
+        # the cursor ran (e.g. while compiling) never pushed one.
+        conn = exception_context.connection
+        context = exception_context.execution_context
+        if conn is not None and getattr(context, "_sql_profiling_started", False) and conn.info.get("query_start"):
+            elapsed = time.perf_counter() - conn.info["query_start"].pop()
+            stats = _request_stats.get()
+            if stats is not None:
+                stats.statements += 1
+                stats.db_time += elapsed
+
+
+def install_sql_profiling(app, *engines) -> bool:
+    """Enable SQL profiling when SQL_PROFILING is set; returns whether it was installed"""
+    if os.getenv("SQL_PROFILING", "false").lower() not in ("1", "true", "yes"):
+        return False
+    for engine in engines:
+        instrument_engine(engine, float(os.getenv("SLOW_QUERY_MS", "200")))
+    app.add_middleware(SQLProfilingMiddleware)
+    return True
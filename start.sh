@@ -28,6 +28,10 @@ if [ ! -f ".env" ]; then
     echo "⚠️  Please update .env with your actual values!"
 fi
 
+# Apply schema migrations (no longer done on every app start)
+echo "🗄️  Migrating database..."
+python manage.py migrate
+
 echo ""
 echo "✅ Setup complete!"
 echo ""
@@ -38,5 +42,5 @@ echo ""
 echo "Press Ctrl+C to stop the server"
 echo ""
 
-# Start the server
-python main.py
+# Start the server (multi-worker; use `python main.py` for auto-reload during development)
+python server.py
@@ -0,0 +1,109 @@
+"""
+Upload API Routes
+Resumable chunked dataset uploads: create, PUT chunks (any order, in parallel), complete.
+Completing an upload sets the dataset's file_hash (SHA-256) and size_mb from the bytes received.
+"""
+from fastapi import APIRouter, HTTPException, Depends, Header, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from pydantic import BaseModel
+from typing import List, Optional
+from cache import cache
+from database import get_db, mark_recent_write
+from dataset_routes import _invalidate_catalog
+from models import Dataset, User
+from db_types import WalletAddress
+from realtime import realtime_hub
+from uploads import UploadError, multipart_pieces, upload_store
+
+router = APIRouter(prefix="/api/uploads", tags=["Uploads"])
+
+# Pydantic models
+class UploadCreate(BaseModel):
+    dataset_id: int
+    owner_wallet: WalletAddress
+    total_size: int
+    chunk_size: Optional[int] = None
+
+class UploadStatus(BaseModel):
+    upload_id: str
+    dataset_id: int
+    total_size: int
+    chunk_size: int
+    chunk_count: int
+    status: str
+    missing: List[int]
+    received_bytes: int
+    hashed_bytes: int
+    sha256: Optional[str] = None
+
+async def _call(func, *args):
+    try:
+        return await run_in_threadpool(func, *args)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+@router.post("/", response_model=UploadStatus)
+async def create_upload(upload: UploadCreate, db: Session = Depends(get_db)):
+    """Start an upload for a dataset owned by `owner_wallet`"""
+    dataset = db.query(Dataset).filter(Dataset.id == upload.dataset_id).first()
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    owner = db.query(User).filter(User.id == dataset.owner_id).first()
+    if owner.wallet_address != upload.owner_wallet:
+        raise HTTPException(status_code=403, detail="Only the dataset owner can upload its file")
+    manifest = await _call(upload_store.create, dataset.id, upload.owner_wallet, upload.total_size, upload.chunk_size)
+    return await _call(upload_store.status, manifest["upload_id"])
+
+@router.get("/{upload_id}", response_model=UploadStatus)
+async def get_upload(upload_id: str):
+    """Upload progress; resume by sending the `missing` chunks"""
+    return await _call(upload_store.status, upload_id)
+
+@router.put("/{upload_id}/chunks/{index}", response_model=UploadStatus)
+async def put_chunk(
+    upload_id: str,
+    index: int,
+    request: Request,
+    x_chunk_sha256: Optional[str] = Header(None)
+):
+    """Upload chunk `index` as a raw body or a single multipart/form-data file part"""
+    content_type = request.headers.get("content-type", "")
+    pieces = request.stream()
+    if content_type.startswith("multipart/form-data"):
+        pieces = multipart_pieces(content_type, pieces)
+    try:
+        return await upload_store.write_chunk(upload_id, index, pieces, x_chunk_sha256)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+@router.post("/{upload_id}/complete", response_model=UploadStatus)
+async def complete_upload(upload_id: str, db: Session = Depends(get_db)):
+    """Finish hashing and record file_hash/size_mb on the dataset"""
+    manifest = await _call(upload_store.finish, upload_id)
+    sha256 = manifest["sha256"]
+
+    dataset = db.query(Dataset).filter(Dataset.id == manifest["dataset_id"]).first()
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    duplicate = db.query(Dataset.id).filter(Dataset.file_hash == sha256, Dataset.id != dataset.id).first()
+    if duplicate:
+        raise HTTPException(status_code=409, detail=f"Dataset {duplicate.id} already has this file")
+
+    # Store the file before pointing the dataset at it; completing again is a no-op,
+    # so a failed commit below can simply be retried
+    await _call(upload_store.complete, upload_id, sha256)
+    dataset.file_hash = sha256
+    dataset.size_mb = round(manifest["total_size"] / (1024 * 1024), 2)
+    db.commit()
+    await mark_recent_write(f"dataset:{dataset.id}")
+    await cache.delete(f"dataset:{dataset.id}")
+    await _invalidate_catalog()
+    realtime_hub.poke(f"dataset:{dataset.id}")
+    return await _call(upload_store.status, upload_id)
+
+@router.delete("/{upload_id}")
+async def abort_upload(upload_id: str):
+    """Discard an unfinished upload and its stored chunks"""
+    await _call(upload_store.abort, upload_id)
+    return {"success": True, "message": "Upload aborted"}
@@ -0,0 +1,394 @@
+"""
+Chunked Dataset Uploads
+Resumable uploads streamed to local storage chunk by chunk (in any order, in parallel),
+with the SHA-256 of the file computed as the contiguous prefix of received chunks grows
+
+Layout under UPLOAD_DIR:
+    <upload_id>/manifest.json   upload parameters and received chunk indices
+    <upload_id>/data            the file, preallocated; chunk i lives at i * chunk_size
+    files/<sha256>              completed uploads, content addressed
+
+Uploads left unfinished for UPLOAD_TTL_HOURS are deleted by a periodic sweep.
+"""
+import asyncio
+import fcntl
+import hashlib
+import json
+import os
+import random
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import AsyncIterator, Dict, Optional
+
+from dotenv import load_dotenv
+from python_multipart.multipart import MultipartParser, parse_options_header
+from starlette.concurrency import run_in_threadpool
+
+load_dotenv()
+
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(8 * 1024 * 1024)))
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(100 * 1024 ** 3)))
+# Unfinished uploads with no chunk or manifest write for this long are deleted
+UPLOAD_TTL_HOURS = float(os.getenv("UPLOAD_TTL_HOURS", "24"))
+MIN_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 256 * 1024 * 1024
+# Bytes buffered per request before a write, and read per step when hashing from disk
+_IO_BLOCK = 1024 * 1024
+
+
+class UploadError(Exception):
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class _PrefixHasher:
+    """SHA-256 of bytes [0, offset) of an upload; `lock` is held while it advances"""
+
+    def __init__(self):
+        self.sha = hashlib.sha256()
+        self.offset = 0
+        self.lock = threading.Lock()
+
+
+class UploadStore:
+    def __init__(self, root: str = UPLOAD_DIR):
+        self.root = root
+        # Hash state can't be persisted, so each process keeps its own and rebuilds
+        # it from local storage if it never saw the earlier chunks (restart, other worker)
+        self._hashers: Dict[str, _PrefixHasher] = {}
+
+    def _path(self, upload_id: str, name: str = "") -> str:
+        try:
+            uuid.UUID(hex=upload_id)
+        except ValueError:
+            raise UploadError("Upload not found", 404)
+        return os.path.join(self.root, upload_id, name)
+
+    @contextmanager
+    def _locked(self, upload_id: str):
+        """Exclusive access to an upload's manifest, across threads and worker processes"""
+        try:
+            lock_file = open(self._path(upload_id, "manifest.lock"), "a")
+        except FileNotFoundError:
+            raise UploadError("Upload not found", 404)
+        with lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def _read_manifest(self, upload_id: str) -> dict:
+        try:
+            with open(self._path(upload_id, "manifest.json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise UploadError("Upload not found", 404)
+
+    def _write_manifest(self, upload_id: str, manifest: dict) -> None:
+        path = self._path(upload_id, "manifest.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(manifest, f)
+        os.replace(path + ".tmp", path)
+
+    @staticmethod
+    def chunk_range(manifest: dict, index: int):
+        """(offset, length) of chunk `index`; the last chunk may be short"""
+        offset = index * manifest["chunk_size"]
+        return offset, min(manifest["chunk_size"], manifest["total_size"] - offset)
+
+    @staticmethod
+    def _contiguous_bytes(manifest: dict) -> int:
+        received = set(manifest["received"])
+        index = 0
+        while index in received:
+            index += 1
+        return min(index * manifest["chunk_size"], manifest["total_size"])
+
+    def create(self, dataset_id: int, owner_wallet: str, total_size: int, chunk_size: Optional[int] = None) -> dict:
+        chunk_size = chunk_size or UPLOAD_CHUNK_SIZE
+        if not 0 < total_size <= UPLOAD_MAX_BYTES:
+            raise UploadError(f"total_size must be between 1 and {UPLOAD_MAX_BYTES} bytes")
+        if not MIN_CHUNK_SIZE <= chunk_size <= MAX_CHUNK_SIZE:
+            raise UploadError(f"chunk_size must be between {MIN_CHUNK_SIZE} and {MAX_CHUNK_SIZE} bytes")
+        upload_id = uuid.uuid4().hex
+        os.makedirs(self._path(upload_id))
+        # Sparse preallocation: parallel chunks write straight to their offsets
+        with open(self._path(upload_id, "data"), "wb") as f:
+            f.truncate(total_size)
+        manifest = {
+            "upload_id": upload_id,
+            "dataset_id": dataset_id,
+            "owner_wallet": owner_wallet,
+            "total_size": total_size,
+            "chunk_size": chunk_size,
+            "chunk_count": -(-total_size // chunk_size),
+            "received": [],
+            "status": "uploading",
+            "sha256": None,
+            "created_at": datetime.utcnow().isoformat(),
+        }
+        self._write_manifest(upload_id, manifest)
+        return manifest
+
+    def status(self, upload_id: str) -> dict:
+        manifest = self._read_manifest(upload_id)
+        received = set(manifest["received"])
+        hasher = self._hashers.get(upload_id)
+        return {
+            **manifest,
+            "missing": [i for i in range(manifest["chunk_count"]) if i not in received],
+            "received_bytes": sum(self.chunk_range(manifest, i)[1] for i in received),
+            "hashed_bytes": manifest["total_size"] if manifest["sha256"] else (hasher.offset if hasher else 0),
+        }
+
+    def _write_block(self, fd: int, data: bytes, position: int, hashers) -> None:
+        view = memoryview(data)
+        while view:
+            written = os.pwrite(fd, view, position)
+            view, position = view[written:], position + written
+        for sha in hashers:
+            sha.update(data)
+
+    async def write_chunk(self, upload_id: str, index: int, pieces: AsyncIterator[bytes], expected_sha256: Optional[str] = None) -> dict:
+        """Stream one chunk's bytes to its offset; returns the upload status"""
+        manifest = await run_in_threadpool(self._read_manifest, upload_id)
+        if manifest["status"] != "uploading":
+            raise UploadError("Upload is already complete", 409)
+        if not 0 <= index < manifest["chunk_count"]:
+            raise UploadError(f"Chunk index must be between 0 and {manifest['chunk_count'] - 1}")
+        if index in manifest["received"]:
+            raise UploadError(f"Chunk {index} was already received", 409)
+        offset, length = self.chunk_range(manifest, index)
+
+        # In-order chunks feed the prefix hash as they stream, without reading them back
+        if offset == 0 and upload_id not in self._hashers:
+            self._hashers[upload_id] = _PrefixHasher()
+        hasher = self._hashers.get(upload_id)
+        inline = hasher is not None and hasher.offset == offset and hasher.lock.acquire(blocking=False)
+        if inline and hasher.offset != offset:
+            hasher.lock.release()
+            inline = False
+        chunk_sha = hashlib.sha256() if expected_sha256 else None
+        hashers = [sha for sha in (hasher.sha if inline else None, chunk_sha) if sha is not None]
+
+        fd = os.open(self._path(upload_id, "data"), os.O_WRONLY)
+        written = 0
+        buffer = bytearray()
+        try:
+            async for piece in pieces:
+                if written + len(buffer) + len(piece) > length:
+                    raise UploadError(f"Chunk {index} must be {length} bytes")
+                buffer += piece
+                if len(buffer) >= _IO_BLOCK:
+                    await run_in_threadpool(self._write_block, fd, bytes(buffer), offset + written, hashers)
+                    written += len(buffer)
+                    buffer.clear()
+            if buffer:
+                await run_in_threadpool(self._write_block, fd, bytes(buffer), offset + written, hashers)
+                written += len(buffer)
+            if written != length:
+                raise UploadError(f"Chunk {index} must be {length} bytes, got {written}")
+            if chunk_sha is not None and chunk_sha.hexdigest() != expected_sha256.lower():
+                raise UploadError(f"Chunk {index} does not match its SHA-256")
+            if inline:
+                hasher.offset += length
+        except BaseException:
+            if inline:
+                # Partially fed: rebuild from disk later
+                self._hashers.pop(upload_id, None)
+            raise
+        finally:
+            os.close(fd)
+            if inline:
+                hasher.lock.release()
+
+        await run_in_threadpool(self._mark_received, upload_id, index)
+        await run_in_threadpool(self._advance_hash, upload_id, False)
+        return await run_in_threadpool(self.status, upload_id)
+
+    def _mark_received(self, upload_id: str, index: int) -> None:
+        with self._locked(upload_id):
+            manifest = self._read_manifest(upload_id)
+            if index not in manifest["received"]:
+                manifest["received"] = sorted(manifest["received"] + [index])
+                self._write_manifest(upload_id, manifest)
+
+    def _advance_hash(self, upload_id: str, wait: bool) -> Optional[_PrefixHasher]:
+        """Hash newly contiguous bytes from disk; without `wait`, leave it to whoever holds the hasher"""
+        hasher = self._hashers.setdefault(upload_id, _PrefixHasher())
+        if not hasher.lock.acquire(blocking=wait):
+            return None
+        try:
+            with open(self._path(upload_id, "data"), "rb") as f:
+                while True:
+                    end = self._contiguous_bytes(self._read_manifest(upload_id))
+                    if hasher.offset >= end:
+                        return hasher
+                    f.seek(hasher.offset)
+                    while hasher.offset < end:
+                        block = f.read(min(_IO_BLOCK, end - hasher.offset))
+                        hasher.sha.update(block)
+                        hasher.offset += len(block)
+        finally:
+            hasher.lock.release()
+
+    def finish(self, upload_id: str) -> dict:
+        """Hash the rest of a fully received upload; returns its manifest with sha256 set"""
+        manifest = self._read_manifest(upload_id)
+        if manifest["sha256"]:
+            return manifest
+        missing = manifest["chunk_count"] - len(manifest["received"])
+        if missing:
+            raise UploadError(f"{missing} chunks are still missing", 409)
+        hasher = self._advance_hash(upload_id, True)
+        manifest["sha256"] = hasher.sha.hexdigest()
+        return manifest
+
+    def complete(self, upload_id: str, sha256: str) -> str:
+        """Move a finished upload into content-addressed storage; returns its path"""
+        destination = os.path.join(self.root, "files", sha256)
+        with self._locked(upload_id):
+            manifest = self._read_manifest(upload_id)
+            if manifest["status"] != "complete":
+                os.makedirs(os.path.dirname(destination), exist_ok=True)
+                os.replace(self._path(upload_id, "data"), destination)
+                manifest.update(status="complete", sha256=sha256, completed_at=datetime.utcnow().isoformat())
+                self._write_manifest(upload_id, manifest)
+        self._hashers.pop(upload_id, None)
+        return destination
+
+    def _last_activity(self, upload_id: str, names=("manifest.json", "data", "")) -> float:
+        # Chunk writes touch data, received chunks and completion touch the manifest
+        times = []
+        for name in names:
+            try:
+                times.append(os.path.getmtime(self._path(upload_id, name)))
+            except FileNotFoundError:
+                pass
+        return max(times, default=0.0)
+
+    def sweep(self, max_age: float) -> int:
+        """Delete uploads still "uploading" after `max_age` idle seconds; returns how many
+
+        Also drops this process's hash state for uploads that finished, were aborted or
+        were swept elsewhere (only the worker that completes an upload frees its own).
+        """
+        cutoff = time.time() - max_age
+        removed = 0
+        try:
+            names = os.listdir(self.root)
+        except FileNotFoundError:
+            names = []
+        for upload_id in names:
+            try:
+                uuid.UUID(hex=upload_id)
+            except ValueError:
+                continue  # files/
+            # The directory's own mtime counts only here: taking the lock may create a file in it
+            if self._last_activity(upload_id) > cutoff:
+                continue
+            try:
+                with self._locked(upload_id):
+                    # A chunk may have landed since the first check
+                    if self._last_activity(upload_id, ("manifest.json", "data")) > cutoff:
+                        continue
+                    try:
+                        manifest = self._read_manifest(upload_id)
+                    except UploadError:
+                        manifest = {"status": "uploading"}  # create() died before writing it
+                    if manifest["status"] != "uploading":
+                        continue
+                    shutil.rmtree(self._path(upload_id))
+                    removed += 1
+            except (UploadError, FileNotFoundError):
+                continue  # swept or aborted concurrently
+        for upload_id in list(self._hashers):
+            try:
+                status = self._read_manifest(upload_id)["status"]
+            except UploadError:
+                status = None
+            if status != "uploading":
+                self._hashers.pop(upload_id, None)
+        return removed
+
+    def abort(self, upload_id: str) -> None:
+        manifest = self._read_manifest(upload_id)
+        if manifest["status"] == "complete":
+            raise UploadError("Upload is already complete", 409)
+        self._hashers.pop(upload_id, None)
+        shutil.rmtree(self._path(upload_id))
+
+
+async def multipart_pieces(content_type: str, stream: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """File bytes of a single-part multipart/form-data body, parsed as it streams in"""
+    _, params = parse_options_header(content_type)
+    boundary = params.get(b"boundary")
+    if not boundary:
+        raise UploadError("Missing multipart boundary")
+    pieces = []
+    parts = 0
+
+    def on_part_begin():
+        nonlocal parts
+        parts += 1
+
+    parser = MultipartParser(boundary, {
+        "on_part_begin": on_part_begin,
+        "on_part_data": lambda data, start, end: pieces.append(bytes(data[start:end])),
+    })
+    async for body in stream:
+        parser.write(body)
+        if parts > 1:
+            raise UploadError("Send one file part per chunk")
+        for piece in pieces:
+            yield piece
+        pieces.clear()
+    parser.finalize()
+
+
+class UploadSweeper:
+    """Periodically deletes abandoned uploads (every worker runs it to free its own hash state)"""
+
+    def __init__(self, store: UploadStore, interval: float = 3600.0, ttl_hours: float = UPLOAD_TTL_HOURS):
+        self.store = store
+        self.interval = interval
+        self.ttl_hours = ttl_hours
+        self._task: Optional[asyncio.Task] = None
+
+    async def sweep_once(self) -> int:
+        removed = await run_in_threadpool(self.store.sweep, self.ttl_hours * 3600)
+        if removed:
+            print(f"🧹 Deleted {removed} abandoned uploads")
+        return removed
+
+    async def _run(self) -> None:
+        # Spread workers out so they don't all sweep at the same instant
+        await asyncio.sleep(random.uniform(0, self.interval))
+        while True:
+            try:
+                await self.sweep_once()
+            except Exception as e:
+                print(f"❌ Upload sweep failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Singleton instances (UPLOAD_SWEEP_INTERVAL=0 disables the background sweep)
+upload_store = UploadStore()
+upload_sweeper = UploadSweeper(upload_store, interval=float(os.getenv("UPLOAD_SWEEP_INTERVAL", "3600")))
@@ -0,0 +1,111 @@
+"""
+User Resolution
+Maps canonical wallet addresses to user rows, creating users on first use
+
+Resolved wallets are kept in a bounded per-worker LRU (users are never renamed or
+deleted by the API, so entries don't go stale). A miss that has to create the user
+runs a single INSERT ... ON CONFLICT DO NOTHING RETURNING, so concurrent first
+purchases from the same wallet can't trip the unique constraint.
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import select
+
+from database import dialect_insert
+from models import User
+
+load_dotenv()
+
+USER_CACHE_ENTRIES = int(os.getenv("USER_CACHE_ENTRIES", "50000"))
+
+
+class ResolvedUser(NamedTuple):
+    id: int
+    username: str
+
+
+def _usernames(wallet_address: str):
+    """Generated usernames to try, shortest first; the full address is unique like the wallet"""
+    yield f"user_{wallet_address[:8]}"
+    yield f"user_{wallet_address}"
+
+
+class UserResolver:
+    """Bounded LRU of wallet -> (user id, username) in front of the users table"""
+
+    def __init__(self, max_entries: int = USER_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, ResolvedUser]" = OrderedDict()
+        # Lookups also run from threadpool handlers
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _cached(self, wallet_address: str) -> Optional[ResolvedUser]:
+        with self._lock:
+            user = self._entries.get(wallet_address)
+            if user is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(wallet_address)
+            self.hits += 1
+            return user
+
+    def _remember(self, wallet_address: str, user: ResolvedUser) -> ResolvedUser:
+        with self._lock:
+            self._entries[wallet_address] = user
+            self._entries.move_to_end(wallet_address)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return user
+
+    def _select(self, db, wallet_address: str) -> Optional[ResolvedUser]:
+        row = db.execute(
+            select(User.id, User.username).where(User.wallet_address == wallet_address)
+        ).first()
+        return ResolvedUser(row.id, row.username) if row else None
+
+    def lookup(self, db, wallet_address: str) -> Optional[ResolvedUser]:
+        """The wallet's user, or None if it has never created a dataset or bought a license"""
+        user = self._cached(wallet_address)
+        if user is None:
+            user = self._select(db, wallet_address)
+            if user is not None:
+                self._remember(wallet_address, user)
+        return user
+
+    def resolve(self, db, wallet_address: str) -> ResolvedUser:
+        """The wallet's user, inserted (and committed) if it doesn't exist yet"""
+        user = self._cached(wallet_address)
+        if user is not None:
+            return user
+
+        insert = dialect_insert(db)
+        for username in _usernames(wallet_address):
+            # No conflict target: a taken wallet or a taken username both skip the insert
+            user_id = db.execute(
+                insert(User)
+                .values(wallet_address=wallet_address, username=username)
+                .on_conflict_do_nothing()
+                .returning(User.id)
+            ).scalar()
+            if user_id is not None:
+                # Committed right away so a cached id always refers to a stored row
+                db.commit()
+                return self._remember(wallet_address, ResolvedUser(user_id, username))
+            user = self._select(db, wallet_address)
+            if user is not None:
+                return self._remember(wallet_address, user)
+        raise RuntimeError(f"Could not create a user for {wallet_address}")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# Singleton instance
+user_resolver = UserResolver()